@@ -47,7 +47,73 @@ class TravelAgentResponse(BaseModel):
 # Create router
 router = APIRouter(prefix="/travel-agent", tags=["Travel Agent"])
 
-def call_travel_agent_service(input_text: str, history: List[Dict[str, str]] = None) -> dict:
+# Travel-agent workflow graph (lazy initialization, resolved only once).
+# A failed import is not cached by sys.modules, so retrying it per request
+# would re-run the module search and re-execute workflow.py every time.
+travel_agent_graph = None
+_travel_agent_import_attempted = False
+
+def get_travel_agent_graph():
+    """
+    Import the travel-agent workflow graph on first use and cache the result.
+
+    Returns:
+        The compiled workflow graph, or None if the travel-agent package is unavailable.
+    """
+    global travel_agent_graph, _travel_agent_import_attempted
+    if not _travel_agent_import_attempted:
+        try:
+            # workflow.py exports the compiled graph as `app`
+            from workflow import app as graph
+            travel_agent_graph = graph
+        except ImportError:
+            logger.warning("Travel agent workflow not available, using fallback")
+        _travel_agent_import_attempted = True
+    return travel_agent_graph
+
+def build_agent_messages(input_text: str, history: List[Dict[str, str]] = None) -> list:
+    """
+    Convert the request into the chat messages the workflow state expects.
+
+    Args:
+        input_text (str): The user's travel query.
+        history (List[Dict[str, str]], optional): Earlier messages as {"role", "content"} dicts.
+
+    Returns:
+        list: LangChain messages, oldest first, ending with the query.
+    """
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    messages = [
+        AIMessage(content=msg.get("content", "")) if msg.get("role") == "assistant"
+        else HumanMessage(content=msg.get("content", ""))
+        for msg in history or []
+    ]
+    messages.append(HumanMessage(content=input_text))
+    return messages
+
+def extract_agent_reply(result: Dict[str, Any]) -> str:
+    """
+    Pick the reply text out of the final workflow state.
+
+    Args:
+        result (Dict[str, Any]): The state returned by the workflow graph.
+
+    Returns:
+        str: The trip summary, or the agent's last message (e.g. a question
+            about missing details) when the workflow stopped before a summary.
+    """
+    summary = result.get("summary")
+    if isinstance(summary, dict):
+        summary = summary.get("summary")
+    if summary:
+        return str(summary)
+    messages = result.get("messages") or []
+    if messages and getattr(messages[-1], "type", None) == "ai":
+        return str(messages[-1].content)
+    return "Travel plan generated successfully"
+
+async def call_travel_agent_service(input_text: str, history: List[Dict[str, str]] = None) -> dict:
     """
     Process travel agent request with AI travel planning workflow.
 
@@ -63,33 +129,29 @@ def call_travel_agent_service(input_text: str, history: List[Dict[str, str]] = N
         if not input_text or not input_text.strip():
             return {"summary": "Please provide a travel query", "status": "error"}
         
-        # Try to import and use the travel-agent workflow
-        try:
-            from workflow import graph as travel_agent_graph
-            
-            # Prepare input for travel agent
-            agent_input = {
-                "input": input_text.strip(),
-                "chat_history": history or []
-            }
-            
-            # Invoke the travel agent workflow
-            result = travel_agent_graph.invoke(agent_input)
-            
-            # Extract summary from result
-            summary = result.get("summary", "Travel plan generated successfully")
-            
-            return {
-                "summary": summary,
-                "status": "success"
-            }
-        except ImportError:
-            logger.warning("Travel agent workflow not available, using fallback")
+        # Use the travel-agent workflow if it could be imported
+        graph = get_travel_agent_graph()
+        if graph is None:
             # Fallback: provide basic response
             return {
                 "summary": f"Travel planning request received: {input_text.strip()}. AI agent integration pending.",
                 "status": "success"
             }
+
+        # The workflow state carries the conversation as chat messages, ending
+        # with the new query
+        agent_input = {"messages": build_agent_messages(input_text.strip(), history)}
+
+        # Invoke the travel agent workflow without blocking the event loop;
+        # LangGraph runs synchronous nodes and tools in worker threads
+        result = await graph.ainvoke(agent_input)
+
+        summary = extract_agent_reply(result)
+
+        return {
+            "summary": summary,
+            "status": "success"
+        }
         
     except Exception as e:
         logger.error(f"Error processing travel request: {e}")
@@ -113,7 +175,7 @@ async def invoke_travel_agent(request: TravelAgentRequest) -> TravelAgentRespons
         logger.info(f"Processing travel query: {request.input}")
         
         # Call the travel agent service
-        result = call_travel_agent_service(request.input, request.history)
+        result = await call_travel_agent_service(request.input, request.history)
         
         return TravelAgentResponse(
             summary=result["summary"],
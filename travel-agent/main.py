@@ -1,27 +1,389 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi import FastAPI, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, ValidationError
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, List, Dict, Literal, Optional, Tuple, Type, TypeVar
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import atexit
+import functools
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
-import json
+import orjson
+from cachetools import LRUCache
+from services.response_cache import response_cache
+from services.http_client import aclose_async_client
+from services.llm_utils import aclose_llm, get_json_llm, get_default_prompt, parse_json_response, run_llm_json, system_prompt_cache
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from services.plan_schema import validate_trip_plan, validate_edit_plan
+from services.single_flight import SingleFlight
+from services.plan_stream import PlanStreamParser
 
 # Load environment variables from root .env file
 load_dotenv(dotenv_path="../.env")
 
-# Create the FastAPI app
-api = FastAPI()
+# Log through a queue so handlers never block the event loop on stdout writes;
+# a background listener thread does the actual formatting and I/O
+logger = logging.getLogger("travel_agent")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+logger.addHandler(QueueHandler(_log_queue))
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Resolve the Gemini key once and build the shared JSON-mode model up front,
+# instead of re-reading the environment and constructing a client per request
+_API_KEY = os.getenv("GOOGLE_API_KEY")
+_LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+_API_KEY_CONFIGURED = bool(_API_KEY) and _API_KEY != "your-actual-gemini-api-key-here"
+_JSON_LLM = get_json_llm() if _API_KEY_CONFIGURED else None
+
+# Create the FastAPI app; responses are serialized with orjson
+api = FastAPI(default_response_class=ORJSONResponse)
+
+@api.on_event("startup")
+async def check_llm_configured():
+    """
+    Warns at startup when the plan endpoints have no Gemini model to call, and
+    otherwise starts uploading the static system prompts to Gemini's context cache.
+    """
+    if _JSON_LLM is None:
+        logger.warning("GOOGLE_API_KEY is not configured; /edit-plan and /generate-trip-plan will be unavailable")
+        return
+    for kind, (system_text, _, _) in _CACHEABLE_PROMPTS.items():
+        system_prompt_cache.get(kind, system_text)
+
+@api.on_event("shutdown")
+async def close_clients():
+    """Closes the shared Gemini connection and HTTP client pool when the worker stops."""
+    await aclose_llm()
+    await aclose_async_client()
+
+def _cors_origins(value: str) -> List[str]:
+    """
+    Parses the CORS_ORIGINS setting shared with the backend's .env.
 
-# Add CORS middleware
+    Args:
+        value (str): A JSON list (as in .env.example) or a comma-separated list.
+
+    Returns:
+        List[str]: The allowed origins.
+    """
+    value = value.strip()
+    if value.startswith("["):
+        return orjson.loads(value)
+    return [origin.strip() for origin in value.split(",") if origin.strip()]
+
+# Add CORS middleware. Origins come from CORS_ORIGINS; local dev servers on any
+# port are always allowed. An explicit list (rather than "*" together with
+# credentials, which browsers reject) lets preflights be cached for a day.
 api.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
+    allow_origins=_cors_origins(os.getenv("CORS_ORIGINS", "")),
+    allow_origin_regex=r"https?://(localhost|127\.0\.0\.1)(:\d+)?",
     allow_credentials=True,
-    allow_methods=["*"],  # Allow all methods
-    allow_headers=["*"],  # Allow all headers
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
+# System prompt for /edit-plan, in two parts: the static instructions come first
+# and stay byte-identical across requests so the provider can reuse its prompt
+# prefix cache; the per-request context ({trip_id}, {context_str}) is appended
+# last. Literal JSON braces are escaped as {{ }} for the prompt template.
+EDIT_PLAN_STATIC_PROMPT = """
+Bạn là một chuyên gia lập kế hoạch du lịch thông minh. Nhiệm vụ của bạn là tạo ra một kế hoạch du lịch hoàn toàn mới dựa trên yêu cầu chỉnh sửa của người dùng.
+
+QUY TẮC HOẠT ĐỘNG:
+1. Khi người dùng muốn SỬA ĐỔI kế hoạch, hãy tạo HOÀN TOÀN kế hoạch mới thay thế kế hoạch cũ
+2. KHÔNG thêm/bớt/xóa hoạt động cụ thể, mà tạo lại toàn bộ kế hoạch phù hợp với yêu cầu mới
+3. Phân tích yêu cầu mới và tạo kế hoạch từ đầu với các hoạt động, thời gian, và chi phí mới
+
+YÊU CẦU ĐẦU RA:
+Tạo kế hoạch du lịch hoàn chỉnh mới với cấu trúc JSON chuẩn.
+QUAN TRỌNG với mỗi hoạt động:
+- address: địa chỉ đầy đủ để định tuyến trên bản đồ (địa điểm, đường, phường/xã, quận/huyện, tỉnh/thành, mã bưu chính, quốc gia)
+- coordinates: tọa độ GPS thực tế "latitude,longitude" (ví dụ "11.9404,108.4583"), không để trống
+- description: ngắn gọn, 1-2 câu; recommendations và tips: tối đa 5 mục mỗi loại
+
+Cấu trúc JSON chuẩn:
+{{
+    "action_type": "full_replace",
+    "message": "Đã tạo kế hoạch mới dựa trên yêu cầu của bạn",
+    "new_plan": {{
+        "trip_info": {{
+            "name": "Tên chuyến đi mới",
+            "destination": "Điểm đến",
+            "start_date": "YYYY-MM-DD",
+            "end_date": "YYYY-MM-DD",
+            "duration_days": số,
+            "travelers_count": số,
+            "total_budget": số,
+            "currency": "VND"
+        }},
+        "daily_plans": [
+            {{
+                "day": số,
+                "date": "YYYY-MM-DD",
+                "activities": [
+                    {{
+                        "title": "Tên hoạt động",
+                        "description": "Mô tả chi tiết",
+                        "start_time": "HH:MM",
+                        "duration_hours": số,
+                        "activity_type": "activity|restaurant|lodging|flight|tour",
+                    "estimated_cost": số,
+                    "location": "Tên địa điểm",
+                    "address": "Địa chỉ đầy đủ cho bản đồ (đường, quận/huyện, thành phố)",
+                    "coordinates": "Tọa độ GPS (latitude,longitude) nếu có thể"
+                    }}
+                ]
+            }}
+        ],
+        "summary": {{
+            "total_estimated_cost": số,
+            "recommendations": ["Lời khuyên"],
+            "tips": ["Mẹo du lịch"]
+        }}
+    }}
+}}
+
+QUAN TRỌNG:
+- Luôn trả về action_type: "full_replace"
+- Tạo HOÀN TOÀN kế hoạch mới, không phải chỉnh sửa cục bộ
+- Thời gian bắt đầu tính từ ngày hiện tại + 7 ngày
+- Chi phí tính bằng VND
+- Hoạt động phải đa dạng và thực tế
+
+CHỈ TRẢ VỀ JSON, KHÔNG CÓ TEXT KHÁC.
+"""
+
+EDIT_PLAN_CONTEXT_TEMPLATE = """
+--- THÔNG TIN NGỮ CẢNH ---
+- ID chuyến đi: {trip_id}
+- Lịch sử cuộc trò chuyện gần đây:
+{context_str}
+"""
+
+EDIT_PLAN_SYSTEM_TEMPLATE = EDIT_PLAN_STATIC_PROMPT + EDIT_PLAN_CONTEXT_TEMPLATE
+
+EDIT_PLAN_HUMAN_TEMPLATE = "Yêu cầu chỉnh sửa kế hoạch của người dùng: {command}"
+
+# Parsed once and shared by every request; only the variables change per call
+EDIT_PLAN_PROMPT = get_default_prompt(EDIT_PLAN_SYSTEM_TEMPLATE, EDIT_PLAN_HUMAN_TEMPLATE)
+
+# System prompt for /generate-trip-plan (no per-request substitutions).
+TRIP_PLAN_SYSTEM_PROMPT = """
+Bạn là một chuyên gia lên kế hoạch du lịch chuyên nghiệp với kiến thức thực tế về Việt Nam. Nhiệm vụ của bạn là tạo ra một kế hoạch du lịch hoàn chỉnh và chi tiết dựa trên yêu cầu của người dùng.
+
+Yêu cầu đầu ra:
+1. Phân tích yêu cầu và trích xuất thông tin chính (điểm đến, thời gian, số người, ngân sách, ĐIỂM KHỞI HÀNH, PHƯƠNG TIỆN DI CHUYỂN ƯA THÍCH)
+2. Tạo kế hoạch chi tiết cho từng ngày với các hoạt động cụ thể THEO TRẬT TỰ ĐỊA LÝ LOGIC
+3. Ước tính chi phí cho từng hoạt động và tổng cộng
+4. Gợi ý phương tiện di chuyển và chỗ ở phù hợp
+5. Trả về JSON với cấu trúc chuẩn để ứng dụng có thể import
+
+QUAN TRỌNG VỀ TỔ CHỨC ĐƯỜNG ĐI:
+- XÁC ĐỊNH ĐIỂM KHỞI HÀNH từ yêu cầu người dùng (ví dụ: ga xe lửa Hồ Chí Minh, sân bay, nhà ga...)
+- XÁC ĐỊNH MÚI GIỜ: Tự động xác định múi giờ của điểm khởi hành và điểm đến (ví dụ: VN UTC+7, Mỹ UTC-5, châu Âu UTC+1)
+- CHUYỂN ĐỔI THỜI GIAN: Điều chỉnh giờ khởi hành và hoạt động theo múi giờ địa phương
+- XỬ LÝ JET LAG: Cân nhắc thời gian bay dài và hiệu ứng jet lag khi lên lịch hoạt động
+- SẮP XẾP HOẠT ĐỘNG THEO MÚI GIỜ: Đảm bảo giờ hoạt động hợp lý theo thời gian địa phương
+- TÍNH TOÁN THỜI GIAN DI CHUYỂN THỰC TẾ: Sử dụng khoảng cách địa lý và phương tiện để ước lượng chính xác
+- TRÁNH nhảy cóc giữa các địa điểm xa xôi không hợp lý
+- ĐẢM BẢO kế hoạch có thể thực hiện được về mặt logistics và múi giờ
+
+QUAN TRỌNG VỀ ƯỚC LƯỢNG THỜI GIAN DI CHUYỂN:
+- TÍNH TOÁN DỰA TRÊN KHOẢNG CÁCH THỰC TẾ: Sử dụng khoảng cách địa lý và tốc độ di chuyển hợp lý
+- ĐI BỘ: ~5km/h trong thành phố, cộng thêm thời gian chờ đèn đỏ và đường cong
+- XE CỘ: Tùy traffic, giờ cao điểm có thể chậm hơn 2-3 lần so với bình thường
+- PHƯƠNG TIỆN CÔNG CỘNG: Bao gồm thời gian chờ, mua vé, di chuyển đến điểm dừng
+- MÁY BAY: Thời gian bay thực tế + thời gian sân bay (check-in, security, boarding, lấy hành lý)
+- TÀU/XE BUÝT LIÊN THÀNH PHỐ: Tra cứu lịch trình thực tế, cộng thời gian lên/xuống phương tiện
+- THỜI GIAN DỰ PHÒNG: Cộng thêm 15-30 phút cho các yếu tố bất ngờ (traffic, thời tiết, nghỉ ngơi)
+- CẬP NHẬT THEO THỜI GIAN THỰC: Xem xét điều kiện traffic hiện tại, mùa vụ, giờ cao điểm
+
+QUAN TRỌNG VỀ LỰA CHỌN PHƯƠNG TIỆN DI CHUYỂN THEO KHOẢNG CÁCH:
+- ĐÁNH GIÁ KHOẢNG CÁCH: Tính toán khoảng cách địa lý giữa các điểm đến để chọn phương tiện phù hợp
+- KHOẢNG CÁCH NGẮN (< 5km): Đi bộ, xe đạp, xe máy, taxi/Grab - ưu tiên đi bộ nếu thời tiết thuận lợi
+- KHOẢNG CÁCH TRUNG BÌNH (5-50km): Xe buýt, tàu điện ngầm, taxi, xe thuê - cân nhắc thời gian và chi phí
+- KHOẢNG CÁCH DÀI (50-500km): Tàu hỏa, máy bay nội địa - ưu tiên máy bay nếu muốn nhanh, tàu nếu muốn tiết kiệm
+- KHOẢNG CÁCH RẤT DÀI (>500km): Máy bay quốc tế - thường là lựa chọn duy nhất thực tế
+- CÂN NHẮC YẾU TỐ: Thời gian, chi phí, tiện nghi, sở thích người dùng, điều kiện thời tiết, giờ cao điểm
+- ƯU TIÊN PHƯƠNG TIỆN NGƯỜI DÙNG CHỌN: Nếu người dùng chỉ định phương tiện cụ thể, ưu tiên phương tiện đó nhưng vẫn xem xét tính thực tế
+
+QUAN TRỌNG VỀ PHƯƠNG TIỆN DI CHUYỂN CỤ THỂ:
+- BAY: Sử dụng lịch bay thực tế (Vietnam Airlines, VietJet, Bamboo Airways) - phù hợp cho >50km
+- TÀU: Ga Sapa, Hà Nội, Đà Nẵng, Hồ Chí Minh - phù hợp cho 100-800km, tiết kiệm và thoải mái
+- XE BUÝT: The Sinh Tourist, Sapaco Tourist, Kumho Samco - phù hợp cho 5-200km, giá rẻ
+- XE Ô TÔ/XE MÁY: Thuê xe hoặc Grab - phù hợp cho <50km trong thành phố
+- KHÔNG sáng tạo lịch trình không tồn tại - chỉ đề xuất phương tiện có thực tại điểm đến
+
+QUAN TRỌNG VỀ ƯỚC LƯỢNG CHI PHÍ THỰC TẾ:
+- NGHIÊN CỨU GIÁ THỰC TẾ: Sử dụng kiến thức cập nhật về giá cả tại điểm đến cụ thể
+- ĐIỀU CHỈNH THEO QUỐC GIA: Sử dụng đơn vị tiền tệ phù hợp (VND ở VN, USD ở Mỹ, EUR ở châu Âu, etc.)
+- PHÙ HỢP VỚI MỨC ĐỘ SANG TRỌNG: Budget (tiết kiệm), Mid-range (trung cấp), Luxury (sang trọng) (tính toán dựa trên total budget và số người)
+- CẬP NHẬT THEO THỜI GIAN: Giá có thể thay đổi theo mùa, sự kiện đặc biệt
+
+QUAN TRỌNG VỀ ĐỊA CHỈ VÀ ĐỘ DÀI, với mỗi hoạt động:
+- address: địa chỉ đầy đủ để định tuyến trên bản đồ (địa điểm, đường, phường/xã, quận/huyện, tỉnh/thành, mã bưu chính, quốc gia)
+- coordinates: tọa độ GPS thực tế "latitude,longitude" (ví dụ "11.9404,108.4583"), không để trống
+- description: ngắn gọn, 1-2 câu; recommendations và tips: tối đa 5 mục mỗi loại
+
+Cấu trúc JSON phải bao gồm:
+{{
+    "trip_info": {{
+        "name": "Tên chuyến đi",
+        "destination": "Điểm đến",
+        "start_date": "YYYY-MM-DD",
+        "end_date": "YYYY-MM-DD",
+        "duration_days": số,
+        "travelers_count": số,
+        "total_budget": số,
+        "currency": "VND",
+        "starting_point": "Điểm khởi hành từ yêu cầu người dùng"
+    }},
+    "daily_plans": [
+        {{
+            "day": số,
+            "date": "YYYY-MM-DD",
+            "activities": [
+                {{
+                    "title": "Tên hoạt động",
+                    "description": "Mô tả chi tiết với thông tin di chuyển từ điểm trước",
+                    "start_time": "HH:MM",
+                    "duration_hours": số,
+                    "activity_type": "activity|restaurant|lodging|flight|tour",
+                    "estimated_cost": số,
+                    "location": "Tên địa điểm",
+                    "address": "Địa chỉ đầy đủ cho bản đồ (đường, quận/huyện, thành phố)",
+                    "coordinates": "Tọa độ GPS (latitude,longitude) nếu có thể",
+                    "travel_from_previous": "Mô tả cách di chuyển từ hoạt động trước với thời gian thực tế"
+                }}
+            ]
+        }}
+    ],
+    "summary": {{
+        "total_estimated_cost": số,
+        "recommendations": ["Lời khuyên hữu ích về logistics và di chuyển với thông tin thực tế"],
+        "tips": ["Mẹo du lịch và tối ưu hóa đường đi dựa trên kinh nghiệm thực tế"]
+    }}
+}}
+
+Lưu ý:
+- Thời gian bắt đầu tính từ ngày hiện tại + 7 ngày
+- Chi phí tính bằng VND
+- Hoạt động phải đa dạng và thực tế
+- Bao gồm ăn uống, di chuyển, tham quan, nghỉ ngơi
+- SỬ DỤNG THÔNG TIN PHƯƠNG TIỆN DI CHUYỂN THỰC TẾ, không bịa đặt
+- ĐẶC BIỆT CHÚ Ý đến điểm khởi hành và sắp xếp hoạt động theo thứ tự địa lý hợp lý
+
+Trả về CHỈ JSON, không có text khác.
+"""
+
+TRIP_PLAN_HUMAN_TEMPLATE = "Hãy lên kế hoạch du lịch cho yêu cầu sau: {prompt}"
+
+TRIP_PLAN_PROMPT = get_default_prompt(TRIP_PLAN_SYSTEM_PROMPT, TRIP_PLAN_HUMAN_TEMPLATE)
+
+# Variants used while Gemini holds the static system prompt in its context
+# cache: the request references the cache by name and carries only the volatile
+# part as the human turn (Gemini rejects a system instruction alongside cached
+# content).
+EDIT_PLAN_CACHED_PROMPT = ChatPromptTemplate.from_messages([
+    ("human", EDIT_PLAN_CONTEXT_TEMPLATE + "\n" + EDIT_PLAN_HUMAN_TEMPLATE)
+])
+TRIP_PLAN_CACHED_PROMPT = ChatPromptTemplate.from_messages([
+    ("human", TRIP_PLAN_HUMAN_TEMPLATE)
+])
+
+# kind -> (rendered static system prompt, full prompt, cached-content prompt)
+_CACHEABLE_PROMPTS = {
+    "edit-plan": (EDIT_PLAN_STATIC_PROMPT.format(), EDIT_PLAN_PROMPT, EDIT_PLAN_CACHED_PROMPT),
+    "generate-trip-plan": (TRIP_PLAN_SYSTEM_PROMPT.format(), TRIP_PLAN_PROMPT, TRIP_PLAN_CACHED_PROMPT),
+}
+
+# Composed chains keyed by (kind, context cache name); a chain is built once
+# per cache generation instead of on every request
+_plan_chains: LRUCache = LRUCache(maxsize=16)
+
+def get_plan_chain(kind: str) -> Tuple[Runnable, Optional[str]]:
+    """
+    Builds the prompt | model chain for a plan endpoint.
+
+    Uses the Gemini context cache for the static system prompt when one is
+    live, and the full prompt otherwise.
+
+    Args:
+        kind (str): "edit-plan" or "generate-trip-plan".
+
+    Returns:
+        Tuple[Runnable, Optional[str]]: The chain, and the cached system prompt
+            text if the chain references the context cache (so the caller can
+            invalidate it if Gemini rejects the request), else None.
+    """
+    system_text, full_prompt, cached_prompt = _CACHEABLE_PROMPTS[kind]
+    cache_name = system_prompt_cache.get(kind, system_text)
+    chain = _plan_chains.get((kind, cache_name))
+    if chain is None:
+        if cache_name is None:
+            chain = full_prompt | _JSON_LLM
+        else:
+            chain = cached_prompt | _JSON_LLM.bind(cached_content=cache_name)
+        _plan_chains[(kind, cache_name)] = chain
+    return chain, (system_text if cache_name else None)
+
+# Prefixes used when rendering conversation history into the /edit-plan context
+_ROLE_PREFIX = {"user": "User: ", "assistant": "Assistant: "}
+
+# Conversation history window for /edit-plan. Rather than sliding the last N
+# messages forward by one on every turn (which changes the whole context block
+# each request), the window start stays fixed per trip and the window grows
+# until it reaches HISTORY_WINDOW_MAX, then jumps forward to keep the latest
+# HISTORY_WINDOW_MIN messages. Consecutive turns therefore share the same
+# context prefix. The offsets are kept per worker process, together with the
+# history length and the message at the offset, so a different conversation
+# for the same trip (a collaborator's, or a cleared chat) starts over.
+HISTORY_WINDOW_MIN = 10
+HISTORY_WINDOW_MAX = 20
+# trip_id -> (window start, history length, (role, content) at the start)
+_history_window_start: LRUCache = LRUCache(maxsize=4096)
+
+def _window_anchor(history: List["Message"], start: int) -> Optional[Tuple[str, str]]:
+    """The message a window starts at, used to recognise the same conversation on the next turn."""
+    return (history[start].role, history[start].content) if start < len(history) else None
+
+def get_history_window(trip_id: str, history: List["Message"]) -> List["Message"]:
+    """
+    Returns the slice of conversation history to send as context for a trip.
+
+    Args:
+        trip_id (str): The trip whose window offset should be used.
+        history (List[Message]): The full conversation history from the client.
+
+    Returns:
+        List[Message]: The messages from the current window start onwards.
+    """
+    start, seen_length, anchor = _history_window_start.get(trip_id, (0, 0, None))
+    if len(history) < seen_length or _window_anchor(history, start) != anchor:
+        # Not the conversation the window was started on; begin a fresh window
+        start = 0
+    if len(history) - start >= HISTORY_WINDOW_MAX:
+        start = len(history) - HISTORY_WINDOW_MIN
+    _history_window_start[trip_id] = (start, len(history), _window_anchor(history, start))
+    return history[start:]
+
+# Concurrent plan requests with the same response cache key (e.g. a user
+# retrying before the first answer arrived) wait on one model call
+plan_requests = SingleFlight()
+
 # Define the request body model
 class InvokeRequest(BaseModel):
     """
@@ -34,6 +396,24 @@ class InvokeRequest(BaseModel):
     input: str
     history: List[Dict[str, str]] = []
 
+# Bounds checked while the request body is parsed, so oversized histories are
+# rejected by pydantic-core before any of it reaches the handler. Only the last
+# HISTORY_WINDOW_MAX messages are ever sent to the model; the cap leaves room for
+# the whole chat the app keeps on screen.
+MAX_HISTORY_MESSAGES = 200
+MAX_MESSAGE_CHARS = 4000
+
+class Message(BaseModel):
+    """
+    One conversation history message sent with a plan edit.
+
+    Attributes:
+        role (str): Who sent the message, "user" or "assistant".
+        content (str): The message text, at most MAX_MESSAGE_CHARS characters.
+    """
+    role: Literal["user", "assistant"] = "user"
+    content: Annotated[str, StringConstraints(max_length=MAX_MESSAGE_CHARS)] = ""
+
 # Define the request body model for plan editing
 class PlanEditRequest(BaseModel):
     """
@@ -42,11 +422,14 @@ class PlanEditRequest(BaseModel):
     Attributes:
         command (str): The user's command describing how to modify the plan.
         trip_id (str): The unique identifier of the trip to edit.
-        conversation_history (List[Dict[str, str]]): Recent chat history for context.
+        conversation_history (List[Message]): Recent chat history for context,
+            at most MAX_HISTORY_MESSAGES messages.
     """
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     command: str
     trip_id: str
-    conversation_history: List[Dict[str, str]] = []
+    conversation_history: Annotated[List[Message], Field(default_factory=list, max_length=MAX_HISTORY_MESSAGES)]
 
 # Define the request body model for trip planning
 class TripPlanRequest(BaseModel):
@@ -60,9 +443,65 @@ class TripPlanRequest(BaseModel):
     prompt: str
     user_id: Optional[str] = None
 
+RequestModel = TypeVar("RequestModel", bound=BaseModel)
+
+async def parse_request_body(http_request: Request, model: Type[RequestModel]) -> RequestModel:
+    """
+    Validates the raw request body against a request model in a single pass.
+
+    FastAPI's body dependency decodes the JSON with the stdlib parser before
+    handing a dict to Pydantic. `model_validate_json` lets pydantic-core parse
+    and validate the bytes directly, skipping the intermediate dict.
+
+    Args:
+        http_request (Request): The incoming Starlette request.
+        model (Type[RequestModel]): The Pydantic model describing the body.
+
+    Returns:
+        RequestModel: The validated request body.
+
+    Raises:
+        RequestValidationError: If the body is not valid JSON or does not match
+            the model, so FastAPI answers with its usual 422 response.
+    """
+    try:
+        return model.model_validate_json(await http_request.body())
+    except ValidationError as e:
+        # Prefix locations with "body" to match FastAPI's own error format
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+def direct_json(endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Serializes an endpoint's dict result straight to an ORJSONResponse.
+
+    A plain dict returned from a route is first walked by FastAPI's
+    `jsonable_encoder`, which copies every nested value in Python before
+    orjson sees it. The plan responses are large JSON-native dicts, so they
+    are handed to orjson as-is. Responses that are already Response objects
+    (e.g. streams) pass through unchanged.
+
+    Args:
+        endpoint (Callable): The async route function.
+
+    Returns:
+        Callable: The wrapped route, with the same signature for FastAPI.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        result = await endpoint(*args, **kwargs)
+        return ORJSONResponse(result) if isinstance(result, dict) else result
+    return wrapper
+
 # Define the API endpoint for general AI queries
+# /invoke always answers with the same acknowledgment, so its body is encoded once
+_INVOKE_RESPONSE_BODY = orjson.dumps({
+    "summary": "AI: Tôi đã nhận được yêu cầu của bạn. Hãy sử dụng tính năng chỉnh sửa kế hoạch thông minh nếu bạn muốn thay đổi kế hoạch du lịch!"
+})
+
 @api.post("/invoke")
-async def invoke_workflow(request: InvokeRequest):
+async def invoke_workflow(http_request: Request):
     """
     General AI assistant endpoint for queries that don't involve plan modifications.
     
@@ -70,20 +509,20 @@ async def invoke_workflow(request: InvokeRequest):
     separately to the /edit-plan endpoint.
 
     Args:
-        request (InvokeRequest): The request payload containing user input.
+        http_request (Request): The raw request. Clients send an InvokeRequest
+            body, but the acknowledgment does not depend on it, so it is not read.
 
     Returns:
-        dict: A simple acknowledgment summary.
+        Response: A simple acknowledgment summary.
     """
-    user_input = request.input.strip()
-
     # For now, just return a simple acknowledgment
     # All intelligent plan modifications are handled by Gemini AI in /edit-plan
-    return {"summary": f"AI: Tôi đã nhận được yêu cầu của bạn. Hãy sử dụng tính năng chỉnh sửa kế hoạch thông minh nếu bạn muốn thay đổi kế hoạch du lịch!"}
+    return Response(content=_INVOKE_RESPONSE_BODY, media_type="application/json")
 
 # Define the plan editing endpoint with Gemini AI
 @api.post("/edit-plan")
-async def edit_plan(request: PlanEditRequest):
+@direct_json
+async def edit_plan(http_request: Request, stream: bool = False):
     """
     Handles intelligent plan editing using Gemini AI with conversation context.
 
@@ -92,186 +531,153 @@ async def edit_plan(request: PlanEditRequest):
     while maintaining the logic of the original plan.
 
     Args:
-        request (PlanEditRequest): The request payload with edit command and context.
+        http_request (Request): The raw request; its body is validated as a PlanEditRequest.
+        stream (bool, optional): When true, stream the new plan as NDJSON events
+            (see `stream_plan`). `?stream=0` (the default) keeps the single JSON response.
 
     Returns:
-        dict: A response indicating success/failure and containing the new plan data.
+        dict | StreamingResponse: A response indicating success/failure and containing the new plan data.
     """
+    request = await parse_request_body(http_request, PlanEditRequest)
     try:
-        command = request.command.strip()
-        trip_id = request.trip_id.strip()
+        command = request.command
+        trip_id = request.trip_id
         conversation_history = request.conversation_history
 
-        print(f"PLAN_EDIT: Processing command '{command}' for trip {trip_id}")
+        logger.info("PLAN_EDIT: Processing command '%s' for trip %s", command, trip_id)
 
         # Check if API key is configured
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "your-actual-gemini-api-key-here":
+        if _JSON_LLM is None:
             return {
                 "success": False,
                 "message": "Gemini API key chưa được cấu hình.",
                 "command": command
             }
 
-        # Use Gemini AI to process the plan modification request
-        from services.llm_utils import get_llm, get_default_prompt
-
-        llm = get_llm()
-
         # Build conversation context
-        context_messages = []
-        if conversation_history:
-            for msg in conversation_history[-10:]:  # Last 10 messages for context
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                if role == 'user':
-                    context_messages.append(f"User: {content}")
-                elif role == 'assistant':
-                    context_messages.append(f"Assistant: {content}")
-
-        context_str = "\n".join(context_messages) if context_messages else "No previous context"
-
-        system_message = f"""
-        Bạn là một chuyên gia lập kế hoạch du lịch thông minh. Nhiệm vụ của bạn là tạo ra một kế hoạch du lịch hoàn toàn mới dựa trên yêu cầu chỉnh sửa của người dùng.
-
-        QUY TẮC HOẠT ĐỘNG:
-        1. Khi người dùng muốn SỬA ĐỔI kế hoạch, hãy tạo HOÀN TOÀN kế hoạch mới thay thế kế hoạch cũ
-        2. KHÔNG thêm/bớt/xóa hoạt động cụ thể, mà tạo lại toàn bộ kế hoạch phù hợp với yêu cầu mới
-        3. Phân tích yêu cầu mới và tạo kế hoạch từ đầu với các hoạt động, thời gian, và chi phí mới
-
-        THÔNG TIN NGỮ CẢNH:
-        - ID chuyến đi: {trip_id}
-        - Lịch sử cuộc trò chuyện gần đây:
-        {context_str}
-
-        YÊU CẦU ĐẦU RA:
-        Tạo kế hoạch du lịch hoàn chỉnh mới với cấu trúc JSON chuẩn.
-        QUAN TRỌNG: Mỗi hoạt động PHẢI có địa chỉ CHI TIẾT, đầy đủ để có thể load trên bản đồ và route đường đi.
-        Địa chỉ phải bao gồm: tên địa điểm cụ thể, tên đường, phường/xã, quận/huyện, thành phố/tỉnh, mã bưu chính, quốc gia.
-        Ví dụ: "Ar Ti So, Hồ Tùng Mậu, Ấp Xuân An, Da Lat, Phường Xuân Hương - Đà Lạt, Lâm Đồng Province, 02633, Vietnam" thay vì chỉ "Phố cổ Hà Nội".
-        Tọa độ GPS PHẢI được cung cấp ở định dạng "latitude,longitude" với độ chính xác cao (ví dụ: "11.9404,108.4583" cho Đà Lạt).
-        KHÔNG được để trống hoặc dùng placeholder - PHẢI cung cấp tọa độ GPS thực tế và chính xác.
-
-        Cấu trúc JSON chuẩn:
-        {{
-            "action_type": "full_replace",
-            "message": "Đã tạo kế hoạch mới dựa trên yêu cầu của bạn",
-            "new_plan": {{
-                "trip_info": {{
-                    "name": "Tên chuyến đi mới",
-                    "destination": "Điểm đến",
-                    "start_date": "YYYY-MM-DD",
-                    "end_date": "YYYY-MM-DD",
-                    "duration_days": số,
-                    "travelers_count": số,
-                    "total_budget": số,
-                    "currency": "VND"
-                }},
-                "daily_plans": [
-                    {{
-                        "day": số,
-                        "date": "YYYY-MM-DD",
-                        "activities": [
-                            {{
-                                "title": "Tên hoạt động",
-                                "description": "Mô tả chi tiết",
-                                "start_time": "HH:MM",
-                                "duration_hours": số,
-                                "activity_type": "activity|restaurant|lodging|flight|tour",
-                            "estimated_cost": số,
-                            "location": "Tên địa điểm",
-                            "address": "Địa chỉ đầy đủ cho bản đồ (đường, quận/huyện, thành phố)",
-                            "coordinates": "Tọa độ GPS (latitude,longitude) nếu có thể"
-                            }}
-                        ]
-                    }}
-                ],
-                "summary": {{
-                    "total_estimated_cost": số,
-                    "recommendations": ["Lời khuyên"],
-                    "tips": ["Mẹo du lịch"]
-                }}
-            }}
-        }}
-
-        QUAN TRỌNG:
-        - Luôn trả về action_type: "full_replace"
-        - Tạo HOÀN TOÀN kế hoạch mới, không phải chỉnh sửa cục bộ
-        - Thời gian bắt đầu tính từ ngày hiện tại + 7 ngày
-        - Chi phí tính bằng VND
-        - Hoạt động phải đa dạng và thực tế
-
-        CHỈ TRẢ VỀ JSON, KHÔNG CÓ TEXT KHÁC.
-        """
-
-        human_message = f"Yêu cầu chỉnh sửa kế hoạch của người dùng: {command}"
-
-        chat_prompt = get_default_prompt(system_message, human_message)
-        chain = chat_prompt | llm
-
-        try:
-            print(f"Calling Gemini API for full plan replacement")
-            response = chain.invoke({})
-            print(f"Gemini API call successful for full plan replacement")
-        except Exception as api_error:
-            print(f"Gemini API error: {api_error}")
-            return {
-                "success": False,
-                "message": f"Lỗi gọi Gemini API: {str(api_error)}",
-                "command": command
-            }
+        recent_history = get_history_window(trip_id, conversation_history)
+        context_str = "\n".join([
+            _ROLE_PREFIX[msg.role] + msg.content for msg in recent_history
+        ]) or "No previous context"
+
+        # Return the stored plan if this exact request was answered before
+        cache_key = response_cache.make_key("edit-plan", command, trip_id, recent_history)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("PLAN_EDIT: Cache hit for trip %s", trip_id)
+            if stream:
+                return _ndjson_response(cached)
+            return {**cached, "cache_hit": True}
+
+        variables = {
+            "trip_id": trip_id,
+            "context_str": context_str,
+            "command": command
+        }
 
-        # Parse the JSON response
-        try:
-            response_text = response.content.strip()
-
-            # Find JSON in the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                result = json.loads(json_str)
-
-                action_type = result.get('action_type', 'full_replace')
-                message = result.get('message', 'Đã tạo kế hoạch mới')
-                new_plan = result.get('new_plan', {})
-
-                # Validate the new plan structure
-                if not new_plan or 'trip_info' not in new_plan or 'daily_plans' not in new_plan:
-                    raise ValueError("Invalid new plan structure")
-
-                return {
-                    "success": True,
-                    "action_type": action_type,
-                    "message": message,
-                    "new_plan": new_plan,
-                    "command": command,
-                    "trip_id": trip_id
-                }
-            else:
-                raise ValueError("No JSON found in response")
-
-        except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
+        def build_response(result: Dict[str, Any]) -> Dict[str, Any]:
             return {
-                "success": False,
-                "message": f"Không thể phân tích kế hoạch mới: {str(e)}",
+                "success": True,
+                "action_type": result.get('action_type', 'full_replace'),
+                "message": result.get('message', 'Đã tạo kế hoạch mới'),
+                "new_plan": result['new_plan'],
                 "command": command,
-                "raw_response": response.content
+                "trip_id": trip_id
             }
 
+        if stream:
+            return _ndjson_response(stream_plan(
+                "edit-plan", variables, validate_edit_plan, build_response, cache_key
+            ))
+
+        async def generate() -> Dict[str, Any]:
+            chain, cached_text = get_plan_chain("edit-plan")
+            logger.info("Calling Gemini API for full plan replacement")
+            ok, result, raw = await run_llm_json(chain.ainvoke(variables), "kế hoạch mới", validate_edit_plan)
+            if not ok:
+                if cached_text and not raw:
+                    # The call itself failed; stop relying on the context cache
+                    system_prompt_cache.invalidate(cached_text)
+                error_data = {"success": False, "message": result, "command": command}
+                return {**error_data, "raw_response": raw} if raw else error_data
+
+            response_data = build_response(result)
+            response_cache.set(cache_key, response_data)
+            return {**response_data, "cache_hit": False}
+
+        # Identical edits already waiting on Gemini share that call
+        return await plan_requests.run(cache_key, generate)
+
     except Exception as e:
-        print(f"PLAN_EDIT_ERROR: {e}")
+        logger.exception("PLAN_EDIT_ERROR: %s", e)
         return {
             "success": False,
             "message": f"Có lỗi xảy ra khi tạo kế hoạch mới: {str(e)}",
             "command": command
         }
 
+def _ndjson_line(event: Dict[str, Any]) -> bytes:
+    """Encodes one event as a newline-delimited JSON line."""
+    return orjson.dumps(event) + b"\n"
+
+async def stream_plan(
+    kind: str,
+    variables: Dict[str, Any],
+    validate: Callable[[Any], Any],
+    build_response: Callable[[Any], Dict[str, Any]],
+    cache_key: str,
+) -> AsyncIterator[bytes]:
+    """
+    Streams a plan from Gemini as NDJSON events.
+
+    Emits a `trip_info` event and one `day` event per element of
+    `daily_plans` as soon as each is complete in the model output, then a
+    final `done` event shaped like the non-streaming response (or an `error`
+    event if the call, the JSON or the schema check fails).
+
+    Args:
+        kind (str): "edit-plan" or "generate-trip-plan".
+        variables (Dict[str, Any]): The prompt template variables.
+        validate (Callable): Schema validator for the parsed reply.
+        build_response (Callable): Turns the parsed reply into the response body.
+        cache_key (str): Response cache key under which to store the final response.
+
+    Yields:
+        bytes: One encoded NDJSON line per event.
+    """
+    parser = PlanStreamParser()
+    chain, cached_text = get_plan_chain(kind)
+    try:
+        async for chunk in chain.astream(variables):
+            for event, data in parser.feed(chunk.content):
+                yield _ndjson_line({"type": event, "data": data})
+        result = parse_json_response(parser.buffer)
+        validate(result)
+        response_data = build_response(result)
+    except Exception as e:
+        logger.exception("PLAN_STREAM_ERROR (%s): %s", kind, e)
+        if cached_text and not parser.buffer:
+            system_prompt_cache.invalidate(cached_text)
+        yield _ndjson_line({
+            "type": "error",
+            "success": False,
+            "message": f"Có lỗi xảy ra khi tạo kế hoạch: {str(e)}"
+        })
+        return
+
+    response_cache.set(cache_key, response_data)
+    yield _ndjson_line({"type": "done", **response_data, "cache_hit": False})
+
+def _ndjson_response(body: Any) -> StreamingResponse:
+    """Wraps an NDJSON event iterator (or one cached event) in a streaming response."""
+    if isinstance(body, dict):
+        body = iter([_ndjson_line({"type": "done", **body, "cache_hit": True})])
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
 # Define the trip planning endpoint
 @api.post("/generate-trip-plan")
-async def generate_trip_plan(request: TripPlanRequest):
+@direct_json
+async def generate_trip_plan(http_request: Request, stream: bool = False):
     """
     Generates a complete trip plan based on user prompt using AI.
     
@@ -279,201 +685,103 @@ async def generate_trip_plan(request: TripPlanRequest):
     itinerary, including logistics, estimated costs, and specific addresses.
 
     Args:
-        request (TripPlanRequest): The request payload containing the trip prompt.
+        http_request (Request): The raw request; its body is validated as a TripPlanRequest.
+        stream (bool, optional): When true, stream the plan as NDJSON events
+            (see `stream_plan`) instead of returning it in one response.
+            `?stream=0` (the default) keeps the single JSON response.
 
     Returns:
-        dict: A structured JSON trip plan or an error message.
+        dict | StreamingResponse: A structured JSON trip plan or an error message.
     """
+    request = await parse_request_body(http_request, TripPlanRequest)
     try:
-        from services.llm_utils import get_llm, get_default_prompt
-
         prompt = request.prompt.strip()
         user_id = request.user_id
 
-        print(f"TRIP_PLAN: Generating plan for prompt: '{prompt}'")
+        logger.info("TRIP_PLAN: Generating plan for prompt: '%s'", prompt)
 
         # Check if API key is configured
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key or api_key == "your-actual-gemini-api-key-here":
+        if _JSON_LLM is None:
             return {
                 "success": False,
                 "message": "Gemini API key chưa được cấu hình. Vui lòng thêm GOOGLE_API_KEY vào file .env"
             }
 
-        # Use Gemini to generate comprehensive trip plan
-        llm = get_llm()
-
-        system_message = """
-        Bạn là một chuyên gia lên kế hoạch du lịch chuyên nghiệp với kiến thức thực tế về Việt Nam. Nhiệm vụ của bạn là tạo ra một kế hoạch du lịch hoàn chỉnh và chi tiết dựa trên yêu cầu của người dùng.
-
-        Yêu cầu đầu ra:
-        1. Phân tích yêu cầu và trích xuất thông tin chính (điểm đến, thời gian, số người, ngân sách, ĐIỂM KHỞI HÀNH, PHƯƠNG TIỆN DI CHUYỂN ƯA THÍCH)
-        2. Tạo kế hoạch chi tiết cho từng ngày với các hoạt động cụ thể THEO TRẬT TỰ ĐỊA LÝ LOGIC
-        3. Ước tính chi phí cho từng hoạt động và tổng cộng
-        4. Gợi ý phương tiện di chuyển và chỗ ở phù hợp
-        5. Trả về JSON với cấu trúc chuẩn để ứng dụng có thể import
-
-        QUAN TRỌNG VỀ TỔ CHỨC ĐƯỜNG ĐI:
-        - XÁC ĐỊNH ĐIỂM KHỞI HÀNH từ yêu cầu người dùng (ví dụ: ga xe lửa Hồ Chí Minh, sân bay, nhà ga...)
-        - XÁC ĐỊNH MÚI GIỜ: Tự động xác định múi giờ của điểm khởi hành và điểm đến (ví dụ: VN UTC+7, Mỹ UTC-5, châu Âu UTC+1)
-        - CHUYỂN ĐỔI THỜI GIAN: Điều chỉnh giờ khởi hành và hoạt động theo múi giờ địa phương
-        - XỬ LÝ JET LAG: Cân nhắc thời gian bay dài và hiệu ứng jet lag khi lên lịch hoạt động
-        - SẮP XẾP HOẠT ĐỘNG THEO MÚI GIỜ: Đảm bảo giờ hoạt động hợp lý theo thời gian địa phương
-        - TÍNH TOÁN THỜI GIAN DI CHUYỂN THỰC TẾ: Sử dụng khoảng cách địa lý và phương tiện để ước lượng chính xác
-        - TRÁNH nhảy cóc giữa các địa điểm xa xôi không hợp lý
-        - ĐẢM BẢO kế hoạch có thể thực hiện được về mặt logistics và múi giờ
-
-        QUAN TRỌNG VỀ ƯỚC LƯỢNG THỜI GIAN DI CHUYỂN:
-        - TÍNH TOÁN DỰA TRÊN KHOẢNG CÁCH THỰC TẾ: Sử dụng khoảng cách địa lý và tốc độ di chuyển hợp lý
-        - ĐI BỘ: ~5km/h trong thành phố, cộng thêm thời gian chờ đèn đỏ và đường cong
-        - XE CỘ: Tùy traffic, giờ cao điểm có thể chậm hơn 2-3 lần so với bình thường
-        - PHƯƠNG TIỆN CÔNG CỘNG: Bao gồm thời gian chờ, mua vé, di chuyển đến điểm dừng
-        - MÁY BAY: Thời gian bay thực tế + thời gian sân bay (check-in, security, boarding, lấy hành lý)
-        - TÀU/XE BUÝT LIÊN THÀNH PHỐ: Tra cứu lịch trình thực tế, cộng thời gian lên/xuống phương tiện
-        - THỜI GIAN DỰ PHÒNG: Cộng thêm 15-30 phút cho các yếu tố bất ngờ (traffic, thời tiết, nghỉ ngơi)
-        - CẬP NHẬT THEO THỜI GIAN THỰC: Xem xét điều kiện traffic hiện tại, mùa vụ, giờ cao điểm
-
-        QUAN TRỌNG VỀ LỰA CHỌN PHƯƠNG TIỆN DI CHUYỂN THEO KHOẢNG CÁCH:
-        - ĐÁNH GIÁ KHOẢNG CÁCH: Tính toán khoảng cách địa lý giữa các điểm đến để chọn phương tiện phù hợp
-        - KHOẢNG CÁCH NGẮN (< 5km): Đi bộ, xe đạp, xe máy, taxi/Grab - ưu tiên đi bộ nếu thời tiết thuận lợi
-        - KHOẢNG CÁCH TRUNG BÌNH (5-50km): Xe buýt, tàu điện ngầm, taxi, xe thuê - cân nhắc thời gian và chi phí
-        - KHOẢNG CÁCH DÀI (50-500km): Tàu hỏa, máy bay nội địa - ưu tiên máy bay nếu muốn nhanh, tàu nếu muốn tiết kiệm
-        - KHOẢNG CÁCH RẤT DÀI (>500km): Máy bay quốc tế - thường là lựa chọn duy nhất thực tế
-        - CÂN NHẮC YẾU TỐ: Thời gian, chi phí, tiện nghi, sở thích người dùng, điều kiện thời tiết, giờ cao điểm
-        - ƯU TIÊN PHƯƠNG TIỆN NGƯỜI DÙNG CHỌN: Nếu người dùng chỉ định phương tiện cụ thể, ưu tiên phương tiện đó nhưng vẫn xem xét tính thực tế
-
-        QUAN TRỌNG VỀ PHƯƠNG TIỆN DI CHUYỂN CỤ THỂ:
-        - BAY: Sử dụng lịch bay thực tế (Vietnam Airlines, VietJet, Bamboo Airways) - phù hợp cho >50km
-        - TÀU: Ga Sapa, Hà Nội, Đà Nẵng, Hồ Chí Minh - phù hợp cho 100-800km, tiết kiệm và thoải mái
-        - XE BUÝT: The Sinh Tourist, Sapaco Tourist, Kumho Samco - phù hợp cho 5-200km, giá rẻ
-        - XE Ô TÔ/XE MÁY: Thuê xe hoặc Grab - phù hợp cho <50km trong thành phố
-        - KHÔNG sáng tạo lịch trình không tồn tại - chỉ đề xuất phương tiện có thực tại điểm đến
-
-        QUAN TRỌNG VỀ ƯỚC LƯỢNG CHI PHÍ THỰC TẾ:
-        - NGHIÊN CỨU GIÁ THỰC TẾ: Sử dụng kiến thức cập nhật về giá cả tại điểm đến cụ thể
-        - ĐIỀU CHỈNH THEO QUỐC GIA: Sử dụng đơn vị tiền tệ phù hợp (VND ở VN, USD ở Mỹ, EUR ở châu Âu, etc.)
-        - PHÙ HỢP VỚI MỨC ĐỘ SANG TRỌNG: Budget (tiết kiệm), Mid-range (trung cấp), Luxury (sang trọng) (tính toán dựa trên total budget và số người)
-        - CẬP NHẬT THEO THỜI GIAN: Giá có thể thay đổi theo mùa, sự kiện đặc biệt
-
-        QUAN TRỌNG VỀ ĐỊA CHỈ: Mỗi hoạt động PHẢI có địa chỉ CHI TIẾT, đầy đủ để có thể load trên bản đồ và route đường đi.
-        Địa chỉ phải bao gồm: tên địa điểm cụ thể, tên đường, phường/xã, quận/huyện, thành phố/tỉnh, mã bưu chính, quốc gia.
-        Ví dụ: "Ar Ti So, Hồ Tùng Mậu, Ấp Xuân An, Da Lat, Phường Xuân Hương - Đà Lạt, Lâm Đồng Province, 02633, Vietnam" thay vì chỉ "Phố cổ Hà Nội".
-        Tọa độ GPS PHẢI được cung cấp ở định dạng "latitude,longitude" với độ chính xác cao (ví dụ: "11.9404,108.4583" cho Đà Lạt).
-        KHÔNG được để trống hoặc dùng placeholder - PHẢI cung cấp tọa độ GPS thực tế và chính xác.
-
-        Cấu trúc JSON phải bao gồm:
-        {{
-            "trip_info": {{
-                "name": "Tên chuyến đi",
-                "destination": "Điểm đến",
-                "start_date": "YYYY-MM-DD",
-                "end_date": "YYYY-MM-DD",
-                "duration_days": số,
-                "travelers_count": số,
-                "total_budget": số,
-                "currency": "VND",
-                "starting_point": "Điểm khởi hành từ yêu cầu người dùng"
-            }},
-            "daily_plans": [
-                {{
-                    "day": số,
-                    "date": "YYYY-MM-DD",
-                    "activities": [
-                        {{
-                            "title": "Tên hoạt động",
-                            "description": "Mô tả chi tiết với thông tin di chuyển từ điểm trước",
-                            "start_time": "HH:MM",
-                            "duration_hours": số,
-                            "activity_type": "activity|restaurant|lodging|flight|tour",
-                            "estimated_cost": số,
-                            "location": "Tên địa điểm",
-                            "address": "Địa chỉ đầy đủ cho bản đồ (đường, quận/huyện, thành phố)",
-                            "coordinates": "Tọa độ GPS (latitude,longitude) nếu có thể",
-                            "travel_from_previous": "Mô tả cách di chuyển từ hoạt động trước với thời gian thực tế"
-                        }}
-                    ]
-                }}
-            ],
-            "summary": {{
-                "total_estimated_cost": số,
-                "recommendations": ["Lời khuyên hữu ích về logistics và di chuyển với thông tin thực tế"],
-                "tips": ["Mẹo du lịch và tối ưu hóa đường đi dựa trên kinh nghiệm thực tế"]
-            }}
-        }}
+        # Return the stored plan if this exact prompt was answered before
+        cache_key = response_cache.make_key("generate-trip-plan", prompt)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("TRIP_PLAN: Cache hit for prompt: '%s'", prompt)
+            if stream:
+                return _ndjson_response(cached)
+            return {**cached, "cache_hit": True}
 
-        Lưu ý:
-        - Thời gian bắt đầu tính từ ngày hiện tại + 7 ngày
-        - Chi phí tính bằng VND
-        - Hoạt động phải đa dạng và thực tế
-        - Bao gồm ăn uống, di chuyển, tham quan, nghỉ ngơi
-        - SỬ DỤNG THÔNG TIN PHƯƠNG TIỆN DI CHUYỂN THỰC TẾ, không bịa đặt
-        - ĐẶC BIỆT CHÚ Ý đến điểm khởi hành và sắp xếp hoạt động theo thứ tự địa lý hợp lý
-
-        Trả về CHỈ JSON, không có text khác.
-        """
-
-        human_message = f"Hãy lên kế hoạch du lịch cho yêu cầu sau: {prompt}"
-
-        chat_prompt = get_default_prompt(system_message, human_message)
-        chain = chat_prompt | llm
-
-        # Get AI response with timeout
-        try:
-            print(f"Calling Gemini API with model: {os.getenv('LLM_MODEL', 'gemini-2.5-flash')}")
-            print(f"API Key configured: {bool(os.getenv('GOOGLE_API_KEY'))}")
-            response = chain.invoke({})
-            print(f"Gemini API call successful")
-        except Exception as api_error:
-            print(f"Gemini API error details: {api_error}")
-            print(f"Error type: {type(api_error)}")
+        def build_response(trip_plan: Dict[str, Any]) -> Dict[str, Any]:
             return {
-                "success": False,
-                "message": f"Lỗi gọi Gemini API: {str(api_error)}. Vui lòng kiểm tra API key và model."
+                "success": True,
+                "trip_plan": trip_plan,
+                "message": "Đã tạo kế hoạch du lịch thành công!"
             }
 
-        # Parse the JSON response
-        try:
-            # Extract JSON from the response
-            response_text = response.content.strip()
-
-            # Find JSON in the response (might be wrapped in text)
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                trip_plan = json.loads(json_str)
-
-                # Validate required fields
-                if "trip_info" not in trip_plan or "daily_plans" not in trip_plan:
-                    raise ValueError("Invalid trip plan structure")
-
-                return {
-                    "success": True,
-                    "trip_plan": trip_plan,
-                    "message": "Đã tạo kế hoạch du lịch thành công!"
-                }
-            else:
-                raise ValueError("No JSON found in response")
-
-        except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
-            return {
-                "success": False,
-                "message": f"Không thể phân tích kế hoạch du lịch: {str(e)}",
-                "raw_response": response.content
-            }
+        if stream:
+            return _ndjson_response(stream_plan(
+                "generate-trip-plan", {"prompt": prompt}, validate_trip_plan, build_response, cache_key
+            ))
+
+        async def generate() -> Dict[str, Any]:
+            chain, cached_text = get_plan_chain("generate-trip-plan")
+            logger.info("Calling Gemini API with model: %s", _LLM_MODEL)
+            ok, result, raw = await run_llm_json(chain.ainvoke({"prompt": prompt}), "kế hoạch du lịch", validate_trip_plan)
+            if not ok:
+                if cached_text and not raw:
+                    # The call itself failed; stop relying on the context cache
+                    system_prompt_cache.invalidate(cached_text)
+                error_data = {"success": False, "message": result}
+                return {**error_data, "raw_response": raw} if raw else error_data
+
+            response_data = build_response(result)
+            response_cache.set(cache_key, response_data)
+            return {**response_data, "cache_hit": False}
+
+        # Identical prompts already waiting on Gemini share that call
+        return await plan_requests.run(cache_key, generate)
 
     except Exception as e:
-        print(f"❌ TRIP_PLAN_ERROR: {e}")
+        logger.exception("TRIP_PLAN_ERROR: %s", e)
         return {
             "success": False,
             "message": f"Có lỗi xảy ra khi tạo kế hoạch: {str(e)}"
         }
 
+@api.get("/debug/cache")
+@direct_json
+async def cache_stats():
+    """
+    Reports response cache usage for this worker.
+
+    Returns:
+        dict: Size, capacity and hit and miss counters, plus how
+            many requests joined an identical in-flight call.
+    """
+    return {**response_cache.stats(), "inflight": len(plan_requests), "inflight_shared": plan_requests.shared}
+
 # No longer need helper functions - Gemini AI handles all plan modifications
 
 # To run this API, use the command:
-# uvicorn main:api --reload
+# uvicorn main:api --reload --loop uvloop --http httptools
+# The endpoints await the LLM asynchronously; requests are additionally spread
+# across CPU cores by running one worker process per core (override with
+# WEB_CONCURRENCY). The app must be passed as an import string for workers > 1.
+# Caches (responses, history windows) are per worker. uvloop and httptools
+# (installed with uvicorn[standard]) replace the stdlib event loop and HTTP parser.
+# The per-request access log is off; the endpoints log what they handle.
 if __name__ == "__main__":
-    uvicorn.run(api, host="0.0.0.0", port=5000)
+    uvicorn.run(
+        "main:api",
+        host="0.0.0.0",
+        port=5000,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+    )
@@ -1,15 +1,22 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 import re
 
-from pydantic import BaseModel, Field, field_validator, ValidationError
+from pydantic import BaseModel, Field, SkipValidation, model_validator, ValidationError
 
 
 # Valid currency codes (ISO 4217)
-VALID_CURRENCIES = {
+VALID_CURRENCIES = frozenset({
     'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'CNY', 'INR', 'KRW',
     'BRL', 'MXN', 'RUB', 'ZAR', 'SGD', 'HKD', 'NOK', 'SEK', 'DKK', 'PLN',
     'TRY', 'THB', 'MYR', 'IDR', 'PHP', 'VND', 'TWD', 'SAR', 'AED', 'ILS'
-}
+})
+
+
+# Fields that may arrive as JSON numbers: (field, description, accepted types)
+_NUMERIC_INPUTS = (
+    ('budget', 'number', (int, float)),
+    ('days', 'integer', int),
+)
 
 
 class TripPlan(BaseModel):
@@ -62,36 +69,48 @@ class TripPlan(BaseModel):
     None, description="Preferred mode of transport (raw user input)"
   )
 
-  @field_validator('budget')
+  @model_validator(mode="before")
   @classmethod
-  def validate_budget(cls, v):
-    """Validates that the budget is a string or positive number."""
-    if v is None:
-      return v
-    if isinstance(v, str):
-      # Allow strings like "500 EUR" or numbers as strings
-      return v
-    if isinstance(v, (int, float)):
-      if v <= 0:
-        raise ValueError('Budget must be a positive number.')
-      return str(v)
-    raise ValueError('Invalid budget format. Must be a string or positive number.')
+  def _coerce(cls, data):
+    """
+    Normalizes numeric budget/days input to strings in a single pass.
 
-  @field_validator('days')
-  @classmethod
-  def validate_days(cls, v):
-    """Validates that days is a string or positive integer."""
-    if v is None:
-      return v
-    if isinstance(v, str):
-      # Allow strings like "weekend" or numbers as strings
-      return v
-    if isinstance(v, int):
+    LLM output may carry `"budget": 500` or `"days": 3` as JSON numbers; they
+    are accepted when positive and stored as their string form, while strings
+    like "500 EUR" or "weekend" pass through unchanged. Running before field
+    validation keeps this to one call per model instead of one per field.
+    """
+    if not isinstance(data, dict):
+      return data
+    for field, kind, types in _NUMERIC_INPUTS:
+      v = data.get(field)
+      if v is None or isinstance(v, str):
+        continue
+      if isinstance(v, bool) or not isinstance(v, types):
+        raise ValueError(f'Invalid {field} format. Must be a string or positive {kind}.')
       if v <= 0:
-        raise ValueError('Days must be a positive integer.')
-      return str(v)
-    raise ValueError('Invalid days format. Must be a string or positive integer.')
+        raise ValueError(f'{field.capitalize()} must be a positive {kind}.')
+      data = {**data, field: str(v)}
+    return data
+
+
+class ExtractedFields(BaseModel):
+  """
+  Data model for the fields extracted from a user's reply to a follow-up question.
+
+  Only the fields the reply actually provides are set; the rest stay None.
 
+  Attributes:
+      destination (str): Destination city/country.
+      budget (str): Budget for the trip.
+      start_date (str): Start date in YYYY-MM-DD format.
+      end_date (str): End date in YYYY-MM-DD format.
+  """
+
+  destination: Optional[str] = Field(None, description="Destination city/country")
+  budget: Optional[str] = Field(None, description="Budget for the trip, as a specific amount")
+  start_date: Optional[str] = Field(None, description="Start date in YYYY-MM-DD format")
+  end_date: Optional[str] = Field(None, description="End date in YYYY-MM-DD format")
 
 class QueryAnalysisResult(TripPlan):
   """
@@ -116,7 +135,7 @@ class WorkflowState(TripPlan):
 
     Attributes:
         messages (list): List of conversation messages.
-        hotels (list): List of found hotels.
+        hotels (list | str): Found hotels, or the hotel agent's text answer.
         attractions (str): Formatted string of attractions.
         weather (str): Weather forecast information.
         itinerary (dict): Generated itinerary structure.
@@ -125,15 +144,20 @@ class WorkflowState(TripPlan):
         missing_fields (list): Fields currently missing.
         calculator_result (str): Result of budget calculations.
         prompt (str): Prompt used for generation (internal).
+
+    LangGraph rebuilds this model from its channels before every node runs.
+    The container fields are only ever filled by the workflow's own nodes, so
+    they skip validation and are passed through as-is rather than copied and
+    re-checked item by item on each transition.
     """
-    messages: list = Field(default_factory=list)  # Accept any objects, including LangChain BaseMessage
-    hotels: Optional[list] = None
+    messages: SkipValidation[list] = Field(default_factory=list)  # Accept any objects, including LangChain BaseMessage
+    hotels: SkipValidation[Optional[Union[list, str]]] = None
     attractions: Optional[str] = None
     weather: Optional[str] = None
-    itinerary: Optional[dict] = None
-    summary: Optional[dict] = None
+    itinerary: SkipValidation[Optional[dict]] = None
+    summary: SkipValidation[Optional[dict]] = None
     currency_rates: Optional[str] = None
-    missing_fields: Optional[list] = None
+    missing_fields: SkipValidation[Optional[list]] = None
     calculator_result: Optional[str] = None
     prompt: Optional[str] = None
 
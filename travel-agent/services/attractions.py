@@ -1,7 +1,71 @@
 import os
-import requests
+import re
+import orjson
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional
 from langchain.tools import tool
+from services.http_client import get_async_client, get_json, get_session
+from services.lookup_cache import LookupCache
+
+try:
+    from tavily import TavilyClient  # type: ignore
+except ImportError:
+    TavilyClient = None
+
+TAVILY_URL = "https://api.tavily.com/search"
+# Seconds to wait on one Tavily search before hedging with the other client
+_TAVILY_HEDGE_DELAY = 2.0
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tavily")
+
+# Geocoding results per normalized destination ("Paris", "paris " share one entry)
+_coordinates_cache = LookupCache("GEOCODE_CACHE_TTL")
+
+
+# API keys read from the environment; only keys that were set are kept, so a
+# key added later (e.g. by load_dotenv) is still picked up
+_api_keys: Dict[str, str] = {}
+
+
+def _env_key(name: str) -> Optional[str]:
+    """Returns an API key from the environment, reading each one only until it is found."""
+    key = _api_keys.get(name)
+    if key is None:
+        key = os.getenv(name)
+        if key:
+            _api_keys[name] = key
+    return key
+
+
+def reload_api_keys() -> None:
+    """Forgets the remembered API keys so the next lookup re-reads the environment."""
+    _api_keys.clear()
+
+
+# First "€12" / "$ 30" / "£5" style price in a search snippet
+_PRICE_RE = re.compile(r"([€$£])\s?([0-9]{1,4})")
+
+# High-level preference -> Geoapify categories
+_CATEGORY_MAP = MappingProxyType({
+    "culture": ("entertainment.culture.theatre", "entertainment.culture.arts_centre", "entertainment.culture.gallery"),
+    "adventure": ("natural.forest", "natural.mountain.peak", "entertainment.theme_park"),
+    "relaxation": ("leisure.park", "leisure.spa"),
+    "nightlife": ("catering.bar", "adult.nightclub"),
+    "history": ("heritage.unesco", "tourism.sights.castle", "tourism.sights.archaeological_site", "tourism.sights.monastery"),
+    "art": ("entertainment.culture.gallery",),
+})
+_DEFAULT_CATEGORIES = ("tourism.attraction",)
+
+
+@lru_cache(maxsize=256)
+def _categories_for(preferences: tuple) -> tuple:
+    """Geoapify categories for a tuple of preferences, in first-seen order without duplicates."""
+    categories = dict.fromkeys(
+        category for pref in preferences for category in _CATEGORY_MAP.get(pref.lower(), ())
+    )
+    return tuple(categories) or _DEFAULT_CATEGORIES
+
 
 class AttractionFinder:
     """
@@ -30,28 +94,113 @@ class AttractionFinder:
             ValueError: If the API key is missing or coordinates cannot be found.
             requests.exceptions.RequestException: If the API request fails.
         """
-        api_key = os.getenv("GEOAPIFY_API_KEY")
+        api_key = AttractionFinder._api_key()
+        coords = AttractionFinder._get_coordinates(destination, api_key)
+        params = AttractionFinder._places_params(destination, coords, activity_preferences, api_key)
+        return AttractionFinder._process_attractions(get_json(AttractionFinder.API_URL, params=params))
+
+    @staticmethod
+    async def afind_attractions(destination: str, activity_preferences: List[str]) -> List[Dict[str, Any]]:
+        """
+        Async version of `find_attractions`, used when the agent is awaited.
+
+        Both Geoapify requests go through the shared `httpx.AsyncClient`, so the
+        event loop keeps serving other requests while they are in flight.
+
+        Args:
+            destination (str): The city or country to search for attractions.
+            activity_preferences (List[str]): List of activity types (e.g., 'culture', 'art').
+
+        Returns:
+            List[Dict[str, Any]]: A list of attractions, each as a dictionary with 'name', 'address', and 'category'.
+
+        Raises:
+            ValueError: If the API key is missing or coordinates cannot be found.
+            httpx.HTTPError: If the API request fails.
+        """
+        api_key = AttractionFinder._api_key()
+        client = get_async_client()
+        coords = _coordinates_cache.get(destination)
+        if coords is None:
+            response = await client.get(
+                AttractionFinder.GEOCODE_URL,
+                params=AttractionFinder._geocode_params(destination, api_key)
+            )
+            response.raise_for_status()
+            coords = AttractionFinder._remember_coordinates(destination, orjson.loads(response.content))
+        params = AttractionFinder._places_params(destination, coords, activity_preferences, api_key)
+        response = await client.get(AttractionFinder.API_URL, params=params)
+        response.raise_for_status()
+        return AttractionFinder._process_attractions(orjson.loads(response.content))
+
+    @staticmethod
+    def _api_key() -> str:
+        """
+        Reads the Geoapify API key.
+
+        Returns:
+            str: The API key.
+
+        Raises:
+            ValueError: If GEOAPIFY_API_KEY is not set.
+        """
+        api_key = _env_key("GEOAPIFY_API_KEY")
         if not api_key:
             raise ValueError("GEOAPIFY_API_KEY not set. Attraction finder cannot function.")
-        coords = AttractionFinder._get_coordinates(destination, api_key)
+        return api_key
+
+    @staticmethod
+    def _geocode_params(destination: str, api_key: str) -> Dict[str, Any]:
+        """Builds the Geocoding API query for a destination."""
+        return {"text": destination, "apiKey": api_key, "limit": 1}
+
+    @staticmethod
+    def _coordinates_from(data: Dict[str, Any]) -> Dict[str, float] | None:
+        """Extracts 'lat'/'lon' from a Geocoding API response, or None if nothing matched."""
+        if data.get("features"):
+            props = data["features"][0]["properties"]
+            return {"lat": props["lat"], "lon": props["lon"]}
+        return None
+
+    @staticmethod
+    def _remember_coordinates(destination: str, data: Dict[str, Any]) -> Dict[str, float] | None:
+        """Extracts coordinates from a Geocoding API response and caches them if found."""
+        coords = AttractionFinder._coordinates_from(data)
+        if coords is not None:
+            _coordinates_cache.set(destination, coords)
+        return coords
+
+    @staticmethod
+    def _places_params(
+        destination: str,
+        coords: Dict[str, float] | None,
+        activity_preferences: List[str],
+        api_key: str
+    ) -> Dict[str, Any]:
+        """
+        Builds the Places API query around a destination's coordinates.
+
+        Raises:
+            ValueError: If the destination could not be geocoded.
+        """
         if not coords:
             raise ValueError(f"Could not find coordinates for {destination}.")
         categories = AttractionFinder._map_preferences_to_categories(activity_preferences)
-        params = {
+        return {
             "categories": ",".join(categories),
             "filter": f"circle:{coords['lon']},{coords['lat']},5000",
             "limit": 10,
             "apiKey": api_key
         }
-        response = requests.get(AttractionFinder.API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        return AttractionFinder._process_attractions(response.json())
 
     @staticmethod
     def _get_coordinates(destination: str, api_key: str) -> Dict[str, float] | None:
         """
         Retrieves the coordinates for a destination using Geoapify Geocoding API.
 
+        Places do not move, so found coordinates are cached for GEOCODE_CACHE_TTL
+        seconds (a day by default) under the normalized destination name.
+
         Args:
             destination (str): The place name to geocode.
             api_key (str): Geoapify API Key.
@@ -62,14 +211,11 @@ class AttractionFinder:
         Raises:
             requests.exceptions.RequestException: If the API request fails.
         """
-        params = {"text": destination, "apiKey": api_key, "limit": 1}
-        response = requests.get(AttractionFinder.GEOCODE_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("features"):
-            props = data["features"][0]["properties"]
-            return {"lat": props["lat"], "lon": props["lon"]}
-        return None
+        coords = _coordinates_cache.get(destination)
+        if coords is not None:
+            return coords
+        params = AttractionFinder._geocode_params(destination, api_key)
+        return AttractionFinder._remember_coordinates(destination, get_json(AttractionFinder.GEOCODE_URL, params=params))
 
     @staticmethod
     def _map_preferences_to_categories(preferences: List[str]) -> List[str]:
@@ -82,23 +228,9 @@ class AttractionFinder:
         Returns:
             List[str]: A list of Geoapify category strings (e.g., 'entertainment.culture.theatre').
         """
-        category_map = {
-            "culture": ["entertainment.culture.theatre", "entertainment.culture.arts_centre", "entertainment.culture.gallery"],
-            "adventure": ["natural.forest", "natural.mountain.peak", "entertainment.theme_park"],
-            "relaxation": ["leisure.park", "leisure.spa"],
-            "nightlife": ["catering.bar", "adult.nightclub"],
-            "history": ["heritage.unesco", "tourism.sights.castle", "tourism.sights.archaeological_site", "tourism.sights.monastery"],
-            "art": ["entertainment.culture.gallery"]
-        }
-        # Default to tourism.attraction if no preferences match
-        if not preferences:
-            return ["tourism.attraction"]
-
-        selected_categories = set()
-        for pref in preferences:
-            selected_categories.update(category_map.get(pref.lower(), []))
-        
-        return list(selected_categories) if selected_categories else ["tourism.attraction"]
+        # Default to tourism.attraction if no preferences match; the agent
+        # repeats the same few preference lists, so the lookup is memoized
+        return list(_categories_for(tuple(preferences or ())))
 
     @staticmethod
     def _process_attractions(data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -111,15 +243,14 @@ class AttractionFinder:
         Returns:
             List[Dict[str, Any]]: List of simplified attraction objects.
         """
-        attractions = []
-        for feature in data.get("features", []):
-            props = feature.get("properties", {})
-            attractions.append({
+        return [
+            {
                 "name": props.get("name"),
                 "address": props.get("formatted"),
-                "category": props.get("categories")[0] if props.get("categories") else "unknown"
-            })
-        return attractions
+                "category": categories[0] if (categories := props.get("categories")) else "unknown"
+            }
+            for props in (feature.get("properties", {}) for feature in data.get("features", ()))
+        ]
 
     @staticmethod
     @tool
@@ -140,40 +271,101 @@ class AttractionFinder:
         Raises:
             ValueError: If Tavily API Key is missing or search fails.
         """
-        try:
-            from tavily import TavilyClient  # type: ignore
-            api_key = os.getenv("TAVILY_API_KEY")
-            if not api_key:
-                raise ValueError("TAVILY_API_KEY not set.")
-            client = TavilyClient(api_key)
-            response = client.search(
-                query=f"average ticket price for attractions in {destination}",
-                max_results=3,
-                search_depth="advanced"
-            )
-            results = response.get("results", [])
-        except ImportError:
-            # Fallback to requests if SDK not available
-            api_key = os.getenv("TAVILY_API_KEY")
-            if not api_key:
-                raise ValueError("TAVILY_API_KEY not set.")
-            url = "https://api.tavily.com/search"
-            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-            payload = {"query": f"average ticket price for attractions in {destination}", "num_results": 3, "search_depth": "advanced"}
-            resp = requests.post(url, headers=headers, json=payload, timeout=15)
-            if resp.status_code != 200:
-                raise ValueError(f"Tavily search failed: {resp.status_code} {resp.text}")
-            data = resp.json()
-            results = data.get("results", [])
-
-        import re
-        price = None
+        price = AttractionFinder._ticket_price(AttractionFinder._search_ticket_prices(destination))
+        return round(price * group_size * days, 2)
+
+    @staticmethod
+    def estimate_attractions_cost_batch(destinations: List[str], group_size: int, days: int) -> List[float]:
+        """
+        Estimates attractions costs for several candidate destinations at once.
+
+        The Tavily searches run concurrently, so comparing N destinations takes
+        about as long as the slowest search instead of the sum of all of them.
+
+        Args:
+          destinations (List[str]): Cities or countries to compare.
+          group_size (int): Number of people.
+          days (int): Number of days.
+
+        Returns:
+          List[float]: Estimated total attractions cost per destination, in order.
+
+        Raises:
+            ValueError: If Tavily API Key is missing or a search fails.
+        """
+        if not destinations:
+            return []
+        # A pool of its own: the searches hedge on _search_pool and must not wait behind themselves
+        with ThreadPoolExecutor(max_workers=min(len(destinations), 8), thread_name_prefix="tavily-batch") as pool:
+            searches = list(pool.map(AttractionFinder._search_ticket_prices, destinations))
+        return [round(AttractionFinder._ticket_price(results) * group_size * days, 2) for results in searches]
+
+    @staticmethod
+    def _ticket_price(results: List[Dict[str, Any]]) -> float:
+        """Returns the first price quoted in the search results, or 20.0 (USD) if none is."""
         for item in results:
             snippet = item.get("snippet") or item.get("description") or item.get("content") or ""
-            match = re.search(r"([\u20ac$\u00a3])\s?([0-9]{1,4})", snippet)
+            match = _PRICE_RE.search(snippet)
             if match:
-                price = float(match.group(2))
-                break
-        if price is None:
-            price = 20.0  # fallback USD
-        return round(price * group_size * days, 2) 
\ No newline at end of file
+                return float(match.group(2))
+        return 20.0  # fallback USD
+
+    @staticmethod
+    def _search_ticket_prices(destination: str) -> List[Dict[str, Any]]:
+        """
+        Searches Tavily for attraction ticket prices, hedging slow or failed requests.
+
+        The SDK search (when the `tavily` package is installed) starts first. If it
+        fails, or has not answered within `_TAVILY_HEDGE_DELAY` seconds, a raw
+        HTTP search is started as well and whichever succeeds first is used. The
+        second request is only sent when the first is slow or fails, so the usual cost
+        stays one search.
+
+        Args:
+            destination (str): City or country.
+
+        Returns:
+            List[Dict[str, Any]]: Search results with 'content'/'snippet' text.
+
+        Raises:
+            ValueError: If TAVILY_API_KEY is missing or every search fails.
+        """
+        api_key = _env_key("TAVILY_API_KEY")
+        if not api_key:
+            raise ValueError("TAVILY_API_KEY not set.")
+        query = f"average ticket price for attractions in {destination}"
+        searches = [AttractionFinder._tavily_http_search]
+        if TavilyClient is not None:
+            searches.insert(0, AttractionFinder._tavily_sdk_search)
+
+        pending = {_search_pool.submit(searches.pop(0), query, api_key)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=_TAVILY_HEDGE_DELAY if searches else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            if searches:
+                pending.add(_search_pool.submit(searches.pop(0), query, api_key))
+        raise ValueError(f"Tavily search failed: {error}")
+
+    @staticmethod
+    def _tavily_sdk_search(query: str, api_key: str) -> List[Dict[str, Any]]:
+        """Runs a Tavily search through the official SDK."""
+        response = TavilyClient(api_key).search(query=query, max_results=3, search_depth="advanced")
+        return response.get("results", [])
+
+    @staticmethod
+    def _tavily_http_search(query: str, api_key: str) -> List[Dict[str, Any]]:
+        """Runs a Tavily search with a plain POST on the shared session."""
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        payload = {"query": query, "max_results": 3, "search_depth": "advanced"}
+        resp = get_session().post(TAVILY_URL, headers=headers, json=payload, timeout=15)
+        if resp.status_code != 200:
+            raise ValueError(f"Tavily search failed: {resp.status_code} {resp.text}")
+        return orjson.loads(resp.content).get("results", [])
+
+AttractionFinder.find_attractions.coroutine = AttractionFinder.afind_attractions
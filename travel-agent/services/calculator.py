@@ -1,73 +1,87 @@
+import ast
+import operator
+from typing import Union
 from langchain.tools import tool
 
+# Operators the calculator evaluates; anything else in an expression is rejected
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
 class Calculator:
     """
     Simple calculator for basic arithmetic operations.
 
     This tool is provided to the agent to perform deterministic mathematical calculations,
-    ensuring accuracy in budget and itinerary planning.
+    ensuring accuracy in budget and itinerary planning. A single expression tool lets the
+    agent compute a whole budget line ("3 * 1200000 + 450000") in one tool call.
     """
     @staticmethod
     @tool
-    def add(a: int, b: int) -> int:
+    def calc(expression: str) -> float:
         """
-        Adds two integers.
+        Evaluates an arithmetic expression using +, -, *, / and parentheses.
 
         Args:
-            a (int): The first integer.
-            b (int): The second integer.
+            expression (str): The expression to evaluate, e.g. "(1200000 * 3 + 500000) / 2".
 
         Returns:
-            int: The sum of a and b.
-        """
-        return a + b
-
-    @staticmethod
-    @tool
-    def multiply(a: int, b: int) -> int:
-        """
-        Multiplies two integers.
-
-        Args:
-            a (int): The first integer.
-            b (int): The second integer.
+            float: The result. Integer-only expressions without division stay exact integers.
 
-        Returns:
-            int: The product of a and b.
+        Raises:
+            ValueError: If the expression is not plain arithmetic or divides by zero.
         """
-        return a * b
+        return Calculator.evaluate(expression)
 
     @staticmethod
-    @tool
-    def divide(a: int, b: int) -> float:
+    def evaluate(expression: str) -> Union[int, float]:
         """
-        Divides two integers.
+        Parses and evaluates an arithmetic expression (the function behind `calc`).
 
         Args:
-            a (int): The numerator.
-            b (int): The denominator (must not be 0).
+            expression (str): The expression to evaluate.
 
         Returns:
-            float: The result of division.
+            Union[int, float]: The result.
 
         Raises:
-            ValueError: If the denominator is zero.
+            ValueError: If the expression is not plain arithmetic or divides by zero.
         """
-        if b == 0:
-            raise ValueError("Denominator cannot be zero.")
-        return a / b
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression: {expression!r}") from e
+        return Calculator._evaluate(tree.body)
 
     @staticmethod
-    @tool
-    def subtract(a: int, b: int) -> int:
+    def _evaluate(node: ast.AST) -> Union[int, float]:
         """
-        Subtracts two integers.
+        Recursively evaluates a parsed expression node.
 
         Args:
-            a (int): The first integer.
-            b (int): The second integer.
+            node (ast.AST): A node of the parsed expression.
 
         Returns:
-            int: The subtraction of b from a.
+            Union[int, float]: The value of the node.
+
+        Raises:
+            ValueError: If the node is not a number or an allowed operator, or divides by zero.
         """
-        return a - b
\ No newline at end of file
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left = Calculator._evaluate(node.left)
+            right = Calculator._evaluate(node.right)
+            if isinstance(node.op, ast.Div) and right == 0:
+                raise ValueError("Denominator cannot be zero.")
+            return _BINARY_OPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](Calculator._evaluate(node.operand))
+        raise ValueError(f"Unsupported expression element: {ast.dump(node)}")
@@ -1,6 +1,12 @@
-import requests
-from typing import Dict, Any
+import os
+import asyncio
+import threading
+import orjson
+from typing import Dict, Any, Optional, Tuple
+from cachetools import LRUCache, TTLCache
 from langchain.tools import tool
+from models import VALID_CURRENCIES
+from services.http_client import get_async_client, get_json
 
 class CurrencyConverter:
   """
@@ -9,12 +15,15 @@ class CurrencyConverter:
   This class provides methods to convert currency amounts from one denomination to another,
   utilizing multiple public API endpoints to ensure reliability.
   """
+  PRIMARY_URL = "https://api.exchangerate-api.com/v4/latest/{base}"
+  FALLBACK_URL = "https://open.er-api.com/v6/latest/{base}"
 
   def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
     """
     Instance method for currency conversion.
 
-    Delegates the actual conversion logic to the static `convert` method.
+    Shares the implementation of the `convert` tool without going through
+    the tool's argument schema.
 
     Args:
       amount (float): The amount of money to convert.
@@ -29,7 +38,7 @@ class CurrencyConverter:
                       - 'to': Target currency code.
                       - 'amount': Original amount.
     """
-    return CurrencyConverter.convert(amount, from_currency, to_currency)
+    return CurrencyConverter._convert_amount(amount, from_currency, to_currency)
 
   @staticmethod
   @tool
@@ -46,43 +55,236 @@ class CurrencyConverter:
       Dict[str, Any]: Dictionary with converted amount, rate, from, to, and amount.
 
     Raises:
-      ValueError: If conversion fails or API is unavailable.
+      ValueError: If a currency is not supported, or conversion fails and no
+        earlier rates are cached.
     """
+    return CurrencyConverter._convert_amount(amount, from_currency, to_currency)
+
+  @staticmethod
+  def _convert_amount(amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+    """
+    Converts an amount using the cached or freshly fetched rate table (the function behind `convert`).
+
+    Args:
+      amount (float): The amount of money to convert.
+      from_currency (str): The currency code to convert from.
+      to_currency (str): The currency code to convert to.
+
+    Returns:
+      Dict[str, Any]: Dictionary with converted amount, rate, from, to, and amount.
+
+    Raises:
+      ValueError: If a currency is not supported, or conversion fails and no
+        earlier rates are cached.
+    """
+    src, dst = CurrencyConverter._codes(from_currency, to_currency)
+    if src == dst:
+      return CurrencyConverter._conversion(amount, src, dst, {dst: 1.0})
+    rates = _rates_cache.get(src)
+    if rates is not None:
+      return CurrencyConverter._conversion(amount, src, dst, rates)
     try:
-      url = f"https://api.exchangerate-api.com/v4/latest/{from_currency.upper()}"
-      resp = requests.get(url, timeout=10)
-      resp.raise_for_status()
-      data = resp.json()
-      rates = data.get("rates", {})
-      if to_currency.upper() not in rates:
-        raise ValueError(f"Currency {to_currency} not supported")
-      rate = rates[to_currency.upper()]
-      converted_amount = amount * rate
-      return {
-        "converted_amount": round(converted_amount, 2),
-        "rate": rate,
-        "from": from_currency.upper(),
-        "to": to_currency.upper(),
-        "amount": amount
-      }
-    except Exception as e:
-      # Fallback to another public API
       try:
-        url = f"https://open.er-api.com/v6/latest/{from_currency.upper()}"
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        rates = data.get("rates", {})
-        if to_currency.upper() not in rates:
-          raise ValueError(f"Currency {to_currency} not supported (fallback)")
-        rate = rates[to_currency.upper()]
-        converted_amount = amount * rate
-        return {
-          "converted_amount": round(converted_amount, 2),
-          "rate": rate,
-          "from": from_currency.upper(),
-          "to": to_currency.upper(),
-          "amount": amount
-        }
-      except Exception as e2:
-        raise ValueError(f"Currency conversion failed: {str(e2)}")
+        rates = CurrencyConverter._fetch_rates(CurrencyConverter.PRIMARY_URL.format(base=src))
+      except Exception:
+        # Fallback to another public API
+        rates = CurrencyConverter._fetch_rates(CurrencyConverter.FALLBACK_URL.format(base=src))
+    except Exception as e:
+      return CurrencyConverter._stale_conversion(amount, src, dst, e)
+    _rates_cache.set(src, rates)
+    return CurrencyConverter._conversion(amount, src, dst, rates)
+
+  @staticmethod
+  async def aconvert(amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+    """
+    Async version of `convert`, used when the agent is awaited.
+
+    Instead of trying the fallback API only after the primary one failed, both
+    are queried at once (a hedged request) and the first valid answer wins;
+    the slower request is cancelled.
+
+    Args:
+      amount (float): The amount of money to convert.
+      from_currency (str): The currency code to convert from (e.g., 'USD').
+      to_currency (str): The currency code to convert to (e.g., 'EUR').
+
+    Returns:
+      Dict[str, Any]: Dictionary with converted amount, rate, from, to, and amount.
+
+    Raises:
+      ValueError: If a currency is not supported, or both APIs fail and no
+        earlier rates are cached.
+    """
+    src, dst = CurrencyConverter._codes(from_currency, to_currency)
+    if src == dst:
+      return CurrencyConverter._conversion(amount, src, dst, {dst: 1.0})
+    rates = _rates_cache.get(src)
+    if rates is not None:
+      return CurrencyConverter._conversion(amount, src, dst, rates)
+    client = get_async_client()
+
+    async def fetch_rates(url: str) -> Dict[str, float]:
+      resp = await client.get(url)
+      resp.raise_for_status()
+      rates = orjson.loads(resp.content).get("rates")
+      if not rates:
+        raise ValueError(f"No rates returned for {src}")
+      return rates
+
+    pending = {
+      asyncio.ensure_future(fetch_rates(url.format(base=src)))
+      for url in (CurrencyConverter.PRIMARY_URL, CurrencyConverter.FALLBACK_URL)
+    }
+    error: Exception = ValueError("no exchange rate API answered")
+    try:
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        answered = [task for task in done if task.exception() is None]
+        if not answered:
+          error = next(iter(done)).exception()
+          continue
+        rates = answered[0].result()
+        _rates_cache.set(src, rates)
+        return CurrencyConverter._conversion(amount, src, dst, rates)
+    finally:
+      for task in pending:
+        task.cancel()
+    return CurrencyConverter._stale_conversion(amount, src, dst, error)
+
+  @staticmethod
+  def _fetch_rates(url: str) -> Dict[str, float]:
+    """
+    Downloads one base currency's rate table.
+
+    Args:
+      url (str): PRIMARY_URL or FALLBACK_URL formatted with the base currency.
+
+    Returns:
+      Dict[str, float]: Rates keyed by upper-case currency code.
+
+    Raises:
+      requests.exceptions.RequestException: If the request fails.
+      ValueError: If the response has no rates.
+    """
+    rates = get_json(url).get("rates")
+    if not rates:
+      raise ValueError(f"No rates returned by {url}")
+    return rates
+
+  @staticmethod
+  def _codes(from_currency: str, to_currency: str) -> Tuple[str, str]:
+    """
+    Normalizes both currency codes once and rejects unsupported ones.
+
+    Checking against `VALID_CURRENCIES` up front means a typo or an invented
+    code fails immediately instead of after an exchange rate API round trip.
+
+    Returns:
+      Tuple[str, str]: The upper-case source and target codes.
+
+    Raises:
+      ValueError: If either code is not in `VALID_CURRENCIES`.
+    """
+    src = from_currency.strip().upper()
+    dst = to_currency.strip().upper()
+    for code in (src, dst):
+      if code not in VALID_CURRENCIES:
+        raise ValueError(f"Currency {code} not supported")
+    return src, dst
+
+  @staticmethod
+  def _conversion(amount: float, src: str, dst: str, rates: Dict[str, float], stale: bool = False) -> Dict[str, Any]:
+    """
+    Builds the conversion result from a rate table.
+
+    Args:
+      amount (float): The amount of money to convert.
+      src (str): Upper-case source currency code.
+      dst (str): Upper-case target currency code.
+      rates (Dict[str, float]): Rates for `src`.
+      stale (bool, optional): Whether `rates` is past its TTL. Defaults to False.
+
+    Returns:
+      Dict[str, Any]: Dictionary with converted amount, rate, from, to, and amount,
+        plus `"stale": True` when an expired table had to be used.
+
+    Raises:
+      ValueError: If the target currency is not in the table.
+    """
+    if dst not in rates:
+      raise ValueError(f"Currency {dst} not supported")
+    rate = rates[dst]
+    result = {
+      "converted_amount": round(amount * rate, 2),
+      "rate": rate,
+      "from": src,
+      "to": dst,
+      "amount": amount
+    }
+    if stale:
+      result["stale"] = True
+    return result
+
+  @staticmethod
+  def _stale_conversion(amount: float, src: str, dst: str, error: Exception) -> Dict[str, Any]:
+    """
+    Falls back to the last known rates for `src` when both APIs failed.
+
+    Raises:
+      ValueError: If `src` was never fetched successfully.
+    """
+    rates = _rates_cache.get_stale(src)
+    if rates is None:
+      raise ValueError(f"Currency conversion failed: {str(error)}")
+    return CurrencyConverter._conversion(amount, src, dst, rates, stale=True)
+
+
+class RatesCache:
+  """
+  Thread-safe cache of exchange rate tables keyed by base currency.
+
+  Rates move at most hourly, so one fetched table serves every conversion from
+  that base until `ttl` expires. Expired tables are kept as a stale copy that
+  is served (and flagged) when both rate APIs are unavailable.
+  """
+
+  def __init__(self, maxsize: int = 64, ttl: int = 3600):
+    """
+    Initializes an empty cache.
+
+    Args:
+      maxsize (int, optional): Maximum number of base currencies kept. Defaults to 64.
+      ttl (int, optional): Seconds a table is considered fresh. Defaults to 3600.
+    """
+    self._fresh: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+    self._last: LRUCache = LRUCache(maxsize=maxsize)
+    self._lock = threading.Lock()
+
+  def get(self, base: str) -> Optional[Dict[str, float]]:
+    """Returns the fresh table for `base`, or None if missing or expired."""
+    with self._lock:
+      return self._fresh.get(base)
+
+  def get_stale(self, base: str) -> Optional[Dict[str, float]]:
+    """Returns the last table fetched for `base`, however old, or None."""
+    with self._lock:
+      return self._last.get(base)
+
+  def set(self, base: str, rates: Dict[str, float]) -> None:
+    """Stores a freshly fetched table for `base`."""
+    with self._lock:
+      self._fresh[base] = rates
+      self._last[base] = rates
+
+  def clear(self) -> None:
+    """Drops every cached table."""
+    with self._lock:
+      self._fresh.clear()
+      self._last.clear()
+
+
+# Global instance
+_rates_cache = RatesCache(ttl=int(os.getenv("EXCHANGE_RATE_CACHE_TTL", "3600")))
+
+# Agents awaited with ainvoke use the hedged async implementation
+CurrencyConverter.convert.coroutine = CurrencyConverter.aconvert
@@ -7,6 +7,30 @@ import random
 import re
 
 
+class _PunctuationTable(dict):
+    """
+    `str.translate` table mapping every character outside [\w\s] to a space.
+
+    Equivalent to `re.sub(r'[^\w\s]', ' ', text)`, but done by `str.translate` in C.
+    Characters are classified the first time they are seen and remembered, so the
+    table covers Unicode punctuation and emoji without enumerating every codepoint.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        kept = char.isalnum() or char.isspace() or char == '_'
+        self[codepoint] = char if kept else ' '
+        return self[codepoint]
+
+
+_PUNCTUATION = _PunctuationTable()
+
+# Greetings are short: a message longer than this is only taken for a greeting
+# when its first word is one, which is checked on the first few characters alone
+_MAX_GREETING_LENGTH = 120
+_FIRST_WORD_SPAN = 40
+
+
 class GreetingHandler:
     """
     Handles greeting messages and generates friendy responses for the Travel Agent.
@@ -25,8 +49,18 @@ class GreetingHandler:
             'bạn khỏe không', 'how are you', 'bạn có ổn không',
             'bonjour', 'konnichiwa', 'guten tag'
         ]
+
+        self.thanks_keywords = [
+            'cảm ơn', 'thank you', 'thanks', 'cám ơn',
+            'tks', 'thx', 'merci', 'arigatou'
+        ]
+
+        # Single-word keywords are looked up per message token in a frozenset;
+        # only the multi-word phrases are searched for, in one precompiled alternation
+        self._greeting_words, self._greeting_pattern = self._keyword_matchers(self.greeting_keywords)
+        self._thanks_words, self._thanks_pattern = self._keyword_matchers(self.thanks_keywords)
         
-        self.greeting_responses = [
+        self.greeting_responses = (
             """Xin chào! 👋 Rất vui được gặp bạn! Tôi là AI Travel Assistant, chuyên giúp bạn lên kế hoạch du lịch tuyệt vời.
 
 🌟 Bạn muốn đi đâu vậy? Tôi có thể giúp bạn:
@@ -74,8 +108,56 @@ Bạn có kế hoạch gì chưa? Hay để tôi gợi ý cho bạn một chuy
 • 💸 Tối ưu hóa ngân sách du lịch
 
 Hãy chia sẻ với tôi: Bạn muốn khám phá vùng đất nào của Việt Nam? 🇻🇳"""
-        ]
+        )
+
+        self.thanks_responses = (
+            "Không có gì! 😊 Tôi luôn sẵn sàng giúp bạn lên kế hoạch du lịch tuyệt vời. Còn gì khác tôi có thể hỗ trợ không?",
+            "Rất vui được giúp bạn! 🌟 Nếu có thêm câu hỏi gì về du lịch, đừng ngại hỏi tôi nhé!",
+            "Đó là niềm vui của tôi! ✨ Chúc bạn có những chuyến đi thật tuyệt vời!",
+            "Cảm ơn bạn! 😄 Tôi hy vọng thông tin của tôi sẽ giúp ích cho chuyến đi của bạn!"
+        )
+
+        # Response tuples are fixed, so their lengths are taken once
+        self._greeting_count = len(self.greeting_responses)
+        self._thanks_count = len(self.thanks_responses)
     
+    @staticmethod
+    def _keyword_matchers(keywords: list) -> tuple:
+        """
+        Splits keywords into whole words and phrases and precompiles both.
+
+        Args:
+            keywords (list): Keywords; they are case-folded here, like the messages.
+
+        Returns:
+            tuple: A frozenset of the single-word keywords, and a pattern matching any
+                   multi-word keyword as whole words (None if there are none).
+        """
+        keywords = [keyword.casefold() for keyword in keywords]
+        words = frozenset(keyword for keyword in keywords if ' ' not in keyword)
+        # Longest first so overlapping phrases ('xin chào bạn' / 'chào bạn') behave predictably
+        phrases = sorted({keyword for keyword in keywords if ' ' in keyword}, key=len, reverse=True)
+        alternation = "|".join(re.escape(phrase) for phrase in phrases)
+        pattern = re.compile(rf"\b(?:{alternation})\b") if phrases else None
+        return words, pattern
+
+    @staticmethod
+    def _contains_keyword(clean_message: str, words: frozenset, pattern) -> bool:
+        """
+        Checks a cleaned message for a single-word keyword token or a keyword phrase.
+
+        Args:
+            clean_message (str): Case-folded message with punctuation replaced by spaces.
+            words (frozenset): Single-word keywords.
+            pattern (re.Pattern): Multi-word keyword pattern, or None.
+
+        Returns:
+            bool: True if any keyword is present.
+        """
+        if not words.isdisjoint(clean_message.split()):
+            return True
+        return pattern is not None and pattern.search(clean_message) is not None
+
     def is_greeting_message(self, message: str) -> bool:
         """
         Checks if the provided message is a greeting.
@@ -88,15 +170,19 @@ Hãy chia sẻ với tôi: Bạn muốn khám phá vùng đất nào của Việ
         """
         if not message or not isinstance(message, str):
             return False
+
+        # Fast path: "hello there, ..." is decided by its first word
+        head = message[:_FIRST_WORD_SPAN].casefold().translate(_PUNCTUATION).split(maxsplit=1)
+        if head and head[0] in self._greeting_words:
+            return True
+        if len(message) > _MAX_GREETING_LENGTH:
+            return False
             
-        # Convert to lowercase and clean up
-        clean_message = message.lower().strip()
-        
-        # Remove punctuation for better matching
-        clean_message = re.sub(r'[^\w\s]', ' ', clean_message)
+        # Case-fold and replace punctuation with spaces for better matching
+        clean_message = message.casefold().strip().translate(_PUNCTUATION)
         
         # Check if any greeting keywords are present
-        return any(keyword in clean_message for keyword in self.greeting_keywords)
+        return self._contains_keyword(clean_message, self._greeting_words, self._greeting_pattern)
     
     def generate_greeting_response(self, user_message: str = "") -> str:
         """
@@ -109,7 +195,7 @@ Hãy chia sẻ với tôi: Bạn muốn khám phá vùng đất nào của Việ
             str: A randomized greeting response string.
         """
         # Choose a random response to make it feel more natural
-        response = random.choice(self.greeting_responses)
+        response = self.greeting_responses[random.randrange(self._greeting_count)]
         
         return response
     
@@ -123,15 +209,9 @@ Hãy chia sẻ với tôi: Bạn muốn khám phá vùng đất nào của Việ
         Returns:
             bool: True if the message contains gratitude keywords, False otherwise.
         """
-        thanks_keywords = [
-            'cảm ơn', 'thank you', 'thanks', 'cám ơn', 
-            'tks', 'thx', 'merci', 'arigatou'
-        ]
-        
-        clean_message = message.lower().strip()
-        clean_message = re.sub(r'[^\w\s]', ' ', clean_message)
+        clean_message = message.casefold().strip().translate(_PUNCTUATION)
         
-        return any(keyword in clean_message for keyword in thanks_keywords)
+        return self._contains_keyword(clean_message, self._thanks_words, self._thanks_pattern)
     
     def generate_thanks_response(self) -> str:
         """
@@ -140,14 +220,7 @@ Hãy chia sẻ với tôi: Bạn muốn khám phá vùng đất nào của Việ
         Returns:
             str: A randomized 'you're welcome' response string.
         """
-        thanks_responses = [
-            "Không có gì! 😊 Tôi luôn sẵn sàng giúp bạn lên kế hoạch du lịch tuyệt vời. Còn gì khác tôi có thể hỗ trợ không?",
-            "Rất vui được giúp bạn! 🌟 Nếu có thêm câu hỏi gì về du lịch, đừng ngại hỏi tôi nhé!",
-            "Đó là niềm vui của tôi! ✨ Chúc bạn có những chuyến đi thật tuyệt vời!",
-            "Cảm ơn bạn! 😄 Tôi hy vọng thông tin của tôi sẽ giúp ích cho chuyến đi của bạn!"
-        ]
-        
-        return random.choice(thanks_responses)
+        return self.thanks_responses[random.randrange(self._thanks_count)]
 
 
 # Global instance
@@ -1,11 +1,112 @@
 import os
-import http.client
-import json
 import time
+import asyncio
+import logging
+import orjson
 import requests
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional
 from langchain.tools import tool
-from urllib.parse import quote
+from services.http_client import get_async_client, get_session
+from services.lookup_cache import LookupCache
+
+logger = logging.getLogger("travel_agent")
+
+RAPIDAPI_HOST = "booking-com18.p.rapidapi.com"
+RAPIDAPI_URL = f"https://{RAPIDAPI_HOST}"
+
+# RapidAPI reports the requests left in the current quota window on every
+# response. Calls go out back to back and only pause once the window is nearly
+# used up; 429s and 5xx are retried with backoff by the shared session.
+_RATE_LIMIT_HEADER = "X-RateLimit-Requests-Remaining"
+_RATE_LIMIT_PAUSE = 2
+
+# httpx only retries failed connections, so the async calls retry rate-limited
+# and overloaded answers themselves, honouring Retry-After when it is given
+_ASYNC_ATTEMPTS = 3
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+_RETRY_BACKOFF = 0.5
+_MAX_RETRY_DELAY = 10.0
+
+# Stand-in for missing nested objects in a hotel entry
+_EMPTY = MappingProxyType({})
+
+# Booking.com location IDs per normalized destination, so a destination searched
+# before goes straight to the hotel search without the auto-complete call
+_location_cache = LookupCache("HOTEL_LOCATION_CACHE_TTL")
+
+def _rate_limit_pause(response_headers) -> float:
+  """Seconds to wait before the next call, given a response's rate-limit headers."""
+  remaining = response_headers.get(_RATE_LIMIT_HEADER)
+  if remaining is not None and remaining.isdigit() and int(remaining) <= 1:
+    return _RATE_LIMIT_PAUSE
+  return 0
+
+def _retry_delay(response_headers, attempt: int) -> float:
+  """Seconds to wait before retrying: the server's Retry-After, else exponential backoff."""
+  retry_after = response_headers.get("Retry-After", "")
+  delay = float(retry_after) if retry_after.isdigit() else _RETRY_BACKOFF * (2 ** attempt)
+  return min(delay, _MAX_RETRY_DELAY)
+
+def _rapidapi_get(path: str, params: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+  """
+  Performs a GET against the Booking.com RapidAPI on the shared keep-alive session.
+
+  Args:
+    path (str): Endpoint path, e.g. "/stays/auto-complete".
+    params (Dict[str, Any]): Query string parameters.
+    headers (Dict[str, str]): RapidAPI authentication headers.
+
+  Returns:
+    Dict[str, Any]: The decoded JSON response.
+
+  Raises:
+    requests.exceptions.RequestException: If the request fails or returns an error status.
+  """
+  response = get_session().get(f"{RAPIDAPI_URL}{path}", params=params, headers=headers, timeout=10)
+  logger.debug("Hotel API %s status: %s, headers: %s", path, response.status_code, response.headers)
+  logger.debug("Hotel API %s response: %.500s", path, response.content)
+  response.raise_for_status()
+
+  pause = _rate_limit_pause(response.headers)
+  if pause:
+    time.sleep(pause)
+
+  return orjson.loads(response.content)
+
+async def _arapidapi_get(path: str, params: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+  """
+  Async version of `_rapidapi_get` on the shared `httpx.AsyncClient`.
+
+  429 and 502-504 answers are retried up to `_ASYNC_ATTEMPTS` times in total,
+  like the sync session's retry policy does.
+
+  Args:
+    path (str): Endpoint path, e.g. "/stays/auto-complete".
+    params (Dict[str, Any]): Query string parameters.
+    headers (Dict[str, str]): RapidAPI authentication headers.
+
+  Returns:
+    Dict[str, Any]: The decoded JSON response.
+
+  Raises:
+    httpx.HTTPError: If the request fails or returns an error status.
+  """
+  client = get_async_client()
+  for attempt in range(_ASYNC_ATTEMPTS):
+    response = await client.get(f"{RAPIDAPI_URL}{path}", params=params, headers=headers)
+    if response.status_code not in _RETRY_STATUSES or attempt == _ASYNC_ATTEMPTS - 1:
+      break
+    await asyncio.sleep(_retry_delay(response.headers, attempt))
+  logger.debug("Hotel API %s status: %s, headers: %s", path, response.status_code, response.headers)
+  logger.debug("Hotel API %s response: %.500s", path, response.content)
+  response.raise_for_status()
+
+  pause = _rate_limit_pause(response.headers)
+  if pause:
+    await asyncio.sleep(pause)
+
+  return orjson.loads(response.content)
 
 class HotelFinder:
   """
@@ -33,6 +134,61 @@ class HotelFinder:
       List[Dict[str, Any]]: A list of dictionaries, where each dictionary represents a hotel
                             containing 'name', 'price_per_night', 'review_count', and 'rating'.
     """
+    return self._find_hotels_impl(*HotelFinder._search_args(destination, checkin, checkout, guests, max_results))
+
+  @staticmethod
+  async def afind_hotels(destination, checkin: str = None, checkout: str = None, guests: int = 1, max_results: int = 10) -> List[Dict[str, Any]]:
+    """
+    Async version of `find_hotels_direct`, used when the hotel agent is awaited.
+
+    Both RapidAPI requests go through the shared `httpx.AsyncClient`, so the event
+    loop keeps serving other requests while they are in flight. A destination whose
+    location ID is cached skips the auto-complete call.
+
+    Args:
+      destination (str or WorkflowState): The city or location to search hotels in, or a WorkflowState object.
+      checkin (str, optional): Check-in date in 'YYYY-MM-DD' format.
+      checkout (str, optional): Check-out date in 'YYYY-MM-DD' format.
+      guests (int, optional): Number of guests. Defaults to 1.
+      max_results (int, optional): Maximum number of hotels to return. Defaults to 10.
+
+    Returns:
+      List[Dict[str, Any]]: A list of hotel options with name, price, reviews, and rating.
+
+    Raises:
+      ValueError: If the API call fails, the key is missing, or no hotels are found.
+    """
+    destination, checkin, checkout, guests, max_results = HotelFinder._search_args(
+      destination, checkin, checkout, guests, max_results
+    )
+    headers = HotelFinder._headers()
+
+    try:
+      location_id = HotelFinder._cached_location_id(destination)
+      if location_id is None:
+        location_data = {}
+        for query in HotelFinder._location_queries(destination):
+          location_data = await _arapidapi_get("/stays/auto-complete", {"query": query}, headers)
+          if location_data.get("data"):
+            break
+        location_id = HotelFinder._remember_location_id(destination, location_data)
+
+      search_data = await _arapidapi_get(
+        "/stays/search", HotelFinder._search_params(location_id, checkin, checkout, guests), headers
+      )
+      return HotelFinder._parse_hotels(search_data, destination, max_results)
+
+    except Exception as e:
+      raise ValueError(f"API request failed: {str(e)}")
+
+  @staticmethod
+  def _search_args(destination, checkin: str, checkout: str, guests: int, max_results: int) -> tuple:
+    """
+    Normalizes the search arguments, unpacking a WorkflowState and filling in default dates.
+
+    Returns:
+      tuple: (destination, checkin, checkout, guests, max_results).
+    """
     # Handle WorkflowState input for backward compatibility
     if hasattr(destination, 'destination'):
       # It's a WorkflowState object
@@ -50,7 +206,7 @@ class HotelFinder:
       checkin = checkin or (today + timedelta(days=1)).isoformat()
       checkout = checkout or (today + timedelta(days=4)).isoformat()
 
-    return self._find_hotels_impl(destination, checkin, checkout, guests, max_results)
+    return destination, checkin, checkout, guests, max_results
 
   def _find_hotels_impl(self, destination: str, checkin: str, checkout: str, guests: int = 1, max_results: int = 10) -> List[Dict[str, Any]]:
     """
@@ -58,7 +214,7 @@ class HotelFinder:
 
     Steps:
     1. specifices the API key and headers.
-    2. Searches for the location ID using the 'auto-complete' endpoint.
+    2. Looks up the location ID in the cache, or searches for it using the 'auto-complete' endpoint.
     3. Retries with simplified queries if the initial location search fails.
     4. Searches for hotels using the retrieved location ID.
     5. Parses the response and extracts relevant hotel information.
@@ -76,100 +232,131 @@ class HotelFinder:
     Raises:
       ValueError: If individual API calls fail, keys are missing, or no hotels are found.
     """
+    headers = HotelFinder._headers()
+
+    try:
+      # Step 1: Get location ID for the city
+      location_id = HotelFinder._cached_location_id(destination)
+      if location_id is None:
+        location_data = {}
+        for query in HotelFinder._location_queries(destination):
+          location_data = _rapidapi_get("/stays/auto-complete", {"query": query}, headers)
+          if location_data.get("data"):
+            break
+        location_id = HotelFinder._remember_location_id(destination, location_data)
+
+      # Step 2: Search for hotels
+      search_data = _rapidapi_get(
+        "/stays/search", HotelFinder._search_params(location_id, checkin, checkout, guests), headers
+      )
+      return HotelFinder._parse_hotels(search_data, destination, max_results)
+
+    except Exception as e:
+      raise ValueError(f"API request failed: {str(e)}")
+
+  @staticmethod
+  def _headers() -> Dict[str, str]:
+    """
+    Builds the RapidAPI authentication headers.
+
+    Raises:
+      ValueError: If RAPIDAPI_KEY is not set.
+    """
     api_key = os.environ.get("RAPIDAPI_KEY")
     if not api_key:
       raise ValueError("RAPIDAPI_KEY environment variable not set.")
 
-    headers = {
+    return {
       'x-rapidapi-key': api_key,
-      'x-rapidapi-host': "booking-com18.p.rapidapi.com"
+      'x-rapidapi-host': RAPIDAPI_HOST
     }
 
-    try:
-      # Step 1: Get location ID for the city
-      conn = http.client.HTTPSConnection("booking-com18.p.rapidapi.com")
-      encoded_destination = quote(destination)
-
-      conn.request("GET", f"/stays/auto-complete?query={encoded_destination}", headers=headers)
-      res = conn.getresponse()
-      print(f"DEBUG: Hotel Location Search status: {res.status}, headers: {res.getheaders()}")
-      data = res.read()
-      location_data = json.loads(data.decode("utf-8"))
-      print(f"DEBUG: Hotel Location Search response: {data.decode('utf-8')[:500]}")
-
-      if not location_data.get("data"):
-        # If no location is found, try to simplify the destination
-        simplified_destination = destination.split(",")[0].strip()
-        if simplified_destination != destination:
-          encoded_simplified_destination = quote(simplified_destination)
-          conn.request("GET", f"/stays/auto-complete?query={encoded_simplified_destination}", headers=headers)
-          res = conn.getresponse()
-          data = res.read()
-          location_data = json.loads(data.decode("utf-8"))
-
-          if not location_data.get("data"):
-            # Try a very simple query as a last resort
-            simple_query = destination.split(",")[0].split()[0].strip()
-            if simple_query != destination:
-              encoded_simple_query = quote(simple_query)
-              conn.request("GET", f"/stays/auto-complete?query={encoded_simple_query}", headers=headers)
-              res = conn.getresponse()
-              data = res.read()
-              location_data = json.loads(data.decode("utf-8"))
-
-            if not location_data.get("data"):
-              raise ValueError(f"No location found for destination: {destination}. API Response: {data.decode('utf-8')[:200]}")
-
-      location_id = location_data["data"][0]["id"]
-
-      # Step 2: Add delay to respect rate limits
-      time.sleep(2)
-
-      # Step 3: Search for hotels
-      conn = http.client.HTTPSConnection("booking-com18.p.rapidapi.com")
-      search_url = f"/stays/search?locationId={location_id}&checkinDate={checkin}&checkoutDate={checkout}&units=metric&temperature=c&adults={guests}"
-      conn.request("GET", search_url, headers=headers)
-      res = conn.getresponse()
-      print(f"DEBUG: Hotel Search status: {res.status}, headers: {res.getheaders()}")
-      data = res.read()
-      search_data = json.loads(data.decode("utf-8"))
-      print(f"DEBUG: Hotel Search response: {data.decode('utf-8')[:500]}")
-      # Fixed: hotels are directly in the data array
-      hotels = search_data.get("data", [])
-      if not hotels:
-        raise ValueError(f"No hotels found for {destination}")
-
-      results = []
-      for hotel in hotels[:max_results]:
-        name = hotel.get("name")
-        if not name:
-          continue
-
-        # Extract price from priceBreakdown.grossPrice.value
-        price = None
-        if "priceBreakdown" in hotel:
-          price_breakdown = hotel["priceBreakdown"]
-          if "grossPrice" in price_breakdown:
-            price = price_breakdown["grossPrice"].get("value")
-
-        # Extract reviews and rating
-        review_count = hotel.get("reviewCount", 0)
-        rating = hotel.get("reviewScore", 0)
-
-        results.append({
-          "name": name,
-          "price_per_night": float(price) if price else None,
-          "review_count": review_count,
-          "rating": float(rating) if rating else None
-        })
-
-      if not results:
-        raise ValueError(f"No valid hotels found for {destination}")
-
-      return results
+  @staticmethod
+  def _location_queries(destination: str) -> List[str]:
+    """
+    Auto-complete queries to try in order: the destination, then simplified forms of it.
 
-    except Exception as e:
-      raise ValueError(f"API request failed: {str(e)}")
+    Returns:
+      List[str]: The full destination, the part before the first comma, and its first word.
+    """
+    queries = [destination]
+    # If no location is found, try to simplify the destination
+    simplified_destination = destination.split(",")[0].strip()
+    if simplified_destination != destination:
+      queries.append(simplified_destination)
+      # Try a very simple query as a last resort, unless it is the same as the
+      # simplified one ("Huế, Việt Nam" -> "Huế" -> "Huế")
+      simple_query = simplified_destination.split()[0]
+      if simple_query not in queries:
+        queries.append(simple_query)
+    return queries
+
+  @staticmethod
+  def _cached_location_id(destination: str) -> Optional[str]:
+    """Returns the remembered location ID for a destination, if any."""
+    return _location_cache.get(destination)
+
+  @staticmethod
+  def _remember_location_id(destination: str, location_data: Dict[str, Any]) -> str:
+    """
+    Takes the location ID from an auto-complete response and caches it for the destination.
+
+    Raises:
+      ValueError: If the response has no location.
+    """
+    if not location_data.get("data"):
+      raise ValueError(f"No location found for destination: {destination}. API Response: {str(location_data)[:200]}")
+
+    location_id = location_data["data"][0]["id"]
+    _location_cache.set(destination, location_id)
+    return location_id
+
+  @staticmethod
+  def _search_params(location_id: str, checkin: str, checkout: str, guests: int) -> Dict[str, Any]:
+    """Builds the hotel search query for a location and stay."""
+    return {
+      "locationId": location_id,
+      "checkinDate": checkin,
+      "checkoutDate": checkout,
+      "units": "metric",
+      "temperature": "c",
+      "adults": guests,
+    }
+
+  @staticmethod
+  def _parse_hotels(search_data: Dict[str, Any], destination: str, max_results: int) -> List[Dict[str, Any]]:
+    """
+    Extracts name, price, review count and rating of the first `max_results` hotels.
+
+    Raises:
+      ValueError: If the response lists no (named) hotels.
+    """
+    # Fixed: hotels are directly in the data array
+    hotels = search_data.get("data", [])
+    if not hotels:
+      raise ValueError(f"No hotels found for {destination}")
+
+    results = []
+    for hotel in hotels[:max_results]:
+      name = hotel.get("name")
+      if not name:
+        continue
+
+      # Extract price from priceBreakdown.grossPrice.value
+      price = ((hotel.get("priceBreakdown") or _EMPTY).get("grossPrice") or _EMPTY).get("value")
+      rating = hotel.get("reviewScore")
+
+      results.append({
+        "name": name,
+        "price_per_night": float(price) if price else None,
+        "review_count": hotel.get("reviewCount", 0),
+        "rating": float(rating) if rating else None
+      })
+
+    if not results:
+      raise ValueError(f"No valid hotels found for {destination}")
+
+    return results
 
   def find_hotels(self, destination, checkin: str = None, checkout: str = None, guests: int = 1, max_results: int = 10) -> List[Dict[str, Any]]:
     """
@@ -223,3 +410,5 @@ class HotelFinder:
 #       float: Total estimated hotel cost for the stay.
 #     """
 #     return round(price_per_night * total_days, 2)
+
+HotelFinder.find_hotels_static.coroutine = HotelFinder.afind_hotels
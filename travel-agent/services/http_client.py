@@ -0,0 +1,117 @@
+import httpx
+import orjson
+import requests
+import urllib3
+import urllib.request
+from typing import Any, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared connection pool for every external API called by the services.
+# Reusing one Session keeps TCP/TLS connections alive between tool calls
+# instead of paying a fresh handshake on each request.
+_POOL_CONNECTIONS = 16
+_POOL_MAXSIZE = 32
+
+# Transient failures (connection resets, rate limiting, 5xx) are retried with
+# a short exponential backoff on the pooled connection instead of failing the
+# tool call. Only idempotent methods are retried, so Tavily POSTs are not.
+# After the last attempt the error response is returned for raise_for_status.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(429, 500, 502, 503, 504),
+    raise_on_status=False,
+)
+
+def _build_session() -> requests.Session:
+    """
+    Creates a requests Session with a pooled, retrying HTTP adapter mounted for http and https.
+
+    Returns:
+        requests.Session: A session whose connections are kept alive and reused.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=_POOL_CONNECTIONS, pool_maxsize=_POOL_MAXSIZE, max_retries=_RETRY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_SESSION = _build_session()
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide HTTP session shared by all services.
+
+    Returns:
+        requests.Session: The shared, connection-pooled session.
+    """
+    return _SESSION
+
+# Plain JSON GETs (geocoding, places, exchange rates) skip requests' session
+# machinery (prepared requests, hooks, cookie merging, per-request proxy
+# resolution) and go straight to a urllib3 pool with the same retry policy.
+# urllib3 does not read proxy settings, so when a proxy is configured the
+# requests session is used instead.
+_POOL = urllib3.PoolManager(num_pools=_POOL_CONNECTIONS, maxsize=_POOL_MAXSIZE, retries=_RETRY)
+_USE_SESSION = bool(urllib.request.getproxies())
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> Any:
+    """
+    Performs a GET request and decodes the JSON body.
+
+    Args:
+        url (str): The URL to fetch.
+        params (Dict[str, Any], optional): Query string parameters.
+        timeout (float, optional): Seconds to wait for the server. Defaults to 10.
+
+    Returns:
+        Any: The decoded JSON document.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails or returns an error status.
+    """
+    if _USE_SESSION:
+        response = _SESSION.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    try:
+        response = _POOL.request("GET", url, fields=params, timeout=timeout)
+    except urllib3.exceptions.HTTPError as e:
+        raise requests.exceptions.ConnectionError(f"GET {url} failed: {e}") from e
+    if response.status >= 400:
+        raise requests.exceptions.HTTPError(f"{response.status} Error for url: {url}")
+    return orjson.loads(response.data)
+
+# Async counterpart for tools awaited on the event loop (agent ainvoke runs).
+# Created on first use so it binds to the running loop.
+_ASYNC_TIMEOUT = 10
+# httpx transports only retry failed connection attempts, never responses
+_ASYNC_CONNECT_RETRIES = 2
+_async_client: Optional[httpx.AsyncClient] = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client shared by all services.
+
+    Returns:
+        httpx.AsyncClient: The shared, connection-pooled async client.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=_ASYNC_TIMEOUT,
+            # An explicit transport ignores the client's `limits`, so pass them here
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=_POOL_MAXSIZE, max_keepalive_connections=_POOL_CONNECTIONS),
+                retries=_ASYNC_CONNECT_RETRIES,
+            ),
+        )
+    return _async_client
+
+async def aclose_async_client() -> None:
+    """Closes the shared async client, if one was created."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -1,6 +1,64 @@
 import os
+import orjson
 from services.llm_utils import get_llm, get_default_prompt
-from typing import Any
+from services.response_cache import response_cache
+from typing import Any, Final
+
+_ITINERARY_SYSTEM_PROMPT: Final[str] = (
+    "You are a travel assistant. Generate a detailed day-by-day itinerary with SPECIFIC TIMES, LOCATIONS and DESCRIPTIONS.\\n\\n"
+    "CRITICAL FORMATTING RULES:\\n"
+    "1. Structure: Use exact format 'DAY_NAME, DD MONTH YYYY' for date headers\\n"
+    "2. Time entries: ALWAYS include DEPARTURE TIME and ARRIVAL TIME for each activity\\n"
+    "3. Format each activity as:\\n"
+    "   HH:MM - 🔸 [Activity Name] ([Specific Location])\\n"
+    "   Xuất phát: HH:MM | Đến nơi: HH:MM | Thời gian tham quan: X giờ\\n"
+    "   [Detailed description with address, cost, tips]\\n\\n"
+    "4. Include practical details: exact addresses, transportation time, entry fees\\n"
+    "5. Write descriptions in Vietnamese\\n"
+    "6. Use relevant emojis for each activity type\\n"
+    "7. Plan realistic travel times between locations\\n\\n"
+    "EXAMPLE FORMAT:\\n"
+    "TUESDAY, 25 NOVEMBER 2025\\n\\n"
+    "8:00 - 🍜 Ăn sáng (Phở Bát Đàn)\\n"
+    "Xuất phát: 7:45 | Đến nơi: 8:00 | Thời gian ăn: 45 phút\\n"
+    "Thưởng thức phở truyền thống tại quán nổi tiếng. Địa chỉ: 49 Bát Đàn, Hoàn Kiếm. Giá: 50.000 VND/tô.\\n\\n"
+    "9:30 - 🏛️ Tham quan Văn Miếu - Quốc Tử Giám\\n"
+    "Xuất phát: 9:15 | Đến nơi: 9:30 | Thời gian tham quan: 2 giờ\\n"
+    "Di chuyển 15 phút bằng taxi. Khám phá trường đại học đầu tiên Việt Nam. Địa chỉ: 58 Quốc Tử Giám. Vé: 30.000 VND/người.\\n\\n"
+    "12:00 - 🍽️ Ăn trưa (Bún Chả Hương Liên)\\n"
+    "Xuất phát: 11:45 | Đến nơi: 12:00 | Thời gian ăn: 1 giờ\\n"
+    "Di chuyển 15 phút bằng xe máy. Thưởng thức bún chả authentic. Địa chỉ: 24 Lê Văn Hưu. Giá: 80.000 VND/phần.\\n\\n"
+    "14:00 - ☕ Cà phê trứng (Café Giảng)\\n"
+    "Xuất phát: 13:50 | Đến nơi: 14:00 | Thời gian thưởng thức: 45 phút\\n"
+    "Đi bộ 10 phút. Thưởng thức cà phê trứng độc đáo. Địa chỉ: 39 Nguyễn Hữu Huân. Giá: 35.000 VND/cốc.\\n\\n"
+    "15:30 - 🏮 Dạo phố cổ Hà Nội\\n"
+    "Xuất phát: 15:00 | Đến nơi: 15:30 | Thời gian dạo: 2 giờ\\n"
+    "Đi bộ khám phá 36 phố phường, mua sắm quà lưu niệm. Khu vực: Hoàn Kiếm, Hà Nội.\\n\\n"
+    "18:00 - 🍽️ Ăn tối (Chả cá Lã Vọng)\\n"
+    "Xuất phát: 17:45 | Đến nơi: 18:00 | Thời gian ăn: 1.5 giờ\\n"
+    "Di chuyển 15 phút. Thưởng thức chả cá truyền thống. Địa chỉ: 14 Chả Cá. Giá: 180.000 VND/người.\\n\\n"
+    "20:00 - 🏨 Trở về khách sạn\\n"
+    "Xuất phát: 19:45 | Đến nơi: 20:00 | Nghỉ ngơi\\n"
+    "Di chuyển về khách sạn, chuẩn bị cho ngày hôm sau.\\n\\n"
+    "IMPORTANT:\\n"
+    "- Use 7-9 time slots per day\\n"
+    "- NO markdown (no *, **, ###, ####)\\n"
+    "- Use plain text with emojis and line breaks only"
+)
+
+_ITINERARY_HUMAN_PROMPT: Final[str] = """
+Trip State:
+{state}
+
+Generate the itinerary in the timeline format specified above.
+"""
+
+# Built once at import; every builder shares the same template
+_ITINERARY_PROMPT = get_default_prompt(_ITINERARY_SYSTEM_PROMPT, _ITINERARY_HUMAN_PROMPT)
+
+# Chat messages carry per-call ids and metadata, and the prompt is internal, so
+# neither is sent as is; the conversation is reduced to the latest user message
+_STATE_EXCLUDE: Final[frozenset] = frozenset({"messages", "prompt"})
 
 class ItineraryBuilder:
     """
@@ -11,60 +69,56 @@ class ItineraryBuilder:
     """
     def __init__(self):
         """
-        Initializes the ItineraryBuilder with an LLM and specific prompt templates.
+        Initializes the ItineraryBuilder with specific prompt templates.
         
         Sets up the system prompt to enforce strict formatting rules for the itinerary generation,
         including requirements for specific times, locations, and Vietnamese descriptions.
+        The LLM is the shared client, fetched when an itinerary is first built.
+        """
+        self.prompt = _ITINERARY_PROMPT
+        self.chain = None
+
+    @property
+    def llm(self):
+        """The shared Gemini client (see `get_llm`)."""
+        return get_llm()
+
+    @staticmethod
+    def _state_json(state: Any) -> str:
         """
-        self.llm = get_llm()
-        system_prompt = (
-            "You are a travel assistant. Generate a detailed day-by-day itinerary with SPECIFIC TIMES, LOCATIONS and DESCRIPTIONS.\\n\\n"
-            "CRITICAL FORMATTING RULES:\\n"
-            "1. Structure: Use exact format 'DAY_NAME, DD MONTH YYYY' for date headers\\n"
-            "2. Time entries: ALWAYS include DEPARTURE TIME and ARRIVAL TIME for each activity\\n"
-            "3. Format each activity as:\\n"
-            "   HH:MM - 🔸 [Activity Name] ([Specific Location])\\n"
-            "   Xuất phát: HH:MM | Đến nơi: HH:MM | Thời gian tham quan: X giờ\\n"
-            "   [Detailed description with address, cost, tips]\\n\\n"
-            "4. Include practical details: exact addresses, transportation time, entry fees\\n"
-            "5. Write descriptions in Vietnamese\\n"
-            "6. Use relevant emojis for each activity type\\n"
-            "7. Plan realistic travel times between locations\\n\\n"
-            "EXAMPLE FORMAT:\\n"
-            "TUESDAY, 25 NOVEMBER 2025\\n\\n"
-            "8:00 - 🍜 Ăn sáng (Phở Bát Đàn)\\n"
-            "Xuất phát: 7:45 | Đến nơi: 8:00 | Thời gian ăn: 45 phút\\n"
-            "Thưởng thức phở truyền thống tại quán nổi tiếng. Địa chỉ: 49 Bát Đàn, Hoàn Kiếm. Giá: 50.000 VND/tô.\\n\\n"
-            "9:30 - 🏛️ Tham quan Văn Miếu - Quốc Tử Giám\\n"
-            "Xuất phát: 9:15 | Đến nơi: 9:30 | Thời gian tham quan: 2 giờ\\n"
-            "Di chuyển 15 phút bằng taxi. Khám phá trường đại học đầu tiên Việt Nam. Địa chỉ: 58 Quốc Tử Giám. Vé: 30.000 VND/người.\\n\\n"
-            "12:00 - 🍽️ Ăn trưa (Bún Chả Hương Liên)\\n"
-            "Xuất phát: 11:45 | Đến nơi: 12:00 | Thời gian ăn: 1 giờ\\n"
-            "Di chuyển 15 phút bằng xe máy. Thưởng thức bún chả authentic. Địa chỉ: 24 Lê Văn Hưu. Giá: 80.000 VND/phần.\\n\\n"
-            "14:00 - ☕ Cà phê trứng (Café Giảng)\\n"
-            "Xuất phát: 13:50 | Đến nơi: 14:00 | Thời gian thưởng thức: 45 phút\\n"
-            "Đi bộ 10 phút. Thưởng thức cà phê trứng độc đáo. Địa chỉ: 39 Nguyễn Hữu Huân. Giá: 35.000 VND/cốc.\\n\\n"
-            "15:30 - 🏮 Dạo phố cổ Hà Nội\\n"
-            "Xuất phát: 15:00 | Đến nơi: 15:30 | Thời gian dạo: 2 giờ\\n"
-            "Đi bộ khám phá 36 phố phường, mua sắm quà lưu niệm. Khu vực: Hoàn Kiếm, Hà Nội.\\n\\n"
-            "18:00 - 🍽️ Ăn tối (Chả cá Lã Vọng)\\n"
-            "Xuất phát: 17:45 | Đến nơi: 18:00 | Thời gian ăn: 1.5 giờ\\n"
-            "Di chuyển 15 phút. Thưởng thức chả cá truyền thống. Địa chỉ: 14 Chả Cá. Giá: 180.000 VND/người.\\n\\n"
-            "20:00 - 🏨 Trở về khách sạn\\n"
-            "Xuất phát: 19:45 | Đến nơi: 20:00 | Nghỉ ngơi\\n"
-            "Di chuyển về khách sạn, chuẩn bị cho ngày hôm sau.\\n\\n"
-            "IMPORTANT:\\n"
-            "- Use 7-9 time slots per day\\n"
-            "- NO markdown (no *, **, ###, ####)\\n"
-            "- Use plain text with emojis and line breaks only"
+        Serializes the trip state for the prompt.
+
+        The trip fields are included with keys sorted, and of the conversation
+        only the user's latest message, as `user_request`, since it carries
+        asks such as "đi cùng trẻ nhỏ" that no trip field holds. Message ids
+        and metadata are left out, so the same trip and request always render
+        (and cache) as the same text.
+
+        Args:
+            state (Any): A WorkflowState (or other pydantic model) or a plain dictionary.
+
+        Returns:
+            str: The trip fields and latest user request as compact JSON.
+        """
+        if hasattr(state, "model_dump"):
+            data = state.model_dump(exclude=set(_STATE_EXCLUDE))
+            messages = getattr(state, "messages", None)
+        else:
+            data = {key: value for key, value in state.items() if key not in _STATE_EXCLUDE}
+            messages = state.get("messages")
+        request = next(
+            (m.content for m in reversed(messages or ()) if getattr(m, "type", None) == "human"),
+            None,
         )
-        human_prompt = """
-Trip State:
-{state}
+        if request:
+            data["user_request"] = request
+        return orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS).decode()
 
-Generate the itinerary in the timeline format specified above.
-"""
-        self.prompt = get_default_prompt(system_prompt, human_prompt)
+    def _ensure_chain(self):
+        """Builds the prompt | LLM chain on first use and returns it."""
+        if self.chain is None:
+            self.chain = self.prompt | self.llm
+        return self.chain
 
     def build(self, state: Any) -> dict:
         """
@@ -77,6 +131,10 @@ Generate the itinerary in the timeline format specified above.
         Returns:
             dict: A dictionary containing the generated itinerary string under the key 'itinerary'.
         """
-        chain = self.prompt | self.llm
-        result = chain.invoke({"state": state})
-        return {"itinerary": result.content}
\ No newline at end of file
+        state_json = self._state_json(state)
+        cache_key = response_cache.make_key("itinerary", state_json)
+        itinerary = response_cache.get(cache_key)
+        if itinerary is None:
+            itinerary = self._ensure_chain().invoke({"state": state_json}).content
+            response_cache.set(cache_key, itinerary)
+        return {"itinerary": itinerary}
\ No newline at end of file
@@ -1,22 +1,331 @@
 import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import orjson
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 
 load_dotenv()
 
+logger = logging.getLogger("travel_agent")
+
+# Process-wide Gemini client. Every service and endpoint shares it, so they all
+# reuse the same long-lived gRPC channels (and their TCP/TLS connections)
+# instead of each opening its own.
+_llm: Optional[ChatGoogleGenerativeAI] = None
+
 def get_llm() -> ChatGoogleGenerativeAI:
   """
-  Returns a configured ChatGoogleGenerativeAI instance using environment variables.
+  Returns the shared ChatGoogleGenerativeAI instance, configured from environment variables.
+
+  The client is created on first use and reused afterwards.
 
   Returns:
       ChatGoogleGenerativeAI: An instance of the Gemini chat model configured with the API key and model name.
   """
-  return ChatGoogleGenerativeAI(
-    model=os.getenv("LLM_MODEL", "gemini-2.5-flash"),
-    temperature=0,
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-  )
+  global _llm
+  if _llm is None:
+    _llm = ChatGoogleGenerativeAI(
+      model=os.getenv("LLM_MODEL", "gemini-2.5-flash"),
+      temperature=0,
+      google_api_key=os.getenv("GOOGLE_API_KEY"),
+    )
+  return _llm
+
+# Optional smaller model for short, unambiguous requests (LLM_FAST_MODEL)
+_fast_llm: Optional[ChatGoogleGenerativeAI] = None
+
+def get_fast_llm() -> ChatGoogleGenerativeAI:
+  """
+  Returns the shared client for the smaller model set in LLM_FAST_MODEL.
+
+  Without LLM_FAST_MODEL, or when it names the default model, this is the
+  `get_llm` client itself, so routing to it changes nothing.
+
+  Returns:
+      ChatGoogleGenerativeAI: The fast model's client, or the default one.
+  """
+  global _fast_llm
+  model = os.getenv("LLM_FAST_MODEL")
+  if not model or model == os.getenv("LLM_MODEL", "gemini-2.5-flash"):
+    return get_llm()
+  if _fast_llm is None:
+    _fast_llm = ChatGoogleGenerativeAI(
+      model=model,
+      temperature=0,
+      google_api_key=os.getenv("GOOGLE_API_KEY"),
+    )
+  return _fast_llm
+
+async def aclose_llm() -> None:
+  """Closes the shared clients' async gRPC channels, if any were opened."""
+  global _llm, _fast_llm
+  for client in (_llm, _fast_llm):
+    if client is not None and client.async_client_running is not None:
+      await client.async_client_running.transport.close()
+  _llm = None
+  _fast_llm = None
+
+def get_json_llm(max_output_tokens: Optional[int] = None):
+  """
+  Returns the default Gemini model bound to JSON response mode.
+
+  With `response_mime_type` set to `application/json` Gemini emits a bare JSON
+  document, so callers can parse the reply directly instead of searching for
+  the JSON object inside free text.
+
+  Args:
+      max_output_tokens (int, optional): Cap on generated tokens. Defaults to the
+        LLM_MAX_OUTPUT_TOKENS environment variable, or 8192.
+
+  Returns:
+      Runnable: The chat model with the JSON generation config bound.
+  """
+  if max_output_tokens is None:
+    max_output_tokens = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "8192"))
+  return get_llm().bind(generation_config={
+    "response_mime_type": "application/json",
+    "max_output_tokens": max_output_tokens,
+  })
+
+class SystemPromptCache:
+  """
+  Registers static system prompts as Gemini CachedContent resources.
+
+  A cached prompt is referenced by name instead of being re-sent with every
+  request, so its input tokens are billed at the cached rate and skip prefill.
+  Entries are keyed by a SHA-256 of the prompt text and dropped shortly before
+  their TTL runs out; an expired or missing entry is (re)created in a worker
+  thread while the caller falls back to sending the full prompt.
+  """
+
+  # Stop using a cache this many seconds before Gemini expires it
+  EXPIRY_MARGIN = 60
+  # After a failed upload, wait this long before trying again
+  RETRY_AFTER = 300
+
+  def __init__(self, ttl: int = 3600):
+    """
+    Initializes an empty registry.
+
+    Args:
+      ttl (int, optional): Lifetime of each cached prompt in seconds; 0 disables
+        caching. Defaults to 3600.
+    """
+    self.ttl = ttl
+    # key -> (cache name, or None after a failed upload; monotonic deadline)
+    self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+    self._refreshing: Set[str] = set()
+
+  @staticmethod
+  def _key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+  def create(self, display_name: str, text: str) -> Optional[str]:
+    """
+    Uploads a system prompt as cached content (blocking network call).
+
+    Args:
+      display_name (str): Human-readable name of the cache resource.
+      text (str): The system prompt to cache.
+
+    Returns:
+      Optional[str]: The cache resource name, or None if Gemini rejected it
+        (e.g. the prompt is below the model's minimum cacheable size).
+    """
+    key = self._key(text)
+    try:
+      cache_name = get_llm().create_cached_content(
+        [SystemMessage(content=text)], display_name=display_name, ttl=self.ttl
+      )
+    except Exception as e:
+      logger.warning("Could not cache system prompt %s: %s", display_name, e)
+      self._entries[key] = (None, time.monotonic() + self.RETRY_AFTER)
+      return None
+    finally:
+      self._refreshing.discard(key)
+    self._entries[key] = (cache_name, time.monotonic() + self.ttl - self.EXPIRY_MARGIN)
+    logger.info("Cached system prompt %s as %s", display_name, cache_name)
+    return cache_name
+
+  def get(self, display_name: str, text: str) -> Optional[str]:
+    """
+    Returns the live cache name for a prompt, scheduling a refresh if needed.
+
+    Args:
+      display_name (str): Human-readable name of the cache resource.
+      text (str): The system prompt.
+
+    Returns:
+      Optional[str]: The cache resource name, or None if the full prompt must
+        be sent with this request.
+    """
+    if self.ttl <= 0:
+      return None
+    key = self._key(text)
+    entry = self._entries.get(key)
+    if entry is not None and time.monotonic() < entry[1]:
+      return entry[0]
+
+    self._entries.pop(key, None)
+    if key not in self._refreshing:
+      try:
+        loop = asyncio.get_running_loop()
+      except RuntimeError:
+        return None
+      self._refreshing.add(key)
+      loop.run_in_executor(None, self.create, display_name, text)
+    return None
+
+  def invalidate(self, text: str) -> None:
+    """
+    Forgets a cached prompt, e.g. after Gemini rejected a request using it.
+
+    Args:
+      text (str): The system prompt.
+    """
+    self._entries.pop(self._key(text), None)
+
+
+# Global instance
+system_prompt_cache = SystemPromptCache(ttl=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")))
+
+# Characters that matter when scanning for a JSON object; everything else is
+# skipped by the regex engine rather than the Python loop
+_JSON_SCAN_RE = re.compile(r'[{}"\\]')
+
+def _extract_json(text: str, start: int = 0) -> Optional[Tuple[int, int]]:
+  """
+  Finds the first balanced `{...}` object in a reply in a single pass.
+
+  Braces inside JSON strings (and escaped quotes) are ignored, so prose before
+  the object or stray `}` in trailing commentary do not throw the span off.
+
+  Args:
+      text (str): The raw model output.
+      start (int, optional): Offset to start scanning from. Defaults to 0.
+
+  Returns:
+      Optional[Tuple[int, int]]: The `[start, end)` span of the object, or None
+        if no complete object follows `start`.
+  """
+  depth = 0
+  obj_start = -1
+  in_string = False
+  escaped_pos = -1
+  for match in _JSON_SCAN_RE.finditer(text, start):
+    ch = match.group()
+    pos = match.start()
+    if in_string:
+      if pos == escaped_pos:
+        continue
+      if ch == '\\':
+        escaped_pos = pos + 1
+      elif ch == '"':
+        in_string = False
+      continue
+    if ch == '"':
+      if depth:
+        in_string = True
+    elif ch == '{':
+      if depth == 0:
+        obj_start = pos
+      depth += 1
+    elif ch == '}' and depth:
+      depth -= 1
+      if depth == 0:
+        return obj_start, pos + 1
+  return None
+
+def parse_json_response(text: str) -> Any:
+  """
+  Parses a JSON object from an LLM reply.
+
+  The reply is parsed directly first. If that fails (e.g. the model wrapped the
+  JSON in prose or a code fence), each balanced `{...}` object found by
+  `_extract_json` is tried in turn.
+
+  Args:
+      text (str): The raw model output.
+
+  Returns:
+      Any: The decoded JSON value.
+
+  Raises:
+      orjson.JSONDecodeError: If the extracted JSON is malformed.
+      ValueError: If the reply contains no JSON object.
+  """
+  try:
+    return orjson.loads(text)  # leading/trailing whitespace is accepted as-is
+  except orjson.JSONDecodeError as e:
+    error: Exception = e
+  span = _extract_json(text)
+  if span is None:
+    raise ValueError("No JSON found in response")
+  while span is not None:
+    try:
+      return orjson.loads(text[span[0]:span[1]])
+    except orjson.JSONDecodeError as e:
+      # e.g. a "{placeholder}" in the prose before the real object
+      error = e
+      span = _extract_json(text, span[0] + 1)
+  raise error
+
+async def run_llm_json(
+  call: Awaitable[Any],
+  subject: str,
+  validate: Optional[Callable[[Any], Any]] = None,
+) -> Tuple[bool, Any, str]:
+  """
+  Awaits an LLM call, then parses and validates its JSON reply.
+
+  This is the shared hot path of the plan endpoints: the model call, the JSON
+  decode and the schema check, each failure mapped to a user-facing message.
+
+  Args:
+      call (Awaitable[Any]): The pending model call, e.g. `chain.ainvoke(...)`;
+        it must resolve to a message with a `content` string.
+      subject (str): What is being generated, used in error messages
+        (e.g. "kế hoạch mới").
+      validate (Callable[[Any], Any], optional): Validator for the decoded JSON;
+        it must raise a ValueError subclass when the data is invalid.
+
+  Returns:
+      Tuple[bool, Any, str]: `(ok, result, raw)`. On success `result` is the
+        decoded JSON; on failure it is the error message. `raw` is the model
+        output, or an empty string if the call itself failed.
+  """
+  try:
+    response = await call
+  except Exception as e:
+    logger.exception("Gemini API error: %s", e)
+    return False, f"Lỗi gọi Gemini API: {str(e)}. Vui lòng kiểm tra API key và model.", ""
+
+  raw = response.content
+  usage = getattr(response, "usage_metadata", None)
+  if usage:
+    logger.info("Generated %s: %s output tokens", subject, usage.get("output_tokens"))
+  try:
+    result = parse_json_response(raw)
+  except ValueError as e:  # orjson.JSONDecodeError is a ValueError too
+    logger.warning("Could not parse %s: %s", subject, e)
+    return False, f"Không thể phân tích {subject}: {str(e)}", raw
+
+  if validate is not None:
+    try:
+      validate(result)
+    except ValueError as e:
+      message = getattr(e, "message", str(e))
+      logger.warning("Invalid %s: %s", subject, message)
+      return False, f"{subject[0].upper()}{subject[1:]} không hợp lệ: {message}", raw
+
+  return True, result, raw
 
 def get_default_prompt(system_message: str, human_message: str) -> ChatPromptTemplate:
   """
@@ -0,0 +1,50 @@
+import os
+import threading
+from typing import Any, Optional
+from cachetools import TTLCache
+
+class LookupCache:
+    """
+    Thread-safe TTL cache for per-destination API lookups (coordinates, location IDs).
+
+    Entries are keyed by the destination name with case and whitespace collapsed,
+    so "Paris", " paris " and "PARIS" share one entry. Only found values should be
+    stored; a miss is looked up again next time.
+    """
+
+    def __init__(self, ttl_env: str, maxsize: int = 1024, default_ttl: int = 86400):
+        """
+        Initializes an empty cache.
+
+        Args:
+            ttl_env (str): Environment variable holding the entry lifetime in seconds.
+            maxsize (int, optional): Maximum number of destinations to keep. Defaults to 1024.
+            default_ttl (int, optional): Lifetime used when `ttl_env` is not set. Defaults to a day.
+        """
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=int(os.getenv(ttl_env, str(default_ttl))))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(destination: str) -> str:
+        """Collapses case and whitespace so spellings of the same place share a cache entry."""
+        return " ".join(destination.split()).lower()
+
+    def get(self, destination: str) -> Optional[Any]:
+        """Returns the cached value for a destination, or None."""
+        key = self.key(destination)
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, destination: str, value: Any) -> None:
+        """Caches a value for a destination."""
+        key = self.key(destination)
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self) -> None:
+        """Removes every cached entry."""
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,72 @@
+import fastjsonschema
+
+# JSON schema for the trip plan returned by Gemini from /generate-trip-plan and
+# as `new_plan` from /edit-plan. It checks the structure the mobile app imports
+# (trip info, days, activities) and leaves the descriptive fields open, since
+# the model is free to add extra keys such as "travel_from_previous".
+# Numbers the model may leave as null (no stated budget, a free activity); the
+# app checks these for null itself
+_OPTIONAL_NUMBER = {"type": ["number", "null"]}
+
+TRIP_PLAN_SCHEMA = {
+  "type": "object",
+  "required": ["trip_info", "daily_plans"],
+  "properties": {
+    "trip_info": {
+      "type": "object",
+      "required": ["destination"],
+      "properties": {
+        "name": {"type": "string"},
+        "destination": {"type": "string"},
+        "start_date": {"type": "string"},
+        "end_date": {"type": "string"},
+        "duration_days": _OPTIONAL_NUMBER,
+        "travelers_count": _OPTIONAL_NUMBER,
+        "total_budget": _OPTIONAL_NUMBER,
+        "currency": {"type": "string"},
+      },
+    },
+    "daily_plans": {
+      "type": "array",
+      "minItems": 1,
+      "items": {
+        "type": "object",
+        "required": ["activities"],
+        "properties": {
+          "day": {"type": "number"},
+          "date": {"type": "string"},
+          "activities": {
+            "type": "array",
+            "items": {
+              "type": "object",
+              "required": ["title"],
+              "properties": {
+                "title": {"type": "string"},
+                "start_time": {"type": "string"},
+                "duration_hours": _OPTIONAL_NUMBER,
+                "estimated_cost": _OPTIONAL_NUMBER,
+              },
+            },
+          },
+        },
+      },
+    },
+    "summary": {"type": "object"},
+  },
+}
+
+# Reply of /edit-plan: the new plan wrapped with the action and a message
+EDIT_PLAN_SCHEMA = {
+  "type": "object",
+  "required": ["new_plan"],
+  "properties": {
+    "action_type": {"type": "string"},
+    "message": {"type": "string"},
+    "new_plan": TRIP_PLAN_SCHEMA,
+  },
+}
+
+# Compiled once at import; the returned closures are reused for every response.
+# They raise fastjsonschema.JsonSchemaException (a ValueError) on invalid data.
+validate_trip_plan = fastjsonschema.compile(TRIP_PLAN_SCHEMA)
+validate_edit_plan = fastjsonschema.compile(EDIT_PLAN_SCHEMA)
@@ -0,0 +1,123 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+class PlanStreamParser:
+  """
+  Incrementally extracts completed sections of a streamed trip plan.
+
+  Gemini streams the plan JSON in text chunks. After each chunk, the parser
+  walks the members of the top-level object that have closed and returns
+  `trip_info` and each finished element of `daily_plans`, so the client can
+  render the first days while later ones are still being generated. The
+  complete text is kept in `buffer` for the final full parse and validation.
+  """
+
+  def __init__(self):
+    """Initializes an empty parser."""
+    self.buffer = ""
+    self._decoder = json.JSONDecoder()
+    # Start of the next member of the top-level object, once its "{" is seen
+    self._member_pos: Optional[int] = None
+    # Position inside the top-level "daily_plans" array while it is open
+    self._days_pos: Optional[int] = None
+    self._done = False
+
+  def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+    """
+    Adds a chunk of model output and returns the sections it completed.
+
+    Args:
+      chunk (str): The next piece of streamed text.
+
+    Returns:
+      List[Tuple[str, Any]]: `("trip_info", dict)` and `("day", dict)` events,
+        in the order they were completed.
+    """
+    self.buffer += chunk
+    events: List[Tuple[str, Any]] = []
+    if self._member_pos is None:
+      # Skip anything before the plan object, such as a code fence
+      start = self.buffer.find("{")
+      if start < 0:
+        return events
+      self._member_pos = start + 1
+    while not self._done and self._next_member(events):
+      pass
+    return events
+
+  def _skip_space(self, pos: int, chars: str = " \t\r\n") -> int:
+    """Returns the first position at or after `pos` that is not one of `chars`."""
+    while pos < len(self.buffer) and self.buffer[pos] in chars:
+      pos += 1
+    return pos
+
+  def _next_member(self, events: List[Tuple[str, Any]]) -> bool:
+    """
+    Consumes the next member of the top-level object, if it is complete.
+
+    Only keys at depth 1 are considered, so a "trip_info" or "daily_plans"
+    key nested inside another value is never mistaken for the plan's own.
+    Days are emitted one by one while `daily_plans` is still open.
+
+    Args:
+      events (List[Tuple[str, Any]]): Completed sections are appended here.
+
+    Returns:
+      bool: True if a whole member was consumed and the next one can be tried.
+    """
+    if self._days_pos is not None:
+      return self._consume_days(events)
+
+    pos = self._skip_space(self._member_pos, " \t\r\n,")
+    if pos >= len(self.buffer):
+      return False
+    if self.buffer[pos] == "}":
+      self._done = True
+      return False
+    try:
+      key, pos = self._decoder.raw_decode(self.buffer, pos)
+    except json.JSONDecodeError:
+      return False
+    pos = self._skip_space(pos)
+    if pos >= len(self.buffer) or self.buffer[pos] != ":":
+      return False
+    pos = self._skip_space(pos + 1)
+    if pos >= len(self.buffer):
+      return False
+
+    if key == "daily_plans" and self.buffer[pos] == "[":
+      self._days_pos = pos + 1
+      return self._consume_days(events)
+    try:
+      value, end = self._decoder.raw_decode(self.buffer, pos)
+    except json.JSONDecodeError:
+      return False
+    if key == "trip_info" and isinstance(value, dict):
+      events.append(("trip_info", value))
+    self._member_pos = end
+    return True
+
+  def _consume_days(self, events: List[Tuple[str, Any]]) -> bool:
+    """
+    Emits every `daily_plans` element that has closed since the last call.
+
+    Args:
+      events (List[Tuple[str, Any]]): Completed days are appended here.
+
+    Returns:
+      bool: True once the array has closed and the next member can be tried.
+    """
+    while True:
+      pos = self._skip_space(self._days_pos, " \t\r\n,")
+      if pos >= len(self.buffer):
+        return False
+      if self.buffer[pos] == "]":
+        self._member_pos = pos + 1
+        self._days_pos = None
+        return True
+      try:
+        day, end = self._decoder.raw_decode(self.buffer, pos)
+      except json.JSONDecodeError:
+        return False
+      events.append(("day", day))
+      self._days_pos = end
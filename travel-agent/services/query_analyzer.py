@@ -1,8 +1,46 @@
 from models import QueryAnalysisResult
-from services.llm_utils import get_llm, get_default_prompt
-import os
-from datetime import datetime, timedelta
+from services.llm_utils import get_fast_llm, get_llm, get_default_prompt
+from services.response_cache import response_cache
 import re
+from datetime import date
+from typing import List
+
+# Most LLM calls `analyze_many` keeps in flight at once
+_BATCH_CONCURRENCY = 8
+
+# Queries at most this long, without any of the hedging markers below, are
+# simple enough for the fast model (see `get_fast_llm`)
+_SIMPLE_QUERY_LENGTH = 200
+_AMBIGUITY_MARKERS = re.compile(
+  r"\b(?:maybe|not sure|options|or|either|có thể|hoặc|chưa chắc|chưa biết|phân vân|tùy)\b"
+)
+
+def _is_simple_query(user_query: str) -> bool:
+  """True if the query is short and states its details without hedging."""
+  return len(user_query) <= _SIMPLE_QUERY_LENGTH and not _AMBIGUITY_MARKERS.search(user_query.casefold())
+
+# Words that only come up when someone is planning a trip. Matching one is
+# enough to call a message travel-related without asking the LLM; messages
+# without one (e.g. just "Đà Lạt 3 ngày") still go to the LLM evaluator.
+_TRAVEL_MARKERS = re.compile(
+  r"\b(?:du lịch|chuyến đi|đi chơi|lịch trình|nghỉ dưỡng|tham quan|khách sạn|đặt phòng|vé máy bay"
+  r"|travel|trip|vacation|holiday|itinerary|sightseeing|hotel|hostel|flight)\b"
+)
+
+def is_travel_query(user_query: str) -> bool:
+  """
+  Cheap pre-LLM check for messages that are clearly about planning a trip.
+
+  A False result is not a rejection: it only means the keywords do not
+  settle the question and the LLM evaluator has to decide.
+
+  Args:
+    user_query (str): The user's message.
+
+  Returns:
+    bool: True if the message contains an unambiguous travel keyword.
+  """
+  return _TRAVEL_MARKERS.search(user_query.casefold()) is not None
 
 class QueryAnalyzer:
   """
@@ -16,10 +54,11 @@ class QueryAnalyzer:
     """
     Initializes the QueryAnalyzer.
 
-    Sets up the LLM, prompt templates, and the JSON output parser with
-    specific instructions for extracting travel-related entities.
+    Sets up the prompt templates with specific instructions for extracting
+    travel-related entities. The chain is built on
+    the first `analyze` call, so constructing an analyzer does not create the
+    Gemini client.
     """
-    self.llm = get_llm()
     system_prompt = (
       "Bạn là một chuyên gia tư vấn du lịch thông minh và thân thiện. "
       "Nhiệm vụ của bạn là phân tích yêu cầu của người dùng và trích xuất thông tin cần thiết để lập kế hoạch du lịch. "
@@ -40,10 +79,38 @@ class QueryAnalyzer:
     )
     human_prompt = "{user_query}"
     self.prompt = get_default_prompt(system_prompt, human_prompt)
-    # Use a different approach for structured output to avoid langchain-core beta issues
-    from langchain_core.output_parsers import JsonOutputParser
-    self.output_parser = JsonOutputParser(pydantic_object=QueryAnalysisResult)
-    self.chain = self.prompt | self.llm | self.output_parser
+    self.chain = None
+    self.fast_chain = None
+
+  @property
+  def llm(self):
+    """The shared Gemini client (see `get_llm`)."""
+    return get_llm()
+
+  def _ensure_chain(self):
+    """
+    Builds the prompt | structured LLM chain on first use and returns it.
+
+    `with_structured_output` makes Gemini answer with a forced function call
+    whose arguments follow the `QueryAnalysisResult` schema, so the reply is
+    decoded against the schema instead of parsed out of free text.
+    """
+    if self.chain is None:
+      self.chain = self.prompt | self.llm.with_structured_output(QueryAnalysisResult)
+    return self.chain
+
+  def _chain_for(self, user_query: str):
+    """
+    Picks the chain for a query: the fast model's for simple queries, when one
+    is configured, otherwise the default chain.
+    """
+    if _is_simple_query(user_query):
+      fast_llm = get_fast_llm()
+      if fast_llm is not self.llm:
+        if self.fast_chain is None:
+          self.fast_chain = self.prompt | fast_llm.with_structured_output(QueryAnalysisResult)
+        return self.fast_chain
+    return self._ensure_chain()
 
   def analyze(self, user_query: str) -> QueryAnalysisResult:
     """
@@ -56,17 +123,99 @@ class QueryAnalyzer:
       QueryAnalysisResult: A structured object containing extracted fields like destination,
                            dates, budget, and a list of any missing required fields.
     """
+    # The raw extraction is cached per normalized query; date post-processing
+    # depends on today's date, so it runs on every call
+    cache_key = response_cache.make_key("query-analysis", user_query)
+    result_dict = response_cache.get(cache_key)
+    if result_dict is not None:
+      return self._finish(result_dict, user_query)
     try:
-      result_dict = self.chain.invoke({"user_query": user_query})
-      result = QueryAnalysisResult(**result_dict)
-    except Exception as e:
-      # Fallback: return empty result if parsing fails
+      extracted = self._chain_for(user_query).invoke({"user_query": user_query})
+    except Exception:
+      extracted = None
+    return self._finish(extracted, user_query, cache_key)
+
+  async def aanalyze(self, user_query: str) -> QueryAnalysisResult:
+    """
+    Async version of `analyze`, used by the workflow so the LLM call does not block the event loop.
+
+    Args:
+      user_query (str): The natural language query from the user.
+
+    Returns:
+      QueryAnalysisResult: The same result `analyze` returns for the query.
+    """
+    cache_key = response_cache.make_key("query-analysis", user_query)
+    result_dict = response_cache.get(cache_key)
+    if result_dict is not None:
+      return self._finish(result_dict, user_query)
+    try:
+      extracted = await self._chain_for(user_query).ainvoke({"user_query": user_query})
+    except Exception:
+      extracted = None
+    return self._finish(extracted, user_query, cache_key)
+
+  def analyze_many(self, user_queries: List[str]) -> List[QueryAnalysisResult]:
+    """
+    Analyzes several queries, sending the uncached ones to the LLM in one batch
+    per chain, so each query still goes to the model `_chain_for` picks.
+
+    Each batch runs up to `_BATCH_CONCURRENCY` calls at a time; a failed call
+    gives an empty result for its query only.
+
+    Args:
+      user_queries (List[str]): The natural language queries.
+
+    Returns:
+      List[QueryAnalysisResult]: One result per query, in input order.
+    """
+    cache_keys = [response_cache.make_key("query-analysis", q) for q in user_queries]
+    cached = [response_cache.get(key) for key in cache_keys]
+    misses = [i for i, result_dict in enumerate(cached) if result_dict is None]
+    # Group misses by chain (compared by identity) so each model gets one batch
+    groups = {}
+    for i in misses:
+      chain = self._chain_for(user_queries[i])
+      groups.setdefault(id(chain), (chain, []))[1].append(i)
+    extracted = {}
+    for chain, indices in groups.values():
+      outputs = chain.batch(
+        [{"user_query": user_queries[i]} for i in indices],
+        config={"max_concurrency": _BATCH_CONCURRENCY},
+        return_exceptions=True,
+      )
+      extracted.update((i, None if isinstance(out, Exception) else out) for i, out in zip(indices, outputs))
+    return [
+      self._finish(extracted[i], q, cache_keys[i]) if i in extracted else self._finish(cached[i], q)
+      for i, q in enumerate(user_queries)
+    ]
+
+  def _finish(self, extracted, user_query: str, cache_key: str = None) -> QueryAnalysisResult:
+    """
+    Builds the result from an extraction and applies the date logic.
+
+    Args:
+      extracted: The LLM's extraction (a result model, or its cached dict), or
+        None if the call failed or the model made no function call.
+      user_query (str): The user's input string.
+      cache_key (str, optional): Set for a fresh extraction, which is cached if it is valid.
+
+    Returns:
+      QueryAnalysisResult: The analysis result, empty if the extraction was unusable.
+    """
+    try:
+      if isinstance(extracted, QueryAnalysisResult):
+        result = extracted
+      else:
+        result = QueryAnalysisResult(**extracted)
+      if cache_key is not None:
+        response_cache.set(cache_key, result.model_dump())
+    except Exception:
+      # Fallback: return empty result if the call or parsing fails
       result = QueryAnalysisResult()
 
     # Post-process to handle date logic
-    result = self._handle_date_logic(result, user_query)
-
-    return result
+    return self._handle_date_logic(result, user_query)
 
   def analyze_query(self, user_query: str) -> QueryAnalysisResult:
     """
@@ -94,11 +243,11 @@ class QueryAnalyzer:
     Returns:
       QueryAnalysisResult: The updated analysis result with post-processed date logic.
     """
-    today = datetime.now().date()
+    today = date.today()
     
     # Rule 1: If user provides end_date but no start_date, set start_date to today
     if not result.start_date and result.end_date:
-      result.start_date = today.strftime('%Y-%m-%d')
+      result.start_date = today.isoformat()
       # Remove start_date from missing_fields if it was there
       if result.missing_fields and 'start_date' in result.missing_fields:
         result.missing_fields.remove('start_date')
@@ -110,8 +259,8 @@ class QueryAnalyzer:
     # Calculate days if we have both dates
     if result.start_date and result.end_date:
       try:
-        start = datetime.strptime(result.start_date, '%Y-%m-%d').date()
-        end = datetime.strptime(result.end_date, '%Y-%m-%d').date()
+        start = date.fromisoformat(result.start_date)
+        end = date.fromisoformat(result.end_date)
         result.days = str((end - start).days + 1)  # Include both start and end day, convert to string
       except ValueError:
         pass  # Keep original days if date parsing fails
@@ -0,0 +1,119 @@
+import os
+import hashlib
+import orjson
+from typing import Any, Dict, List, Optional
+from cachetools import LRUCache
+
+class ResponseCache:
+  """
+  In-memory LRU cache for parsed LLM responses.
+
+  Plan generation and plan editing each cost a multi-second Gemini call. Users
+  frequently retry or resend the same request, so the parsed result is cached
+  under a stable hash of the normalized request and returned directly on a hit.
+  """
+
+  def __init__(self, maxsize: int = 1024, enabled: bool = True):
+    """
+    Initializes an empty cache.
+
+    Args:
+      maxsize (int, optional): Maximum number of responses to keep. Defaults to 1024.
+      enabled (bool, optional): When False every lookup misses and nothing is stored.
+    """
+    self._cache: LRUCache = LRUCache(maxsize=maxsize)
+    self.maxsize = maxsize
+    self.enabled = enabled
+    self.hits = 0
+    self.misses = 0
+
+  @staticmethod
+  def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+  @staticmethod
+  def _history_json(history: Optional[List[Any]]) -> bytes:
+    # Messages may be plain dicts or pydantic models
+    return orjson.dumps(history or [], default=lambda obj: obj.model_dump(), option=orjson.OPT_SORT_KEYS)
+
+  @staticmethod
+  def make_key(namespace: str, text: str, scope: str = "", history: Optional[List[Any]] = None) -> str:
+    """
+    Builds a cache key from the request fields that influence the LLM output.
+
+    Args:
+      namespace (str): Endpoint name, so different prompt types never collide.
+      text (str): The user's command or prompt; whitespace and case are normalized.
+      scope (str, optional): Extra identifier such as the trip ID.
+      history (List[Any], optional): Conversation messages (dicts or models) sent as context.
+
+    Returns:
+      str: A hex digest identifying the request.
+    """
+    normalized = ResponseCache._normalize(text)
+    raw = b"\x1f".join((
+      namespace.encode("utf-8"),
+      normalized.encode("utf-8"),
+      scope.encode("utf-8"),
+      ResponseCache._history_json(history),
+    ))
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+  def get(self, key: str) -> Optional[Any]:
+    """
+    Looks up a cached response.
+
+    Args:
+      key (str): Key produced by `make_key`.
+
+    Returns:
+      Optional[Any]: The cached value, or None on a miss.
+    """
+    if not self.enabled:
+      return None
+    value = self._cache.get(key)
+    if value is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    return value
+
+  def set(self, key: str, value: Any) -> None:
+    """
+    Stores a response, evicting the least recently used entry when full.
+
+    Args:
+      key (str): Key produced by `make_key`.
+      value (Any): The parsed response to cache.
+    """
+    if not self.enabled:
+      return
+    self._cache[key] = value
+
+  def clear(self) -> None:
+    """Removes all cached responses and resets the hit/miss counters."""
+    self._cache.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def stats(self) -> Dict[str, Any]:
+    """
+    Returns cache usage counters.
+
+    Returns:
+      Dict[str, Any]: Whether the cache is enabled, its size and hit/miss counts.
+    """
+    return {
+      "enabled": self.enabled,
+      "size": len(self._cache),
+      "maxsize": self.maxsize,
+      "hits": self.hits,
+      "misses": self.misses,
+    }
+
+  def __len__(self) -> int:
+    return len(self._cache)
+
+
+# Global instance
+response_cache = ResponseCache(enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "false")
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+  """
+  Coalesces concurrent identical calls into one.
+
+  The first `run` for a key starts the work as a task; any `run` for the same
+  key while that task is still going awaits the same task instead of starting
+  another. Once it finishes the key is forgotten, so later calls start fresh
+  (repeat requests after that are served by the response cache).
+
+  Callers await the task through `asyncio.shield`, so a client disconnecting
+  does not cancel the work the other callers are waiting on.
+  """
+
+  def __init__(self):
+    """Initializes with no calls in flight."""
+    self._inflight: Dict[str, asyncio.Task] = {}
+    self.shared = 0
+
+  async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs `factory()` unless an identical call is already in flight.
+
+    Args:
+      key (str): Identifies identical calls, e.g. a response cache key.
+      factory (Callable): Zero-argument coroutine function doing the work.
+
+    Returns:
+      Any: The result of the (possibly shared) call.
+
+    Raises:
+      Exception: Whatever the shared call raised.
+    """
+    task = self._inflight.get(key)
+    if task is None:
+      task = asyncio.ensure_future(factory())
+      self._inflight[key] = task
+      task.add_done_callback(lambda done: self._forget(key, done))
+    else:
+      self.shared += 1
+    return await asyncio.shield(task)
+
+  def _forget(self, key: str, task: asyncio.Task) -> None:
+    """Drops a finished task and marks its exception as retrieved."""
+    if self._inflight.get(key) is task:
+      del self._inflight[key]
+    if not task.cancelled():
+      task.exception()
+
+  def __len__(self) -> int:
+    return len(self._inflight)
@@ -1,9 +1,97 @@
-import os
-from langchain.tools import tool
+import re
+import orjson
 from services.llm_utils import get_llm, get_default_prompt
-from typing import Dict, Any
+from services.response_cache import response_cache
+from typing import Final, Iterator
 
 
+# The static instructions form the system message and every request's
+# dynamic trip data goes in the human message after them, so the prompt prefix
+# is byte-identical across calls and eligible for Gemini's implicit caching
+_SUMMARY_SYSTEM_PROMPT: Final[str] = (
+  "You are a travel expert. Generate a concise trip summary that's easy to scan.\\n\\n"
+  "STRUCTURE (use this exact order):\\n"
+  "1. Trip Header: Destination and dates\\n"
+  "2. Weather Overview: Brief 2-3 sentence summary of weather conditions\\n"
+  "3. Budget Breakdown: Simple bullet list with main categories (accommodation, food, transport, attractions, misc)\\n"
+  "4. Accommodation: 1-2 recommended hotels/stays with brief note\\n"
+  "5. Key Highlights: Top 3-5 must-do activities/attractions\\n"
+  "6. Important Notes: 2-3 practical tips (booking early, cash, clothing, etc.)\\n\\n"
+  "FORMATTING RULES:\\n"
+  "- NO markdown syntax (no *, **, ###, ####, -, bullets)\\n"
+  "- Use emojis to create visual sections: 🌤️ 💰 🏨 🎯 ⚠️\\n"
+  "- Use line breaks and spacing for readability\\n"
+  "- Keep total length under 500 words\\n"
+  "- Write in Vietnamese if the input is in Vietnamese\\n"
+  "- Use natural language: 'Chỗ ở: 1.700.000 VND' instead of bullet points\\n\\n"
+  "EXAMPLE FORMAT:\\n"
+  "🗺️ CHUYẾN ĐI HÀ NỘI\\n"
+  "25 - 27 Tháng 11, 2025 | 3 ngày 2 đêm | 3 người\\n\\n"
+  "🌤️ THỜI TIẾT\\n"
+  "Cuối tháng 11 ở Hà Nội rất lý tưởng với nhiệt độ 15-24°C, trời mát mẻ và ít mưa.\\n\\n"
+  "💰 NGÂN SÁCH (Tổng: 10.000.000 VND)\\n"
+  "Chỗ ở: 1.700.000 VND (2 đêm)\\n"
+  "Ăn uống: 2.700.000 VND\\n"
+  "Di chuyển: 600.000 VND\\n"
+  "Tham quan: 390.000 VND\\n"
+  "Dự phòng: 3.610.000 VND\\n\\n"
+  "🏨 NƠI LƯU TRÚ\\n"
+  "Khách sạn 3 sao khu vực Phố Cổ, gần Hồ Hoàn Kiếm\\n\\n"
+  "🎯 ĐIỂM NHẤN\\n"
+  "Văn Miếu Quốc Tử Giám - Trường đại học đầu tiên VN\\n"
+  "Hoàng Thành Thăng Long - Di sản thế giới\\n"
+  "Phố Cổ Hà Nội - Ẩm thực và văn hóa địa phương\\n"
+  "Múa rối nước - Nghệ thuật truyền thống độc đáo\\n\\n"
+  "⚠️ LƯU Ý\\n"
+  "Đặt phòng sớm để có giá tốt\\n"
+  "Mang theo tiền mặt cho các quán ăn nhỏ\\n"
+  "Mặc trang phục lịch sự khi vào Lăng Bác"
+)
+
+_SUMMARY_HUMAN_PROMPT: Final[str] = """Here is the complete trip plan to summarize:
+
+Trip Plan:
+{trip_plan}
+
+Detailed Itinerary:
+{itinerary}
+
+Generate the summary based on the trip plan and itinerary above."""
+
+# Built once at import; every summary generator shares the same template
+_SUMMARY_PROMPT = get_default_prompt(_SUMMARY_SYSTEM_PROMPT, _SUMMARY_HUMAN_PROMPT)
+
+# Plan fields kept out of the {trip_plan} block: the itinerary has its own
+# placeholder and the message history is reduced to the latest user message
+_OMITTED_PLAN_FIELDS = frozenset({"messages", "itinerary"})
+_EMPTY_VALUES = (None, "", [], {})
+_BLANK_LINE_RUNS = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+
+def _compact_trip_plan(trip_plan: dict) -> str:
+  """
+  Renders the trip plan for the summary prompt as compact JSON.
+
+  Empty fields are dropped, and of the conversation only the user's latest
+  message is kept; it tells the model which language to answer in.
+
+  Args:
+    trip_plan (dict): The trip plan passed to `generate_summary`.
+
+  Returns:
+    str: The plan as JSON text, without the itinerary.
+  """
+  compact = {
+    key: value for key, value in trip_plan.items()
+    if key not in _OMITTED_PLAN_FIELDS and value not in _EMPTY_VALUES
+  }
+  request = next(
+    (m.content for m in reversed(trip_plan.get("messages") or ()) if getattr(m, "type", None) == "human"),
+    None,
+  )
+  if request:
+    compact["user_request"] = request
+  return orjson.dumps(compact, default=str).decode()
+
 class TripSummary:
   """
   A tool to generate a final summary of a trip plan using an LLM.
@@ -16,59 +104,16 @@ class TripSummary:
     """
     Initializes the TripSummary tool.
 
-    Sets up the LLM and the system prompt which enforces strict formatting rules for the summary,
-    including specific emoji usage and section ordering.
+    Uses the shared prompt whose system message enforces strict formatting rules for the summary,
+    including specific emoji usage and section ordering. The LLM is the shared client, fetched
+    when a summary is first generated.
     """
-    self.llm = get_llm()
-    system_prompt = (
-      "You are a travel expert. Generate a concise trip summary that's easy to scan.\\n\\n"
-      "STRUCTURE (use this exact order):\\n"
-      "1. Trip Header: Destination and dates\\n"
-      "2. Weather Overview: Brief 2-3 sentence summary of weather conditions\\n"
-      "3. Budget Breakdown: Simple bullet list with main categories (accommodation, food, transport, attractions, misc)\\n"
-      "4. Accommodation: 1-2 recommended hotels/stays with brief note\\n"
-      "5. Key Highlights: Top 3-5 must-do activities/attractions\\n"
-      "6. Important Notes: 2-3 practical tips (booking early, cash, clothing, etc.)\\n\\n"
-      "FORMATTING RULES:\\n"
-      "- NO markdown syntax (no *, **, ###, ####, -, bullets)\\n"
-      "- Use emojis to create visual sections: 🌤️ 💰 🏨 🎯 ⚠️\\n"
-      "- Use line breaks and spacing for readability\\n"
-      "- Keep total length under 500 words\\n"
-      "- Write in Vietnamese if the input is in Vietnamese\\n"
-      "- Use natural language: 'Chỗ ở: 1.700.000 VND' instead of bullet points\\n\\n"
-      "EXAMPLE FORMAT:\\n"
-      "🗺️ CHUYẾN ĐI HÀ NỘI\\n"
-      "25 - 27 Tháng 11, 2025 | 3 ngày 2 đêm | 3 người\\n\\n"
-      "🌤️ THỜI TIẾT\\n"
-      "Cuối tháng 11 ở Hà Nội rất lý tưởng với nhiệt độ 15-24°C, trời mát mẻ và ít mưa.\\n\\n"
-      "💰 NGÂN SÁCH (Tổng: 10.000.000 VND)\\n"
-      "Chỗ ở: 1.700.000 VND (2 đêm)\\n"
-      "Ăn uống: 2.700.000 VND\\n"
-      "Di chuyển: 600.000 VND\\n"
-      "Tham quan: 390.000 VND\\n"
-      "Dự phòng: 3.610.000 VND\\n\\n"
-      "🏨 NƠI LƯU TRÚ\\n"
-      "Khách sạn 3 sao khu vực Phố Cổ, gần Hồ Hoàn Kiếm\\n\\n"
-      "🎯 ĐIỂM NHẤN\\n"
-      "Văn Miếu Quốc Tử Giám - Trường đại học đầu tiên VN\\n"
-      "Hoàng Thành Thăng Long - Di sản thế giới\\n"
-      "Phố Cổ Hà Nội - Ẩm thực và văn hóa địa phương\\n"
-      "Múa rối nước - Nghệ thuật truyền thống độc đáo\\n\\n"
-      "⚠️ LƯU Ý\\n"
-      "Đặt phòng sớm để có giá tốt\\n"
-      "Mang theo tiền mặt cho các quán ăn nhỏ\\n"
-      "Mặc trang phục lịch sự khi vào Lăng Bác"
-    )
-    human_prompt = """Here is the complete trip plan to summarize:
-
-Trip Plan:
-{trip_plan}
+    self.prompt = _SUMMARY_PROMPT
 
-Detailed Itinerary:
-{itinerary}
-
-Generate the summary based on the trip plan and itinerary above."""
-    self.prompt = get_default_prompt(system_prompt, human_prompt)
+  @property
+  def llm(self):
+    """The shared Gemini client (see `get_llm`)."""
+    return get_llm()
 
   def generate_summary(self, trip_plan: dict) -> dict:
     """
@@ -80,32 +125,61 @@ Generate the summary based on the trip plan and itinerary above."""
     Returns:
       dict: A dictionary containing the generated 'summary' string, appended with the detailed itinerary.
 
+    Raises:
+      ValueError: If the provided trip_plan is empty or invalid.
+    """
+    return {"summary": "".join(self.generate_summary_stream(trip_plan))}
+
+  def generate_summary_stream(self, trip_plan: dict) -> Iterator[str]:
+    """
+    Streams the summary of the trip plan as the LLM generates it.
+
+    The detailed itinerary section is yielded last, so joining the chunks gives
+    exactly the 'summary' string of `generate_summary`.
+
+    Args:
+      trip_plan (dict): The complete trip plan information, including itinerary, budget, etc.
+
+    Returns:
+      Iterator[str]: Text chunks of the summary.
+
     Raises:
       ValueError: If the provided trip_plan is empty or invalid.
     """
     if not trip_plan:
       raise ValueError("A complete trip plan must be provided to generate a summary.")
-    
+    return self._stream_summary(trip_plan)
+
+  def _stream_summary(self, trip_plan: dict) -> Iterator[str]:
+    """Yields the (possibly cached) LLM summary, then the itinerary section."""
     # Extract itinerary from trip_plan
     itinerary = trip_plan.get('itinerary', {})
     itinerary_content = itinerary.get('itinerary', '') if isinstance(itinerary, dict) else str(itinerary)
     
-    chain = self.prompt | self.llm
-    result = chain.invoke({
-      "trip_plan": trip_plan,
-      "itinerary": itinerary_content
-    })
-    
-    # Add the itinerary content and format below the result
-    summary_content = result.content
+    # The itinerary goes into the prompt once, without runs of blank lines
+    plan_json = _compact_trip_plan(trip_plan)
+    prompt_itinerary = _BLANK_LINE_RUNS.sub("\n\n", itinerary_content.strip())
+    # Keyed on exactly what the prompt receives
+    cache_key = response_cache.make_key("trip-summary", plan_json + "\n" + prompt_itinerary)
+    summary_content = response_cache.get(cache_key)
+    if summary_content is None:
+      chain = self.prompt | self.llm
+      parts = []
+      for chunk in chain.stream({
+        "trip_plan": plan_json,
+        "itinerary": prompt_itinerary
+      }):
+        if chunk.content:
+          parts.append(chunk.content)
+          yield chunk.content
+      # Only a summary streamed to the end is cached
+      response_cache.set(cache_key, "".join(parts))
+    else:
+      yield summary_content
     
     # Add the detailed itinerary section
-    itinerary_section = f"""
+    yield f"""
 
 📅 LỊCH TRÌNH CHI TIẾT
 
 {itinerary_content}"""
-    
-    final_content = summary_content + itinerary_section
-    
-    return {"summary": final_content} 
\ No newline at end of file
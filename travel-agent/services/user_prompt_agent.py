@@ -1,9 +1,40 @@
 from typing import Tuple, Dict, Any
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
 from services.llm_utils import get_llm
-from models import WorkflowState
+from services.response_cache import response_cache
+from models import ExtractedFields, WorkflowState
+
+# Built once at import; the missing fields and the user's reply are filled in
+# as template variables, so braces in the reply are never parsed as placeholders
+EXTRACT_FIELDS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", (
+        "Bạn là một tư vấn viên du lịch thông minh. "
+        "Danh sách thông tin còn thiếu: {missing_items}. "
+        "Câu trả lời từ người dùng: '{user_input}'. "
+        "Hãy phân tích thông tin người dùng cung cấp và cập nhật các trường thích hợp. "
+        "Trích xuất thông tin chính xác và trả về JSON object với các trường đã cập nhật. "
+        "Lưu ý: "
+        "- Ngày tháng phải ở định dạng YYYY-MM-DD "
+        "- Ngân sách phải là số cụ thể "
+        "- Điểm đến phải là tên địa danh rõ ràng "
+        "- Chỉ trả về các trường có thông tin hợp lệ"
+    )),
+    ("human", "{user_input}"),
+])
+
+# prompt | structured LLM chain, built on first use so importing this module
+# does not create the Gemini client
+_extract_chain = None
+
+def _get_extract_chain():
+    """Returns the field extraction chain, building it on first use."""
+    global _extract_chain
+    if _extract_chain is None:
+        # Structured output: Gemini fills the ExtractedFields schema through a forced
+        # function call; fields the reply does not mention stay None and are dropped
+        _extract_chain = EXTRACT_FIELDS_PROMPT | get_llm().with_structured_output(ExtractedFields)
+    return _extract_chain
 
 def extract_user_fields_from_messages(state: WorkflowState) -> Tuple[Dict[str, Any], AIMessage]:
     """
@@ -27,28 +58,13 @@ def extract_user_fields_from_messages(state: WorkflowState) -> Tuple[Dict[str, A
     missing_items = ', '.join(state.missing_fields or [])
     user_msg = next((m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None)
     user_input = user_msg.content if user_msg else ""
-    system_prompt = (
-        f"Bạn là một tư vấn viên du lịch thông minh. "
-        f"Danh sách thông tin còn thiếu: {missing_items}. "
-        f"Câu trả lời từ người dùng: '{user_input}'. "
-        f"Hãy phân tích thông tin người dùng cung cấp và cập nhật các trường thích hợp. "
-        f"Trích xuất thông tin chính xác và trả về JSON object với các trường đã cập nhật. "
-        f"Lưu ý: "
-        f"- Ngày tháng phải ở định dạng YYYY-MM-DD "
-        f"- Ngân sách phải là số cụ thể "
-        f"- Điểm đến phải là tên địa danh rõ ràng "
-        f"- Chỉ trả về các trường có thông tin hợp lệ"
-    )
-    prompt_messages = [
-        SystemMessagePromptTemplate.from_template(system_prompt),
-        HumanMessagePromptTemplate.from_template(user_input)
-    ]
-    chat_prompt = ChatPromptTemplate.from_messages(prompt_messages)
-    llm = get_llm()
-    parser = JsonOutputParser()
-    chain = chat_prompt | llm | parser
+    cache_key = response_cache.make_key("extract-fields", user_input, missing_items)
     try:
-        result = chain.invoke({})
+        result = response_cache.get(cache_key)
+        if result is None:
+            fields = _get_extract_chain().invoke({"missing_items": missing_items, "user_input": user_input})
+            result = fields.model_dump(exclude_none=True)
+            response_cache.set(cache_key, result)
         ai_msg = AIMessage(content=f"Updated fields: {result}")
         return result, ai_msg
     except Exception as e:
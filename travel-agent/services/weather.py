@@ -1,8 +1,16 @@
 import os
-import requests
-from typing import Dict, Any
+import asyncio
+from collections import Counter
+from typing import Dict, Any, List, Union
 from datetime import datetime
 from langchain.tools import tool
+from services.http_client import get_async_client, get_session
+from services.lookup_cache import LookupCache
+
+# Geocoded destinations, keyed by normalized name. OpenWeatherMap's geocoder is
+# separate from the one the attraction search uses, so it has its own cache.
+_coordinates_cache = LookupCache("GEOCODE_CACHE_TTL")
+
 
 class WeatherService:
     """
@@ -37,28 +45,115 @@ class WeatherService:
             ValueError: If the API key is missing, coordinates cannot be found, or no data is returned.
             requests.exceptions.RequestException: If the API request fails.
         """
-        api_key = os.getenv("OPENWEATHER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENWEATHER_API_KEY not set. Weather service cannot function.")
+        api_key = WeatherService._api_key()
         coords = WeatherService._get_coordinates(destination, api_key)
         if not coords:
             raise ValueError(f"Could not find coordinates for {destination}.")
-        params = {
+        params = WeatherService._forecast_params(coords, api_key, days)
+        response = get_session().get(WeatherService.API_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return WeatherService._process_weather_data(response.json(), destination)
+
+    @staticmethod
+    async def aget_weather(destination: str, days: int = 5) -> Dict[str, Any]:
+        """
+        Async version of `get_weather`, used when the agent is awaited.
+
+        Both OpenWeatherMap requests go through the shared `httpx.AsyncClient`,
+        so the event loop keeps serving other requests while they are in flight.
+
+        Args:
+            destination (str): The city or location to get the weather for.
+            days (int, optional): Number of days to forecast (maximum 5). Defaults to 5.
+
+        Returns:
+            Dict[str, Any]: The same forecast dictionary `get_weather` returns.
+
+        Raises:
+            ValueError: If the API key is missing, coordinates cannot be found, or no data is returned.
+            httpx.HTTPError: If the API request fails.
+        """
+        api_key = WeatherService._api_key()
+        client = get_async_client()
+        coords = _coordinates_cache.get(destination)
+        if coords is None:
+            response = await client.get(WeatherService.GEO_URL, params=WeatherService._geocode_params(destination, api_key))
+            response.raise_for_status()
+            coords = WeatherService._remember_coordinates(destination, response.json())
+        if not coords:
+            raise ValueError(f"Could not find coordinates for {destination}.")
+        params = WeatherService._forecast_params(coords, api_key, days)
+        response = await client.get(WeatherService.API_URL, params=params)
+        response.raise_for_status()
+        return WeatherService._process_weather_data(response.json(), destination)
+
+    @staticmethod
+    async def get_weather_many(destinations: List[str], days: int = 5) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Fetches forecasts for several destinations concurrently.
+
+        Args:
+            destinations (List[str]): The places to get the weather for.
+            days (int, optional): Number of days to forecast (maximum 5). Defaults to 5.
+
+        Returns:
+            List[Union[Dict[str, Any], Exception]]: One forecast per destination, in input
+                order; a destination whose lookup failed gives the exception instead.
+        """
+        return await asyncio.gather(
+            *(WeatherService.aget_weather(destination, days) for destination in destinations),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def _api_key() -> str:
+        """
+        Reads the OpenWeatherMap API key.
+
+        Returns:
+            str: The API key.
+
+        Raises:
+            ValueError: If OPENWEATHER_API_KEY is not set.
+        """
+        api_key = os.getenv("OPENWEATHER_API_KEY")
+        if not api_key:
+            raise ValueError("OPENWEATHER_API_KEY not set. Weather service cannot function.")
+        return api_key
+
+    @staticmethod
+    def _geocode_params(destination: str, api_key: str) -> Dict[str, Any]:
+        """Builds the geocoding query for a destination."""
+        return {"q": destination, "limit": 1, "appid": api_key}
+
+    @staticmethod
+    def _forecast_params(coords: Dict[str, float], api_key: str, days: int) -> Dict[str, Any]:
+        """Builds the forecast query; the API returns 8 three-hour slots per day."""
+        return {
             "lat": coords["lat"],
             "lon": coords["lon"],
             "appid": api_key,
             "units": "metric",
             "cnt": min(days, 5) * 8
         }
-        response = requests.get(WeatherService.API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        return WeatherService._process_weather_data(response.json(), destination)
+
+    @staticmethod
+    def _remember_coordinates(destination: str, data: List[Dict[str, Any]]) -> Dict[str, float] | None:
+        """Extracts coordinates from a geocoding response and caches them if found."""
+        if not data:
+            return None
+        coords = {"lat": data[0]["lat"], "lon": data[0]["lon"]}
+        _coordinates_cache.set(destination, coords)
+        return coords
 
     @staticmethod
     def _get_coordinates(destination: str, api_key: str) -> Dict[str, float] | None:
         """
         Retrieves the latitude and longitude for a given destination name.
 
+        Found coordinates are cached for GEOCODE_CACHE_TTL seconds (a day by
+        default) under the normalized destination name; misses are not cached.
+
         Args:
             destination (str): The name of the city or place.
             api_key (str): OpenWeatherMap API key.
@@ -69,13 +164,13 @@ class WeatherService:
         Raises:
             requests.exceptions.RequestException: If the API request fails.
         """
-        params = {"q": destination, "limit": 1, "appid": api_key}
-        response = requests.get(WeatherService.GEO_URL, params=params, timeout=10)
+        coords = _coordinates_cache.get(destination)
+        if coords is not None:
+            return coords
+        params = WeatherService._geocode_params(destination, api_key)
+        response = get_session().get(WeatherService.GEO_URL, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        if data:
-            return {"lat": data[0]["lat"], "lon": data[0]["lon"]}
-        return None
+        return WeatherService._remember_coordinates(destination, response.json())
 
     @staticmethod
     def _process_weather_data(data: Dict[str, Any], destination: str) -> Dict[str, Any]:
@@ -96,29 +191,42 @@ class WeatherService:
         """
         if not data.get("list"):
             raise ValueError("No weather data found in API response.")
+        # One pass: running min/max temperatures and condition counts per day
         daily_forecasts: Dict[str, dict] = {}
         for item in data["list"]:
             date = datetime.fromtimestamp(item["dt"]).strftime('%Y-%m-%d')
-            if date not in daily_forecasts:
-                daily_forecasts[date] = {
-                    "temps": [],
-                    "conditions": [],
-                    "descriptions": []
+            temp = item["main"]["temp"]
+            weather = item["weather"][0]
+            day = daily_forecasts.get(date)
+            if day is None:
+                day = daily_forecasts[date] = {
+                    "temp_min": temp,
+                    "temp_max": temp,
+                    "conditions": Counter(),
+                    "descriptions": Counter(),
                 }
-            daily_forecasts[date]["temps"].append(item["main"]["temp"])
-            daily_forecasts[date]["conditions"].append(item["weather"][0]["main"])
-            daily_forecasts[date]["descriptions"].append(item["weather"][0]["description"])
-        processed_forecast = []
-        for date, daily_data in daily_forecasts.items():
-            processed_forecast.append({
+            elif temp < day["temp_min"]:
+                day["temp_min"] = temp
+            elif temp > day["temp_max"]:
+                day["temp_max"] = temp
+            day["conditions"][weather["main"]] += 1
+            day["descriptions"][weather["description"]] += 1
+        # most_common breaks ties by first occurrence, so the result is stable
+        processed_forecast = [
+            {
                 "date": date,
-                "temp_min": min(daily_data["temps"]),
-                "temp_max": max(daily_data["temps"]),
-                "condition": max(set(daily_data["conditions"]), key=daily_data["conditions"].count),
-                "description": max(set(daily_data["descriptions"]), key=daily_data["descriptions"].count),
-            })
+                "temp_min": day["temp_min"],
+                "temp_max": day["temp_max"],
+                "condition": day["conditions"].most_common(1)[0][0],
+                "description": day["descriptions"].most_common(1)[0][0],
+            }
+            for date, day in daily_forecasts.items()
+        ]
         return {
             "destination": data.get("city", {}).get("name", destination),
             "forecast": processed_forecast,
             "summary": f"Weather forecast for {len(processed_forecast)} days in {destination}."
-        } 
\ No newline at end of file
+        } 
+
+
+WeatherService.get_weather.coroutine = WeatherService.aget_weather
@@ -0,0 +1,54 @@
+"""
+Restores the real LangChain packages for test modules that need them
+
+test_mocks, test_hitl and test_services replace LangChain/LangGraph packages in
+sys.modules with mocks when they are imported, and the mocks stay for the rest
+of the process. Test modules that exercise the real LLM plumbing call
+`use_real_langchain()` before importing the services, so they load correctly
+whichever test modules were imported first.
+"""
+import sys
+import types
+from unittest.mock import NonCallableMock
+
+_MOCKED_PACKAGES = ("langchain", "langchain_core", "langgraph", "langchain_tavily")
+# Only the LLM plumbing and the modules built on it are reloaded; other
+# service modules keep their identity, so other tests' patches still apply
+_LLM_UTILS = "services.llm_utils"
+
+
+def _is_mock(value):
+    return isinstance(value, NonCallableMock) or (isinstance(value, type) and issubclass(value, NonCallableMock))
+
+
+def _uses_llm_utils(name, module):
+    return name == _LLM_UTILS or any(
+        getattr(value, "__module__", None) == _LLM_UTILS for value in vars(module).values()
+    )
+
+
+def use_real_langchain():
+    """Drops mocked packages, and LLM service modules imported against them, from sys.modules"""
+    for name, module in list(sys.modules.items()):
+        if name.split(".")[0] in _MOCKED_PACKAGES and not isinstance(module, types.ModuleType):
+            del sys.modules[name]
+
+    # An LLM module that bound a mock, or that imported from such a module, is
+    # imported again on next use
+    candidates = {
+        name: module for name, module in sys.modules.items()
+        if (name.startswith("services.") or name in ("workflow", "main"))
+        and module is not None and _uses_llm_utils(name, module)
+    }
+    stale = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, module in candidates.items():
+            if name not in stale and any(
+                _is_mock(value) or getattr(value, "__module__", None) in stale for value in vars(module).values()
+            ):
+                stale.add(name)
+                changed = True
+    for name in stale:
+        del sys.modules[name]
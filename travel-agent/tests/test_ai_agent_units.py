@@ -143,7 +143,7 @@ class TestToolWrappers(unittest.TestCase):
         self.assertEqual(results[0]["name"], "Test Hotel")
         self.assertEqual(results[0]["price"], 100)
 
-    @patch('services.weather.requests.get')
+    @patch('services.weather.get_session')
     def test_weather_api_tool_wrapper(self, mock_get):
         """Test weather API tool wrapper"""
         mock_response = Mock()
@@ -185,7 +185,7 @@ class TestToolWrappers(unittest.TestCase):
         self.assertIn("Cloudy", result)
         self.assertIn("15°C - 25°C", result)
 
-    @patch('services.currency.requests.get')
+    @patch('services.currency.get_json')
     def test_currency_conversion_tool_wrapper(self, mock_get):
         """Test currency conversion tool wrapper"""
         mock_response = Mock()
@@ -74,7 +74,7 @@ class TestAPIFailureResilience(unittest.TestCase):
     # NHÓM TEST 2: WEATHER SERVICE (Xử lý lỗi Thời tiết)
     # ----------------------------------------------------------------
 
-    @patch('services.weather.requests.get')
+    @patch('services.weather.get_session')
     def test_weather_api_failure_fallback(self, mock_get):
         """Test: API Thời tiết chết -> Trả về dữ liệu mặc định"""
         mock_get.side_effect = ConnectionError("Weather Down")
@@ -88,7 +88,7 @@ class TestAPIFailureResilience(unittest.TestCase):
 
         self.assertIsNotNone(result)
 
-    @patch('services.weather.requests.get')
+    @patch('services.weather.get_session')
     def test_fallback_weather_data(self, mock_get):
         """Test: Kiểm tra dữ liệu fallback có đúng định dạng không"""
         self.test_weather_api_failure_fallback()
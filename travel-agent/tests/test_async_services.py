@@ -0,0 +1,244 @@
+"""
+Tests for the async (httpx) implementations of the attractions and currency
+tools, the exchange rate cache they share, and the hedged Tavily search
+"""
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import orjson
+import requests
+
+from services.attractions import AttractionFinder, _coordinates_cache, reload_api_keys
+from services.currency import CurrencyConverter, _rates_cache
+
+# The plain function behind the convert tool; other test modules replace
+# langchain.tools with a mock, so the tool itself is not called
+_convert = CurrencyConverter._convert_amount
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestAsyncCurrencyConverter(unittest.TestCase):
+    """Test cases for CurrencyConverter.aconvert"""
+
+    def setUp(self):
+        _rates_cache.clear()
+
+    def _convert(self, handler, to_currency="vnd"):
+        async def run():
+            async with _client(handler) as client:
+                with patch("services.currency.get_async_client", return_value=client):
+                    return await CurrencyConverter.aconvert(2, "usd", to_currency)
+        return asyncio.run(run())
+
+    def test_fallback_answers_when_primary_fails(self):
+        """A failing primary API does not delay the fallback's answer"""
+        def handler(request):
+            if "exchangerate-api.com" in str(request.url):
+                return httpx.Response(500)
+            return httpx.Response(200, json={"rates": {"VND": 25000}})
+
+        result = self._convert(handler)
+        self.assertEqual(result["converted_amount"], 50000)
+        self.assertEqual((result["from"], result["to"]), ("USD", "VND"))
+
+    def test_unknown_currency_raises(self):
+        """If neither API knows the currency a ValueError is raised"""
+        handler = lambda request: httpx.Response(200, json={"rates": {"VND": 25000}})
+        with self.assertRaises(ValueError):
+            self._convert(handler, to_currency="xyz")
+
+
+class TestExchangeRateCache(unittest.TestCase):
+    """Test cases for the rate table cache used by CurrencyConverter.convert"""
+
+    def setUp(self):
+        _rates_cache.clear()
+
+    def _fetch(self, *responses):
+        return MagicMock(side_effect=responses)
+
+    def _response(self, rates):
+        return {"rates": rates}
+
+    def test_one_fetch_per_base_currency(self):
+        """Conversions from the same base reuse the fetched table"""
+        fetch = self._fetch(self._response({"VND": 25000, "EUR": 0.9}))
+        with patch("services.currency.get_json", fetch):
+            self.assertEqual(_convert(1, "usd", "vnd")["converted_amount"], 25000)
+            self.assertEqual(_convert(10, "USD", "eur")["converted_amount"], 9)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_stale_rates_served_when_apis_fail(self):
+        """An expired table is used, and flagged, when both APIs are down"""
+        with patch("services.currency.get_json", self._fetch(self._response({"VND": 25000}))):
+            _convert(1, "USD", "VND")
+        _rates_cache._fresh.clear()  # simulate the TTL expiring
+        down = requests.exceptions.ConnectionError("down")
+        with patch("services.currency.get_json", self._fetch(down, down)):
+            result = _convert(2, "USD", "VND")
+        self.assertEqual(result["converted_amount"], 50000)
+        self.assertTrue(result["stale"])
+
+    def test_convert_currency_shares_the_tool_function(self):
+        """The instance method converts without going through the tool wrapper"""
+        fetch = self._fetch(self._response({"VND": 25000}))
+        with patch("services.currency.get_json", fetch):
+            result = CurrencyConverter().convert_currency(3, "usd", "vnd")
+        self.assertEqual(result["converted_amount"], 75000)
+
+    def test_unsupported_code_fails_before_any_request(self):
+        """Codes outside VALID_CURRENCIES are rejected without an API call"""
+        fetch = self._fetch()
+        with patch("services.currency.get_json", fetch):
+            with self.assertRaises(ValueError):
+                _convert(1, "usd", "xyz")
+        fetch.assert_not_called()
+
+    def test_same_currency_needs_no_request(self):
+        """Converting a currency to itself is answered locally at rate 1"""
+        fetch = self._fetch()
+        with patch("services.currency.get_json", fetch):
+            result = _convert(12.345, "vnd", "VND")
+        self.assertEqual((result["converted_amount"], result["rate"]), (12.35, 1.0))
+        fetch.assert_not_called()
+
+    def test_failure_without_cached_rates_raises(self):
+        """With nothing cached, an outage is still reported"""
+        down = requests.exceptions.ConnectionError("down")
+        with patch("services.currency.get_json", self._fetch(down, down)):
+            with self.assertRaises(ValueError):
+                _convert(1, "USD", "VND")
+
+
+class TestAsyncAttractionFinder(unittest.TestCase):
+    """Test cases for AttractionFinder.afind_attractions"""
+
+    def setUp(self):
+        _coordinates_cache.clear()
+        reload_api_keys()
+        self.seen = []
+
+    def _handler(self, request):
+        self.seen.append(request.url)
+        if request.url.path.endswith("/geocode/search"):
+            return httpx.Response(200, json={"features": [{"properties": {"lat": 16.46, "lon": 107.59}}]})
+        return httpx.Response(200, json={"features": [
+            {"properties": {"name": "Đại Nội", "formatted": "Huế", "categories": ["heritage.unesco"]}}
+        ]})
+
+    def _find(self, *destinations):
+        async def run():
+            async with _client(self._handler) as client:
+                with patch("services.attractions.get_async_client", return_value=client):
+                    return [await AttractionFinder.afind_attractions(d, ["history"]) for d in destinations]
+        return asyncio.run(run())
+
+    @patch.dict(os.environ, {"GEOAPIFY_API_KEY": "test-key"})
+    def test_geocode_then_places(self):
+        """The places search is centred on the geocoded coordinates"""
+        [attractions] = self._find("Huế")
+        seen = self.seen
+        self.assertEqual(attractions, [{"name": "Đại Nội", "address": "Huế", "category": "heritage.unesco"}])
+        self.assertEqual(seen[1].params["filter"], "circle:107.59,16.46,5000")
+        self.assertEqual(
+            seen[1].params["categories"],
+            "heritage.unesco,tourism.sights.castle,tourism.sights.archaeological_site,tourism.sights.monastery",
+        )
+
+    @patch.dict(os.environ, {"GEOAPIFY_API_KEY": "test-key"})
+    def test_repeated_destination_is_geocoded_once(self):
+        """Spellings differing only in case/whitespace reuse the cached coordinates"""
+        self._find("Huế", " huế ", "HUẾ")
+        geocodes = [url for url in self.seen if url.path.endswith("/geocode/search")]
+        self.assertEqual(len(geocodes), 1)
+        self.assertEqual(len(self.seen), 4)
+
+
+class TestHedgedTavilySearch(unittest.TestCase):
+    """Test cases for the Tavily ticket-price searches"""
+
+    def setUp(self):
+        reload_api_keys()
+
+    def _http_session(self, content):
+        session = MagicMock()
+        session.post.return_value = MagicMock(status_code=200, content=orjson.dumps({"results": [{"content": content}]}))
+        return session
+
+    @patch.dict(os.environ, {"TAVILY_API_KEY": "test-key"})
+    def test_slow_sdk_is_hedged_with_http(self):
+        """A slow SDK search does not hold up the answer from the HTTP search"""
+        class SlowClient:
+            def __init__(self, api_key):
+                pass
+
+            def search(self, **kwargs):
+                time.sleep(0.5)
+                return {"results": [{"content": "Tickets from $ 99"}]}
+
+        with patch("services.attractions.TavilyClient", SlowClient), \
+                patch("services.attractions._TAVILY_HEDGE_DELAY", 0.01), \
+                patch("services.attractions.get_session", return_value=self._http_session("Tickets from $12")):
+            results = AttractionFinder._search_ticket_prices("Huế")
+        self.assertEqual(results, [{"content": "Tickets from $12"}])
+
+    @patch.dict(os.environ, {"TAVILY_API_KEY": "test-key"})
+    def test_failed_sdk_falls_back_immediately(self):
+        """An SDK error starts the HTTP search without waiting for the hedge delay"""
+        failing = MagicMock()
+        failing.return_value.search.side_effect = RuntimeError("quota exceeded")
+        session = self._http_session("Tickets from €8")
+        with patch("services.attractions.TavilyClient", failing), \
+                patch("services.attractions._TAVILY_HEDGE_DELAY", 30), \
+                patch("services.attractions.get_session", return_value=session):
+            results = AttractionFinder._search_ticket_prices("Huế")
+        self.assertEqual(results, [{"content": "Tickets from €8"}])
+
+    @patch.dict(os.environ, {"TAVILY_API_KEY": "test-key"})
+    def test_batch_estimates_keep_destination_order(self):
+        """Batched estimates run concurrently and come back in input order"""
+        prices = {"Huế": "Tickets from $10", "Hội An": "Entry €5", "Sa Pa": "no price listed"}
+
+        def search(destination):
+            time.sleep(0.05 if destination == "Huế" else 0)
+            return [{"content": prices[destination]}]
+
+        with patch.object(AttractionFinder, "_search_ticket_prices", side_effect=search):
+            costs = AttractionFinder.estimate_attractions_cost_batch(["Huế", "Hội An", "Sa Pa"], 2, 3)
+        self.assertEqual(costs, [60.0, 30.0, 120.0])
+
+    def test_api_key_is_read_once_found(self):
+        """A found key is remembered; a missing one is looked up again"""
+        session = self._http_session("Tickets from $12")
+        with patch("services.attractions.TavilyClient", None), \
+                patch("services.attractions.get_session", return_value=session):
+            with patch.dict(os.environ, {"TAVILY_API_KEY": ""}):
+                with self.assertRaises(ValueError):
+                    AttractionFinder._search_ticket_prices("Huế")
+            with patch.dict(os.environ, {"TAVILY_API_KEY": "first-key"}):
+                AttractionFinder._search_ticket_prices("Huế")
+            with patch.dict(os.environ, {"TAVILY_API_KEY": "rotated-key"}):
+                AttractionFinder._search_ticket_prices("Huế")
+        headers = [call.kwargs["headers"]["Authorization"] for call in session.post.call_args_list]
+        self.assertEqual(headers, ["Bearer first-key", "Bearer first-key"])
+
+    @patch.dict(os.environ, {"TAVILY_API_KEY": "test-key"})
+    def test_all_searches_failing_raises(self):
+        """When every search fails a ValueError is raised"""
+        session = MagicMock()
+        session.post.side_effect = requests.exceptions.ConnectionError("down")
+        with patch("services.attractions.TavilyClient", None), \
+                patch("services.attractions.get_session", return_value=session):
+            with self.assertRaises(ValueError):
+                AttractionFinder._search_ticket_prices("Huế")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,34 @@
+"""
+Tests for the calculator expression tool
+"""
+import unittest
+
+from services.calculator import Calculator
+
+# Calculator.evaluate is the plain function behind the calc tool; other test
+# modules replace langchain.tools with a mock, so the tool itself is not called
+_calc = Calculator.evaluate
+
+
+class TestCalculator(unittest.TestCase):
+    """Test cases for Calculator.evaluate (the calc tool)"""
+
+    def test_budget_expression(self):
+        """A whole budget line is evaluated in one call, exactly"""
+        self.assertEqual(_calc("3 * 1200000 + 2 * 150000"), 3900000)
+        self.assertEqual(_calc("-(10 - 4) / 4"), -1.5)
+
+    def test_division_by_zero(self):
+        """Dividing by zero is reported as a ValueError"""
+        with self.assertRaises(ValueError):
+            _calc("5 / (2 - 2)")
+
+    def test_rejects_non_arithmetic(self):
+        """Names, calls and other operators are not evaluated"""
+        for expression in ("__import__('os')", "2 ** 100000", "x + 1", "'a' * 3", "1 +"):
+            with self.assertRaises(ValueError):
+                _calc(expression)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+"""
+Tests for the greeting / thanks detection used before the planning workflow
+"""
+import unittest
+
+from services.greeting_handler import GreetingHandler
+
+
+class TestGreetingHandler(unittest.TestCase):
+    """Test cases for GreetingHandler"""
+
+    def setUp(self):
+        self.handler = GreetingHandler()
+
+    def test_greetings_are_detected(self):
+        """Greetings in any of the supported languages are recognised"""
+        for message in ["Xin chào!", "hello there", "Good morning :)", "Bonjour"]:
+            self.assertTrue(self.handler.is_greeting_message(message), message)
+
+    def test_thanks_are_detected(self):
+        """Thanks messages are recognised and are not taken for greetings"""
+        for message in ["Cảm ơn nhé!", "Thanks!!", "tks"]:
+            self.assertTrue(self.handler.is_simple_thanks(message), message)
+            self.assertFalse(self.handler.is_greeting_message(message), message)
+
+    def test_other_input_is_not_a_greeting(self):
+        """Trip requests and non-text input are not greetings"""
+        for message in ["Tôi muốn đi Đà Lạt 3 ngày", "Plan a trip to Chiang Mai", "", None, 42]:
+            self.assertFalse(self.handler.is_greeting_message(message), message)
+        self.assertFalse(self.handler.is_simple_thanks("Tôi muốn đi Đà Lạt 3 ngày"))
+
+    def test_single_word_keywords_match_whole_words(self):
+        """Short keywords match as words, not inside longer words"""
+        self.assertTrue(self.handler.is_greeting_message("hi, tôi cần tư vấn"))
+        self.assertFalse(self.handler.is_greeting_message("What is this place like"))
+        self.assertTrue(self.handler.is_greeting_message("Hey, how are you?"))
+        self.assertTrue(self.handler.is_greeting_message("Good evening!"))
+        self.assertFalse(self.handler.is_greeting_message("Tôi ở Hội An, Mai ơi"))
+
+    def test_long_messages_are_greetings_only_if_they_open_with_one(self):
+        """A long trip request mentioning a greeting keyword is not a greeting"""
+        request = "Lên kế hoạch 5 ngày ở Đà Nẵng cho gia đình 4 người, ngân sách 20 triệu, " * 2
+        self.assertFalse(self.handler.is_greeting_message(request + "chào bạn"))
+        self.assertTrue(self.handler.is_greeting_message("Hello! " + request))
+
+    def test_responses_come_from_the_fixed_sets(self):
+        """Generated replies are always one of the handler's canned responses"""
+        for _ in range(20):
+            self.assertIn(self.handler.generate_greeting_response(), self.handler.greeting_responses)
+            self.assertIn(self.handler.generate_thanks_response(), self.handler.thanks_responses)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,49 @@
+"""
+Tests for the /edit-plan conversation history window
+"""
+import unittest
+
+from tests.real_modules import use_real_langchain
+
+use_real_langchain()
+
+import main
+from main import Message, get_history_window
+
+
+def _history(prefix, count):
+    return [Message(content=f"{prefix}{i}") for i in range(count)]
+
+
+def _contents(messages):
+    return [message.content for message in messages]
+
+
+class TestHistoryWindow(unittest.TestCase):
+    """Test cases for get_history_window"""
+
+    def setUp(self):
+        main._history_window_start.clear()
+
+    def test_window_start_is_kept_between_turns(self):
+        """The window grows from a fixed start, then jumps to the latest messages"""
+        history = _history("m", 25)
+        self.assertEqual(len(get_history_window("trip-1", history[:19])), 19)
+        self.assertEqual(_contents(get_history_window("trip-1", history[:20])), _contents(history[10:20]))
+        self.assertEqual(_contents(get_history_window("trip-1", history[:25])), _contents(history[10:25]))
+
+    def test_shorter_history_starts_over(self):
+        """A new, shorter conversation for the same trip is sent from its first message"""
+        get_history_window("trip-1", _history("old", 20))
+        fresh = _history("new", 12)
+        self.assertEqual(get_history_window("trip-1", fresh), fresh)
+
+    def test_different_conversation_starts_over(self):
+        """A conversation that no longer matches the window start gets its own window"""
+        get_history_window("trip-1", _history("old", 20))
+        other = _history("other", 21)
+        self.assertEqual(_contents(get_history_window("trip-1", other)), _contents(other[11:]))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
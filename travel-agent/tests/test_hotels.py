@@ -0,0 +1,134 @@
+"""
+Tests for the Booking.com (RapidAPI) hotel search
+"""
+import asyncio
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import orjson
+
+from services.hotels import HotelFinder, _location_cache
+
+_LOCATION = {"data": [{"id": "eyJjaXR5X25hbWUiOiJIdWUifQ=="}]}
+_HOTELS = {"data": [
+    {"name": "Azerai La Residence", "priceBreakdown": {"grossPrice": {"value": 182.5}}, "reviewCount": 812, "reviewScore": 9.1},
+    {"name": "Silk Path Grand", "priceBreakdown": {"grossPrice": None}, "reviewCount": 0},
+    {"priceBreakdown": {"grossPrice": {"value": 40}}},
+]}
+
+
+def _response(body, remaining="100"):
+    response = MagicMock(status_code=200, content=orjson.dumps(body), headers={"X-RateLimit-Requests-Remaining": remaining})
+    response.json.return_value = body
+    return response
+
+
+@patch.dict(os.environ, {"RAPIDAPI_KEY": "test-key"})
+class TestHotelFinder(unittest.TestCase):
+    """Test cases for HotelFinder.find_hotels_direct"""
+
+    def setUp(self):
+        _location_cache.clear()
+
+    def _search(self, *responses, destination="Huế, Việt Nam"):
+        session = MagicMock()
+        session.get.side_effect = responses
+        with patch("services.hotels.get_session", return_value=session), \
+                patch("services.hotels.time.sleep") as sleep:
+            hotels = HotelFinder().find_hotels_direct(destination, "2026-11-01", "2026-11-04", 2)
+        return hotels, session, sleep
+
+    def test_location_then_search_on_one_session(self):
+        """Both calls share the session and the search uses the found location"""
+        hotels, session, sleep = self._search(_response(_LOCATION), _response(_HOTELS))
+        self.assertEqual(hotels, [
+            {"name": "Azerai La Residence", "price_per_night": 182.5, "review_count": 812, "rating": 9.1},
+            {"name": "Silk Path Grand", "price_per_night": None, "review_count": 0, "rating": None},
+        ])
+        lookup, search = session.get.call_args_list
+        self.assertEqual(lookup.kwargs["params"], {"query": "Huế, Việt Nam"})
+        self.assertEqual(search.kwargs["params"]["locationId"], _LOCATION["data"][0]["id"])
+        self.assertEqual(search.kwargs["params"]["adults"], 2)
+        sleep.assert_not_called()
+
+    def test_pauses_only_when_quota_nearly_used(self):
+        """A nearly exhausted rate-limit window delays the next call"""
+        _, _, sleep = self._search(_response(_LOCATION, remaining="1"), _response(_HOTELS))
+        sleep.assert_called_once()
+
+    def test_simplified_destination_is_retried(self):
+        """An unknown full name falls back to the part before the comma"""
+        _, session, _ = self._search(_response({"data": []}), _response(_LOCATION), _response(_HOTELS))
+        queries = [call.kwargs["params"].get("query") for call in session.get.call_args_list[:2]]
+        self.assertEqual(queries, ["Huế, Việt Nam", "Huế"])
+
+    def test_identical_simplifications_are_not_repeated(self):
+        """Each distinct simplified query is sent once"""
+        self.assertEqual(
+            HotelFinder._location_queries("Hồ Chí Minh, Việt Nam"),
+            ["Hồ Chí Minh, Việt Nam", "Hồ Chí Minh", "Hồ"],
+        )
+        self.assertEqual(HotelFinder._location_queries("Huế, Việt Nam"), ["Huế, Việt Nam", "Huế"])
+
+    def test_no_hotels_raises(self):
+        """An empty search result is reported as a ValueError"""
+        with self.assertRaises(ValueError):
+            self._search(_response(_LOCATION), _response({"data": []}))
+
+    def test_repeated_destination_skips_location_lookup(self):
+        """A destination searched before goes straight to the hotel search"""
+        self._search(_response(_LOCATION), _response(_HOTELS))
+        _, session, _ = self._search(_response(_HOTELS), destination=" huế,  việt nam")
+        self.assertEqual(session.get.call_count, 1)
+        self.assertTrue(session.get.call_args.args[0].endswith("/stays/search"))
+
+
+@patch.dict(os.environ, {"RAPIDAPI_KEY": "test-key"})
+class TestAsyncHotelFinder(unittest.TestCase):
+    """Test cases for HotelFinder.afind_hotels"""
+
+    def setUp(self):
+        _location_cache.clear()
+        self.seen = []
+        self.pending = []
+
+    def _handler(self, request):
+        self.seen.append(request.url)
+        if self.pending:
+            return self.pending.pop(0)
+        body = _LOCATION if request.url.path.endswith("/auto-complete") else _HOTELS
+        return httpx.Response(200, json=body)
+
+    def _find(self, *destinations):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self._handler)) as client:
+                with patch("services.hotels.get_async_client", return_value=client):
+                    return [await HotelFinder.afind_hotels(d, "2026-11-01", "2026-11-04") for d in destinations]
+        return asyncio.run(run())
+
+    def test_location_then_search(self):
+        """The async search returns the same hotels as the sync one"""
+        [hotels] = self._find("Huế")
+        self.assertEqual([hotel["name"] for hotel in hotels], ["Azerai La Residence", "Silk Path Grand"])
+        self.assertEqual(self.seen[1].params["locationId"], _LOCATION["data"][0]["id"])
+
+    def test_rate_limited_answer_is_retried(self):
+        """A 429 is retried after the server's Retry-After delay"""
+        self.pending = [httpx.Response(429, headers={"Retry-After": "3"})]
+        with patch("services.hotels.asyncio.sleep") as sleep:
+            [hotels] = self._find("Huế")
+        self.assertEqual(len(hotels), 2)
+        self.assertEqual(len(self.seen), 3)
+        sleep.assert_awaited_once_with(3.0)
+
+    def test_location_id_is_cached(self):
+        """Only the first search for a destination calls auto-complete"""
+        self._find("Huế", "HUẾ")
+        lookups = [url for url in self.seen if url.path.endswith("/auto-complete")]
+        self.assertEqual((len(lookups), len(self.seen)), (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
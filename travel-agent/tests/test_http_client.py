@@ -0,0 +1,63 @@
+"""
+Tests for the shared HTTP session and JSON GET helper used by the services
+"""
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from services.http_client import get_json, get_session
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first request, then echoes the query string as JSON"""
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        query = parse_qs(urlsplit(self.path).query)
+        status = 404 if "missing" in query else 503 if self.calls == 1 else 200
+        body = ('{"q": "%s"}' % query.get("q", [""])[0]).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSharedSession(unittest.TestCase):
+    """Test cases for get_session and get_json"""
+
+    def setUp(self):
+        _FlakyHandler.calls = 0
+        self.server = HTTPServer(("127.0.0.1", 0), _FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_transient_error_is_retried(self):
+        """A 503 is retried on the pooled session before reaching the caller"""
+        response = get_session().get(self.url, timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_FlakyHandler.calls, 2)
+
+    def test_get_json_retries_and_decodes(self):
+        """get_json sends the params, retries the 503 and returns the decoded body"""
+        self.assertEqual(get_json(self.url, params={"q": "hue"}, timeout=5), {"q": "hue"})
+        self.assertEqual(_FlakyHandler.calls, 2)
+
+    def test_get_json_error_status_raises(self):
+        """A non-retryable error status is raised as a requests HTTPError"""
+        with self.assertRaises(requests.exceptions.HTTPError):
+            get_json(self.url, params={"missing": "1"}, timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
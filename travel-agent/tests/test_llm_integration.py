@@ -144,7 +144,7 @@ class TestToolIntegration(unittest.TestCase):
             result = instance.find_hotels(WorkflowState(destination="Paris"))
             self.assertEqual(len(result), 1)
 
-    @patch('services.weather.requests.get')
+    @patch('services.weather.get_session')
     def test_weather_service_tool_integration(self, mock_get):
         # Mock class WeatherService
         with patch('services.weather.WeatherService') as MockWeather:
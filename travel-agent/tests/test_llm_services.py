@@ -0,0 +1,229 @@
+"""
+Tests for the LLM-backed planning services (query analysis and itinerary building)
+"""
+import asyncio
+import os
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+
+from tests.real_modules import use_real_langchain
+
+use_real_langchain()
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from models import QueryAnalysisResult, WorkflowState
+from services.itinerary import ItineraryBuilder
+from services.query_analyzer import QueryAnalyzer, is_travel_query
+from services.response_cache import response_cache
+from services.summary import TripSummary
+
+
+class TestQueryAnalyzer(unittest.TestCase):
+    """Test cases for QueryAnalyzer.analyze"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.analyzer = QueryAnalyzer()
+        self.analyzer.chain = MagicMock()
+        self.analyzer.chain.invoke.return_value = {
+            "destination": "Huế", "budget": "5000000", "start_date": "2026-11-01", "end_date": "2026-11-03",
+            "missing_fields": [],
+        }
+
+    def test_repeated_query_calls_the_llm_once(self):
+        """The same query, modulo case and spacing, reuses the cached extraction"""
+        first = self.analyzer.analyze("3 ngày ở Huế, ngân sách 5 triệu")
+        second = self.analyzer.analyze("3 ngày  ở huế, ngân sách 5 triệu ")
+        self.assertEqual(self.analyzer.chain.invoke.call_count, 1)
+        self.assertEqual((second.destination, second.days), (first.destination, "3"))
+        self.assertIsNot(first, second)
+
+    def test_failed_extraction_is_not_cached(self):
+        """An LLM failure falls back to an empty result and is retried next time"""
+        self.analyzer.chain.invoke.side_effect = [RuntimeError("quota exceeded"), {"destination": "Huế"}]
+        self.assertIsNone(self.analyzer.analyze("Đi Huế").destination)
+        self.assertEqual(self.analyzer.analyze("Đi Huế").destination, "Huế")
+
+    def test_structured_result_is_cached_as_data(self):
+        """A model returned by the structured-output chain is cached and rebuilt per call"""
+        self.analyzer.chain.invoke.return_value = QueryAnalysisResult(destination="Huế", missing_fields=["budget"])
+        first = self.analyzer.analyze("Đi Huế")
+        second = self.analyzer.analyze("Đi Huế")
+        self.assertEqual((second.destination, second.missing_fields), ("Huế", ["budget"]))
+        self.assertIsNot(first, second)
+        self.assertEqual(self.analyzer.chain.invoke.call_count, 1)
+
+    def test_date_post_processing(self):
+        """A lone end date starts today; unparseable dates leave days untouched"""
+        self.analyzer.chain.invoke.return_value = {"end_date": "2099-01-01", "missing_fields": ["start_date"]}
+        result = self.analyzer.analyze("Đi Huế đến 2099-01-01")
+        self.assertEqual(result.start_date, date.today().isoformat())
+        self.assertEqual(result.missing_fields, [])
+        self.assertEqual(int(result.days), (date(2099, 1, 1) - date.today()).days + 1)
+        self.analyzer.chain.invoke.return_value = {"start_date": "2026-11-01", "end_date": "mid November", "days": "4"}
+        self.assertEqual(self.analyzer.analyze("Huế from 2026-11-01").days, "4")
+
+    def test_analyze_many_batches_only_uncached_queries(self):
+        """Cached queries are answered locally; a failed batch item only empties its own result"""
+        self.analyzer.analyze("Đi Huế")
+        self.analyzer.chain.batch.return_value = [{"destination": "Hội An"}, RuntimeError("quota exceeded")]
+        results = self.analyzer.analyze_many(["Đi Hội An", "đi huế", "Đi Sa Pa"])
+        self.assertEqual([r.destination for r in results], ["Hội An", "Huế", None])
+        [inputs], kwargs = self.analyzer.chain.batch.call_args
+        self.assertEqual(inputs, [{"user_query": "Đi Hội An"}, {"user_query": "Đi Sa Pa"}])
+        self.assertTrue(kwargs["return_exceptions"])
+        self.assertEqual(self.analyzer.analyze("Đi Hội An").destination, "Hội An")
+        self.assertEqual(self.analyzer.chain.invoke.call_count, 1)
+
+    def test_analyze_many_batches_each_model_separately(self):
+        """Simple and hedged queries in one call are batched on their own chains"""
+        self.analyzer.fast_chain = MagicMock()
+        self.analyzer.fast_chain.batch.return_value = [{"destination": "Huế"}]
+        self.analyzer.chain.batch.return_value = [{"destination": "Hội An"}]
+        with patch("services.query_analyzer.get_fast_llm", return_value=MagicMock()):
+            results = self.analyzer.analyze_many(["3 ngày ở Huế", "Hội An hoặc Đà Nẵng, chưa chắc"])
+        self.assertEqual([r.destination for r in results], ["Huế", "Hội An"])
+        self.assertEqual(self.analyzer.fast_chain.batch.call_args[0][0], [{"user_query": "3 ngày ở Huế"}])
+        self.assertEqual(self.analyzer.chain.batch.call_args[0][0], [{"user_query": "Hội An hoặc Đà Nẵng, chưa chắc"}])
+
+    def test_simple_queries_use_the_fast_model(self):
+        """Short, unhedged queries go to the fast chain when a fast model is configured"""
+        self.analyzer.fast_chain = MagicMock()
+        self.analyzer.fast_chain.invoke.return_value = {"destination": "Huế"}
+        with patch("services.query_analyzer.get_fast_llm", return_value=MagicMock()):
+            self.analyzer.analyze("3 ngày ở Huế")
+            self.analyzer.analyze("Huế hoặc Hội An, chưa chắc")
+            self.analyzer.analyze("Huế " * 60)
+        self.assertEqual(self.analyzer.fast_chain.invoke.call_count, 1)
+        self.assertEqual(self.analyzer.chain.invoke.call_count, 2)
+
+    def test_without_fast_model_every_query_uses_the_default_chain(self):
+        """With no LLM_FAST_MODEL the default chain answers simple queries too"""
+        with patch.dict(os.environ, {"LLM_FAST_MODEL": ""}):
+            self.analyzer.analyze("3 ngày ở Huế")
+        self.assertEqual(self.analyzer.chain.invoke.call_count, 1)
+        self.assertIsNone(self.analyzer.fast_chain)
+
+    def test_async_analyze_shares_the_cache(self):
+        """aanalyze awaits the chain and reuses extractions made by analyze"""
+        self.analyzer.chain.ainvoke = AsyncMock(return_value={"destination": "Hội An"})
+        self.analyzer.analyze("3 ngày ở Huế")
+        cached = asyncio.run(self.analyzer.aanalyze("3 ngày ở huế"))
+        fresh = asyncio.run(self.analyzer.aanalyze("Đi Hội An"))
+        self.assertEqual((cached.destination, fresh.destination), ("Huế", "Hội An"))
+        self.assertEqual(self.analyzer.chain.ainvoke.await_count, 1)
+
+
+class TestTravelQueryCheck(unittest.TestCase):
+    """Test cases for is_travel_query"""
+
+    def test_travel_keywords_are_recognised(self):
+        """Clear trip-planning messages pass without the LLM"""
+        for query in ("Lên lịch trình DU LỊCH Huế 3 ngày", "Plan a trip to Hội An", "Tìm khách sạn gần biển"):
+            self.assertTrue(is_travel_query(query), query)
+
+    def test_unclear_messages_are_left_to_the_llm(self):
+        """Messages without a travel keyword, or with one inside another word, are not matched"""
+        for query in ("Đà Lạt 3 ngày, 5 triệu", "What is a tripod?", "Viết cho tôi một bài thơ"):
+            self.assertFalse(is_travel_query(query), query)
+
+
+class TestItineraryBuilder(unittest.TestCase):
+    """Test cases for ItineraryBuilder.build"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.calls = []
+        self.builder = ItineraryBuilder()
+        self.builder.prompt = MagicMock()
+        self.builder.prompt.__or__.return_value.invoke.side_effect = self._llm
+
+    def _llm(self, inputs):
+        self.calls.append(inputs)
+        return SimpleNamespace(content=f"itinerary {len(self.calls)}")
+
+    def test_identical_state_reuses_the_itinerary(self):
+        """Building from the same trip state twice calls the LLM once"""
+        state = WorkflowState(destination="Huế", start_date="2026-11-01", end_date="2026-11-03")
+        self.assertEqual(self.builder.build(state), {"itinerary": "itinerary 1"})
+        self.assertEqual(self.builder.build(state.model_copy()), {"itinerary": "itinerary 1"})
+        self.assertEqual(self.builder.build(WorkflowState(destination="Hội An")), {"itinerary": "itinerary 2"})
+        self.assertEqual(self.builder.prompt.__or__.call_count, 1)
+
+    def test_state_is_sent_as_sorted_json(self):
+        """The prompt receives the state as JSON text, not the model object"""
+        self.builder.build({"destination": "Huế", "days": "3"})
+        self.assertEqual(self.calls, [{"state": '{"days":"3","destination":"Huế"}'}])
+
+    def test_latest_user_request_is_kept(self):
+        """Only the latest human message reaches the prompt; message ids and metadata do not"""
+        history = [HumanMessage(content="Đi Huế", id="run-1"), AIMessage(content="Bao nhiêu ngày?", id="run-2")]
+        first = WorkflowState(destination="Huế", prompt="internal", messages=history + [
+            HumanMessage(content="Đi cùng trẻ nhỏ", id="run-3"),
+        ])
+        second = WorkflowState(destination="Huế", messages=[
+            HumanMessage(content="Đi cùng trẻ nhỏ", id="run-9", response_metadata={"seq": 9}),
+        ])
+        self.assertEqual(self.builder.build(first), {"itinerary": "itinerary 1"})
+        self.assertEqual(self.builder.build(second), {"itinerary": "itinerary 1"})
+        self.assertEqual(orjson.loads(self.calls[0]["state"])["user_request"], "Đi cùng trẻ nhỏ")
+        self.assertNotIn("run-3", self.calls[0]["state"])
+        self.assertNotIn("internal", self.calls[0]["state"])
+
+
+class TestTripSummary(unittest.TestCase):
+    """Test cases for TripSummary.generate_summary"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.summary = TripSummary()
+        self.summary.prompt = MagicMock()
+        self.chain = self.summary.prompt.__or__.return_value
+        self.chain.stream.side_effect = lambda inputs: iter(
+            [SimpleNamespace(content="🗺️ CHUYẾN ĐI "), SimpleNamespace(content=""), SimpleNamespace(content="HUẾ")]
+        )
+
+    def test_identical_plan_reuses_the_summary(self):
+        """The same plan is summarized once; the itinerary is appended every time"""
+        plan = {"destination": "Huế", "itinerary": {"itinerary": "08:00 - Đại Nội"}}
+        first = self.summary.generate_summary(plan)
+        second = self.summary.generate_summary(dict(plan))
+        self.assertEqual(first, second)
+        self.assertTrue(first["summary"].startswith("🗺️ CHUYẾN ĐI HUẾ"))
+        self.assertTrue(first["summary"].endswith("08:00 - Đại Nội"))
+        self.assertEqual(self.chain.stream.call_count, 1)
+
+    def test_plan_is_sent_as_compact_json(self):
+        """Empty fields, the history and the nested itinerary stay out of the plan block"""
+        plan = {
+            "messages": [SimpleNamespace(type="human", content="Đi Huế 3 ngày"), SimpleNamespace(type="ai", content="OK")],
+            "destination": "Huế", "days": "3", "attractions": [], "weather": None,
+            "itinerary": {"itinerary": "08:00 - Đại Nội\n\n\n\n12:00 - Bún bò"},
+        }
+        self.summary.generate_summary(plan)
+        [inputs], _ = self.chain.stream.call_args
+        self.assertEqual(inputs, {
+            "trip_plan": '{"destination":"Huế","days":"3","user_request":"Đi Huế 3 ngày"}',
+            "itinerary": "08:00 - Đại Nội\n\n12:00 - Bún bò",
+        })
+
+    def test_stream_yields_llm_chunks_then_itinerary(self):
+        """Streamed chunks join to the buffered summary"""
+        plan = {"destination": "Huế", "itinerary": "08:00 - Đại Nội"}
+        chunks = list(self.summary.generate_summary_stream(plan))
+        self.assertEqual(chunks[:2], ["🗺️ CHUYẾN ĐI ", "HUẾ"])
+        self.assertEqual("".join(chunks), self.summary.generate_summary(plan)["summary"])
+
+    def test_empty_plan_raises_before_streaming(self):
+        """An empty plan is rejected when the stream is requested"""
+        with self.assertRaises(ValueError):
+            self.summary.generate_summary_stream({})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+Tests for the JSON helpers in services.llm_utils
+"""
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from tests.real_modules import use_real_langchain
+
+use_real_langchain()
+
+from services.llm_utils import SystemPromptCache, parse_json_response, run_llm_json
+from services.plan_schema import validate_trip_plan
+
+
+async def _reply(content):
+    return SimpleNamespace(content=content)
+
+
+async def _fail():
+    raise RuntimeError("quota exceeded")
+
+
+class TestParseJsonResponse(unittest.TestCase):
+    """Test cases for parse_json_response"""
+
+    def test_bare_json(self):
+        """A pure JSON reply is decoded directly"""
+        self.assertEqual(parse_json_response(' {"a": 1} '), {"a": 1})
+
+    def test_fenced_json(self):
+        """JSON wrapped in prose or a code fence is extracted"""
+        self.assertEqual(parse_json_response('Here:\n```json\n{"a": "Huế"}\n```'), {"a": "Huế"})
+
+    def test_braces_in_strings_and_commentary(self):
+        """Braces inside string values and after the object are ignored"""
+        text = 'Kế hoạch:\n{"a": "x } y", "b": "say \\"{hi}\\""}\nLưu ý: dùng } khi cần'
+        self.assertEqual(parse_json_response(text), {"a": "x } y", "b": 'say "{hi}"'})
+
+    def test_placeholder_before_object(self):
+        """A brace-delimited placeholder in the prose is skipped"""
+        self.assertEqual(parse_json_response('Thay {ten} bằng tên:\n{"a": 2}'), {"a": 2})
+
+    def test_no_json(self):
+        """A reply without an object raises ValueError"""
+        with self.assertRaises(ValueError):
+            parse_json_response("Xin lỗi, tôi không thể")
+
+
+class TestRunLlmJson(unittest.TestCase):
+    """Test cases for run_llm_json"""
+
+    def test_success(self):
+        """A valid reply returns the decoded plan"""
+        plan = '{"trip_info": {"destination": "Huế"}, "daily_plans": [{"activities": []}]}'
+        ok, result, raw = asyncio.run(run_llm_json(_reply(plan), "kế hoạch du lịch", validate_trip_plan))
+        self.assertTrue(ok)
+        self.assertEqual(result["trip_info"]["destination"], "Huế")
+        self.assertEqual(raw, plan)
+
+    def test_api_error(self):
+        """A failed call reports the API error and no raw output"""
+        ok, message, raw = asyncio.run(run_llm_json(_fail(), "kế hoạch du lịch"))
+        self.assertFalse(ok)
+        self.assertIn("quota exceeded", message)
+        self.assertEqual(raw, "")
+
+    def test_parse_error(self):
+        """Unparseable output is reported with the raw text"""
+        ok, message, raw = asyncio.run(run_llm_json(_reply('{"trip_info": '), "kế hoạch du lịch"))
+        self.assertFalse(ok)
+        self.assertTrue(message.startswith("Không thể phân tích kế hoạch du lịch"))
+        self.assertEqual(raw, '{"trip_info": ')
+
+    def test_invalid_plan(self):
+        """Output failing the validator is reported as invalid"""
+        ok, message, _ = asyncio.run(run_llm_json(_reply('{"trip_info": {}}'), "kế hoạch mới", validate_trip_plan))
+        self.assertFalse(ok)
+        self.assertTrue(message.startswith("Kế hoạch mới không hợp lệ"))
+
+
+class TestSystemPromptCache(unittest.TestCase):
+    """Test cases for SystemPromptCache"""
+
+    @patch('services.llm_utils.get_llm')
+    def test_create_then_get(self, mock_get_llm):
+        """A created cache is returned by name until it expires"""
+        mock_get_llm.return_value.create_cached_content.return_value = "cachedContents/abc"
+        cache = SystemPromptCache(ttl=3600)
+        self.assertEqual(cache.create("edit-plan", "static prompt"), "cachedContents/abc")
+        self.assertEqual(cache.get("edit-plan", "static prompt"), "cachedContents/abc")
+        self.assertIsNone(cache.get("edit-plan", "another prompt"))
+
+    @patch('services.llm_utils.get_llm')
+    def test_failed_upload_falls_back(self, mock_get_llm):
+        """A rejected upload leaves callers on the full prompt without retrying at once"""
+        mock_get_llm.return_value.create_cached_content.side_effect = ValueError("too few tokens")
+        cache = SystemPromptCache(ttl=3600)
+        self.assertIsNone(cache.create("edit-plan", "short"))
+
+        async def lookup():
+            return cache.get("edit-plan", "short")
+
+        self.assertIsNone(asyncio.run(lookup()))
+        self.assertEqual(mock_get_llm.return_value.create_cached_content.call_count, 1)
+
+    @patch('services.llm_utils.get_llm')
+    def test_invalidate_and_disabled(self, mock_get_llm):
+        """invalidate() drops an entry and ttl=0 disables caching"""
+        mock_get_llm.return_value.create_cached_content.return_value = "cachedContents/abc"
+        cache = SystemPromptCache(ttl=3600)
+        cache.create("edit-plan", "static prompt")
+        cache.invalidate("static prompt")
+        self.assertIsNone(cache.get("edit-plan", "static prompt"))
+        self.assertIsNone(SystemPromptCache(ttl=0).get("edit-plan", "static prompt"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,39 @@
+"""
+Tests for the per-destination lookup cache shared by the API services
+"""
+import os
+import unittest
+from unittest.mock import patch
+
+from services.lookup_cache import LookupCache
+
+
+class TestLookupCache(unittest.TestCase):
+    """Test cases for LookupCache"""
+
+    def test_spellings_share_an_entry(self):
+        """Destinations differing only in case/whitespace hit the same entry"""
+        cache = LookupCache("TEST_LOOKUP_TTL")
+        cache.set("Hội An", "loc-1")
+        self.assertEqual(cache.get("  hội   an "), "loc-1")
+        self.assertEqual(cache.get("HỘI AN"), "loc-1")
+        self.assertIsNone(cache.get("Huế"))
+        self.assertEqual(len(cache), 1)
+
+    def test_ttl_is_read_from_the_environment(self):
+        """An expired entry is gone; the lifetime comes from the named variable"""
+        with patch.dict(os.environ, {"TEST_LOOKUP_TTL": "0"}):
+            cache = LookupCache("TEST_LOOKUP_TTL")
+        cache.set("Huế", {"lat": 16.46, "lon": 107.59})
+        self.assertIsNone(cache.get("Huế"))
+
+    def test_clear(self):
+        """clear() removes every entry"""
+        cache = LookupCache("TEST_LOOKUP_TTL")
+        cache.set("Huế", "loc-1")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -62,6 +62,17 @@ class TestTripPlan(unittest.TestCase):
         plan = TripPlan(budget="-1000")
         self.assertEqual(plan.budget, "-1000")
     
+    def test_trip_plan_numeric_budget_and_days(self):
+        """Test positive JSON numbers are stored as strings"""
+        plan = TripPlan(budget=500, days=3)
+        self.assertEqual((plan.budget, plan.days), ("500", "3"))
+
+    def test_trip_plan_rejects_non_positive_numbers(self):
+        """Test zero/negative numbers and non-integer days are rejected"""
+        for kwargs in ({"budget": -1}, {"days": 0}, {"days": 2.5}):
+            with self.assertRaises(ValidationError):
+                TripPlan(**kwargs)
+
     def test_trip_plan_multiple_currencies(self):
         """Test TripPlan with various currency codes"""
         currencies = ["USD", "EUR", "GBP", "JPY", "VND", "THB"]
@@ -174,6 +185,13 @@ class TestWorkflowState(unittest.TestCase):
         
         self.assertEqual(len(state.messages), 2)
         self.assertEqual(state.messages[0]["role"], "user")
+
+    def test_workflow_state_rebuild_keeps_containers(self):
+        """Test rebuilding the state (as LangGraph does per node) does not copy containers"""
+        state = WorkflowState(destination="Huế", messages=["hi"], itinerary={"days": []})
+        rebuilt = WorkflowState(**dict(state))
+        self.assertIs(rebuilt.messages, state.messages)
+        self.assertIs(rebuilt.itinerary, state.itinerary)
     
     def test_workflow_state_with_hotel_data(self):
         """Test WorkflowState with hotel data"""
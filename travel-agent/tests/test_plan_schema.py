@@ -0,0 +1,68 @@
+"""
+Tests for the compiled trip plan schema validator
+"""
+import unittest
+
+import fastjsonschema
+
+from services.plan_schema import validate_trip_plan
+
+
+def _plan():
+    return {
+        "trip_info": {"name": "Đà Lạt 2 ngày", "destination": "Đà Lạt", "duration_days": 2, "total_budget": 5000000},
+        "daily_plans": [
+            {"day": 1, "date": "2026-01-01", "activities": [
+                {"title": "Hồ Xuân Hương", "start_time": "08:00", "duration_hours": 2, "estimated_cost": 0},
+            ]},
+        ],
+        "summary": {"total_estimated_cost": 0, "recommendations": [], "tips": []},
+    }
+
+
+class TestPlanSchema(unittest.TestCase):
+    """Test cases for validate_trip_plan"""
+
+    def test_valid_plan_passes(self):
+        """A well-formed plan, including extra keys, is accepted"""
+        plan = _plan()
+        plan["daily_plans"][0]["activities"][0]["travel_from_previous"] = "Đi bộ 10 phút"
+        self.assertEqual(validate_trip_plan(plan), plan)
+
+    def test_null_numbers_pass(self):
+        """A plan without a stated budget, or with a free activity costed as null, is accepted"""
+        plan = _plan()
+        plan["trip_info"].update(total_budget=None, duration_days=None, travelers_count=None)
+        plan["daily_plans"][0]["activities"][0].update(estimated_cost=None, duration_hours=None)
+        self.assertEqual(validate_trip_plan(plan), plan)
+
+    def test_non_numeric_cost_rejected(self):
+        """Optional numbers still reject other types"""
+        plan = _plan()
+        plan["trip_info"]["total_budget"] = "5 triệu"
+        with self.assertRaises(fastjsonschema.JsonSchemaException):
+            validate_trip_plan(plan)
+
+    def test_missing_daily_plans_rejected(self):
+        """Plans without daily_plans are rejected"""
+        plan = _plan()
+        del plan["daily_plans"]
+        with self.assertRaises(fastjsonschema.JsonSchemaException):
+            validate_trip_plan(plan)
+
+    def test_wrong_nested_type_rejected(self):
+        """Nested fields are type-checked, not just key presence"""
+        plan = _plan()
+        plan["daily_plans"][0]["activities"] = "Hồ Xuân Hương"
+        with self.assertRaises(fastjsonschema.JsonSchemaException):
+            validate_trip_plan(plan)
+
+    def test_empty_plan_rejected(self):
+        """An empty or missing plan is rejected"""
+        for plan in ({}, None):
+            with self.assertRaises(fastjsonschema.JsonSchemaException):
+                validate_trip_plan(plan)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
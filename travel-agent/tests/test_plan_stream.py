@@ -0,0 +1,67 @@
+"""
+Tests for the incremental trip plan stream parser
+"""
+import json
+import unittest
+
+from services.plan_stream import PlanStreamParser
+
+
+PLAN = {
+    "trip_info": {"name": "Huế {3 ngày}", "destination": "Huế"},
+    "daily_plans": [
+        {"day": 1, "activities": [{"title": "Đại Nội", "description": "Có dấu ] và }"}]},
+        {"day": 2, "activities": [{"title": "Chùa Thiên Mụ"}]},
+    ],
+    "summary": {"tips": []},
+}
+
+
+class TestPlanStreamParser(unittest.TestCase):
+    """Test cases for PlanStreamParser"""
+
+    def test_sections_emitted_as_they_close(self):
+        """trip_info and each day are emitted once, in order, from tiny chunks"""
+        text = json.dumps(PLAN, ensure_ascii=False, indent=2)
+        parser = PlanStreamParser()
+        events = []
+        for i in range(0, len(text), 7):
+            events.extend(parser.feed(text[i:i + 7]))
+
+        self.assertEqual(events, [
+            ("trip_info", PLAN["trip_info"]),
+            ("day", PLAN["daily_plans"][0]),
+            ("day", PLAN["daily_plans"][1]),
+        ])
+        self.assertEqual(json.loads(parser.buffer), PLAN)
+
+    def test_incomplete_day_not_emitted(self):
+        """A day is held back until its closing brace arrives"""
+        parser = PlanStreamParser()
+        events = parser.feed('{"trip_info": {"destination": "Huế"}, "daily_plans": [{"day": 1, "activities": [')
+        self.assertEqual(events, [("trip_info", {"destination": "Huế"})])
+        self.assertEqual(parser.feed(']}'), [("day", {"day": 1, "activities": []})])
+
+    def test_nested_keys_are_ignored(self):
+        """Only the top-level trip_info is emitted, even after a nested key of the same name"""
+        plan = {
+            "summary": {"trip_info": "xem bên dưới", "notes": [{"daily_plans": []}]},
+            "trip_info": {"destination": "Huế"},
+            "daily_plans": [{"day": 1, "activities": []}],
+        }
+        text = json.dumps(plan, ensure_ascii=False)
+        parser = PlanStreamParser()
+        events = []
+        for i in range(0, len(text), 5):
+            events.extend(parser.feed(text[i:i + 5]))
+        self.assertEqual(events, [("trip_info", {"destination": "Huế"}), ("day", plan["daily_plans"][0])])
+
+    def test_non_object_trip_info_not_emitted(self):
+        """A trip_info that is not an object produces no event"""
+        parser = PlanStreamParser()
+        events = parser.feed('```json\n{"trip_info": null, "daily_plans": [{"day": 1, "activities": []}]}')
+        self.assertEqual(events, [("day", {"day": 1, "activities": []})])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+"""
+Tests for the LLM response cache used by the plan endpoints
+"""
+import unittest
+
+from pydantic import BaseModel
+
+from services.response_cache import ResponseCache
+
+
+class _Message(BaseModel):
+    role: str
+    content: str
+
+
+class TestResponseCacheKeys(unittest.TestCase):
+    """Test cases for ResponseCache.make_key"""
+
+    def test_key_ignores_case_and_whitespace(self):
+        """Commands differing only by case/spacing share a key"""
+        key1 = ResponseCache.make_key("edit-plan", "Đổi sang  Đà Lạt ", "trip-1")
+        key2 = ResponseCache.make_key("edit-plan", "đổi sang đà lạt", "trip-1")
+        self.assertEqual(key1, key2)
+
+    def test_key_depends_on_scope_and_namespace(self):
+        """Different trips or endpoints never collide"""
+        base = ResponseCache.make_key("edit-plan", "3 ngày Đà Lạt", "trip-1")
+        self.assertNotEqual(base, ResponseCache.make_key("edit-plan", "3 ngày Đà Lạt", "trip-2"))
+        self.assertNotEqual(base, ResponseCache.make_key("generate-trip-plan", "3 ngày Đà Lạt", "trip-1"))
+
+    def test_key_depends_on_history(self):
+        """Conversation context is part of the key"""
+        history = [{"role": "user", "content": "Tôi muốn đi biển"}]
+        self.assertNotEqual(
+            ResponseCache.make_key("edit-plan", "đổi kế hoạch", "trip-1"),
+            ResponseCache.make_key("edit-plan", "đổi kế hoạch", "trip-1", history),
+        )
+
+    def test_model_history_matches_dict_history(self):
+        """Pydantic message models key the same as their dict form"""
+        self.assertEqual(
+            ResponseCache.make_key("edit-plan", "đổi kế hoạch", "trip-1", [{"role": "user", "content": "Đi biển"}]),
+            ResponseCache.make_key("edit-plan", "đổi kế hoạch", "trip-1", [_Message(role="user", content="Đi biển")]),
+        )
+
+
+class TestResponseCacheStorage(unittest.TestCase):
+    """Test cases for ResponseCache get/set"""
+
+    def test_miss_then_hit(self):
+        """A stored value is returned and counted as a hit"""
+        cache = ResponseCache()
+        key = cache.make_key("generate-trip-plan", "3 ngày Hà Nội")
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {"success": True})
+        self.assertEqual(cache.get(key), {"success": True})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when full"""
+        cache = ResponseCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_clear(self):
+        """clear() empties the cache and resets counters"""
+        cache = ResponseCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_disabled_cache(self):
+        """A disabled cache stores nothing"""
+        cache = ResponseCache(enabled=False)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
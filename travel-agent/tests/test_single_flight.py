@@ -0,0 +1,77 @@
+"""
+Tests for the single-flight coalescing of identical plan requests
+"""
+import asyncio
+import unittest
+
+from services.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for SingleFlight"""
+
+    def test_identical_calls_share_one_run(self):
+        """Concurrent calls with the same key run the work once"""
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"plan": "Huế"}
+
+        async def run():
+            flight = SingleFlight()
+            results = await asyncio.gather(*(flight.run("k", work) for _ in range(3)))
+            return results, flight
+
+        results, flight = asyncio.run(run())
+        self.assertEqual(results, [{"plan": "Huế"}] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.shared, 2)
+        self.assertEqual(len(flight), 0)
+
+    def test_different_keys_run_separately(self):
+        """Calls with different keys are not coalesced"""
+        async def run():
+            flight = SingleFlight()
+            return await asyncio.gather(flight.run("a", self._value("a")), flight.run("b", self._value("b")))
+
+        self.assertEqual(asyncio.run(run()), ["a", "b"])
+
+    def test_error_reaches_all_callers_then_key_is_forgotten(self):
+        """A failure is raised to every waiter and the next call starts fresh"""
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("quota exceeded")
+
+        async def run():
+            flight = SingleFlight()
+            errors = await asyncio.gather(flight.run("k", fail), flight.run("k", fail), return_exceptions=True)
+            return errors, await flight.run("k", self._value("ok"))
+
+        errors, retry = asyncio.run(run())
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(retry, "ok")
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """A caller that goes away leaves the shared work running"""
+        async def run():
+            flight = SingleFlight()
+            first = asyncio.ensure_future(flight.run("k", self._value("done", delay=0.02)))
+            second = asyncio.ensure_future(flight.run("k", self._value("unused")))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+    @staticmethod
+    def _value(value, delay=0.0):
+        async def work():
+            await asyncio.sleep(delay)
+            return value
+        return work
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
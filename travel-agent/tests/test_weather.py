@@ -0,0 +1,115 @@
+"""
+Tests for the OpenWeatherMap forecast service
+"""
+import asyncio
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from services.weather import WeatherService, _coordinates_cache
+
+
+def _response(body):
+    response = MagicMock(status_code=200)
+    response.json.return_value = body
+    return response
+
+
+class TestWeatherGeocoding(unittest.TestCase):
+    """Test cases for WeatherService._get_coordinates"""
+
+    def setUp(self):
+        _coordinates_cache.clear()
+
+    def _geocode(self, *responses, destinations=("Huế",)):
+        session = MagicMock()
+        session.get.side_effect = responses
+        with patch("services.weather.get_session", return_value=session):
+            coords = [WeatherService._get_coordinates(d, "test-key") for d in destinations]
+        return coords, session
+
+    def test_repeated_destination_is_geocoded_once(self):
+        """Spellings differing only in case/whitespace reuse the cached coordinates"""
+        coords, session = self._geocode(
+            _response([{"lat": 16.46, "lon": 107.59}]), destinations=("Huế", " huế ", "HUẾ"),
+        )
+        self.assertEqual(coords, [{"lat": 16.46, "lon": 107.59}] * 3)
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_unknown_destination_is_not_cached(self):
+        """A destination the geocoder does not know is looked up again next time"""
+        coords, session = self._geocode(
+            _response([]), _response([{"lat": 16.46, "lon": 107.59}]), destinations=("Huế", "Huế"),
+        )
+        self.assertEqual(coords, [None, {"lat": 16.46, "lon": 107.59}])
+        self.assertEqual(session.get.call_count, 2)
+
+
+class TestWeatherProcessing(unittest.TestCase):
+    """Test cases for WeatherService._process_weather_data"""
+
+    @staticmethod
+    def _slot(dt, temp, main, description):
+        return {"dt": dt, "main": {"temp": temp}, "weather": [{"main": main, "description": description}]}
+
+    def test_daily_extremes_and_most_common_condition(self):
+        """3-hour slots fold into one entry per day with min/max and the dominant condition"""
+        start = int(datetime(2026, 11, 1, 6).timestamp())
+        slots = [
+            self._slot(start, 24.0, "Clouds", "broken clouds"),
+            self._slot(start + 3 * 3600, 29.5, "Rain", "light rain"),
+            self._slot(start + 6 * 3600, 27.0, "Rain", "light rain"),
+            self._slot(start + 9 * 3600, 22.5, "Rain", "moderate rain"),
+            self._slot(start + 24 * 3600, 25.0, "Clear", "clear sky"),
+        ]
+        result = WeatherService._process_weather_data({"list": slots, "city": {"name": "Hue"}}, "Huế")
+        self.assertEqual(result["destination"], "Hue")
+        self.assertEqual(result["forecast"], [
+            {"date": "2026-11-01", "temp_min": 22.5, "temp_max": 29.5, "condition": "Rain", "description": "light rain"},
+            {"date": "2026-11-02", "temp_min": 25.0, "temp_max": 25.0, "condition": "Clear", "description": "clear sky"},
+        ])
+
+    def test_empty_list_raises(self):
+        """A response without forecast slots is reported as an error"""
+        with self.assertRaises(ValueError):
+            WeatherService._process_weather_data({"list": []}, "Huế")
+
+
+@patch.dict(os.environ, {"OPENWEATHER_API_KEY": "test-key"})
+class TestAsyncWeather(unittest.TestCase):
+    """Test cases for WeatherService.aget_weather and get_weather_many"""
+
+    def setUp(self):
+        _coordinates_cache.clear()
+        self.seen = []
+
+    def _handler(self, request):
+        self.seen.append(request.url)
+        if request.url.path.endswith("/direct"):
+            if request.url.params["q"] == "Atlantis":
+                return httpx.Response(200, json=[])
+            return httpx.Response(200, json=[{"lat": 16.46, "lon": 107.59}])
+        slot = {"dt": int(datetime(2026, 11, 1, 12).timestamp()), "main": {"temp": 26.0},
+                "weather": [{"main": "Clouds", "description": "broken clouds"}]}
+        return httpx.Response(200, json={"list": [slot], "city": {"name": "Hue"}})
+
+    def test_many_destinations_keep_input_order(self):
+        """Each destination gets its forecast, or its error, in input order"""
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self._handler)) as client:
+                with patch("services.weather.get_async_client", return_value=client):
+                    return await WeatherService.get_weather_many(["Huế", "Atlantis", "huế"], days=2)
+
+        hue, atlantis, again = asyncio.run(run())
+        self.assertEqual(hue["forecast"][0]["condition"], "Clouds")
+        self.assertIsInstance(atlantis, ValueError)
+        self.assertEqual(again["destination"], "Hue")
+        forecasts = [url for url in self.seen if url.path.endswith("/forecast")]
+        self.assertEqual(forecasts[0].params["cnt"], "16")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
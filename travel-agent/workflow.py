@@ -1,5 +1,5 @@
-from models import QueryAnalysisResult, TripPlan, WorkflowState, HotelInfo
-from services.query_analyzer import QueryAnalyzer
+from models import QueryAnalysisResult, WorkflowState
+from services.query_analyzer import QueryAnalyzer, is_travel_query
 from services.hotels import HotelFinder
 from services.weather import WeatherService
 from services.attractions import AttractionFinder
@@ -14,12 +14,15 @@ from langchain_core.messages import HumanMessage, BaseMessage, AIMessage
 from langgraph.types import Command
 from services.llm_utils import get_llm, make_system_prompt
 from typing import Optional, Dict, Any, List, Union, Literal
+import asyncio
 import datetime
 import json
 from pydantic import ValidationError, BaseModel
 from langchain_tavily import TavilySearch
 import re
-import pprint
+import logging
+
+logger = logging.getLogger("travel_agent")
 
 # Instantiate all agents/tools
 query_analyzer = QueryAnalyzer()
@@ -198,13 +201,14 @@ Today is {_today}. Do not use dates in the past.
 
 calculator_agent = create_agent_with_tools(
     model=get_llm(),
-    tools=[calculator.add, calculator.subtract, calculator.multiply, calculator.divide, currency_converter.convert, search_tool],
+    tools=[calculator.calc, currency_converter.convert, search_tool],
     system_message=f"""
 You are a calculator and budget allocation expert. Your job is to:
 - Extract all costs you can find from the provided state (e.g., hotel prices, attraction costs, etc.).
 - Split the user's budget by these costs and provide a clear breakdown.
 - If you are missing any cost or are uncertain about a cost, you may use the search tool to look up the latest prices or estimates for any travel-related expense (e.g., food, transportation, tickets, etc.).
 - Use the search tool whenever you feel it is necessary to allocate the budget accurately.
+- Do all arithmetic with the calc tool, passing a whole expression in one call (e.g. "3 * 1200000 + 2 * 150000").
 - If currency conversion is needed, use the currency conversion tool.
 - Return a clear, itemized breakdown of all costs and any conversions performed.
 Today is {_today}. Do not use dates in the past.
@@ -220,7 +224,8 @@ def router_travel_evaluator(state: WorkflowState) -> str:
   """
   Checks if query is travel-related using the travel_evaluator agent.
   
-  If the query is not travel-related, it ends the conversation.
+  Messages with an unambiguous travel keyword are routed on without calling
+  the agent. If the query is not travel-related, it ends the conversation.
 
   Args:
       state (WorkflowState): Current workflow state.
@@ -231,8 +236,10 @@ def router_travel_evaluator(state: WorkflowState) -> str:
   Raises:
       ValueError: If agent output is invalid.
   """
-  print("\n---- TRAVEL EVALUATOR ----")
+  logger.debug("---- TRAVEL EVALUATOR ----")
   user_msg = state.messages[-1].content
+  if is_travel_query(str(user_msg)):
+    return "TRAVEL"
   result = travel_evaluator.invoke({"input": str(user_msg)})
   response = result['output'].strip()
   try:
@@ -255,10 +262,10 @@ def node_missing_fields_handler(state: WorkflowState) -> Command:
   Returns:
       Command: A LangGraph Command indicating whether to stop (END) or proceed to 'hotel_agent'.
   """
-  print("\n---- MISSING FIELDS HANDLER ----")
+  logger.debug("---- MISSING FIELDS HANDLER ----")
   
   if not state.missing_fields:
-    return Command(goto="hotel_agent", update=state)
+    return Command(goto="hotel_agent")
   
   # Generate appropriate questions based on missing fields
   questions = []
@@ -284,15 +291,15 @@ def node_missing_fields_handler(state: WorkflowState) -> Command:
     
     # Add AI response to messages
     state.messages.append(AIMessage(content=response_text))
-    print(f"Asking for missing fields: {state.missing_fields}")
-    print(f"Response: {response_text}")
+    logger.info("Asking for missing fields: %s", state.missing_fields)
+    logger.debug("Response: %s", response_text)
     
     # Return END to wait for user response - this will be handled by a conversational flow
-    return Command(goto=END, update=state)
+    return Command(goto=END, update={"messages": state.messages})
   
-  return Command(goto="hotel_agent", update=state)
+  return Command(goto="hotel_agent")
 
-def node_query_analyzer(state: WorkflowState) -> Command:
+async def node_query_analyzer(state: WorkflowState) -> Command:
   """
   Analyzes the latest user message to extract trip details.
 
@@ -307,25 +314,25 @@ def node_query_analyzer(state: WorkflowState) -> Command:
       Command: A command to proceed to 'missing_fields_handler' if critical info is missing,
                or 'hotel_agent' otherwise.
   """
-  print("\n---- QUERY ANALYZER ----")
+  logger.debug("---- QUERY ANALYZER ----")
   user_msg = state.messages[-1].content
-  result: QueryAnalysisResult = query_analyzer.analyze(str(user_msg))
+  result: QueryAnalysisResult = await query_analyzer.aanalyze(str(user_msg))
   
-  # Merge result into state
-  for k, v in result.model_dump().items():
-    setattr(state, k, v)
+  # Write the extracted fields back to the state; dict() reads the fields
+  # without the recursive copy model_dump() makes
+  update = dict(result)
   
-  print(f"Analysis result: {result.model_dump()}")
+  logger.debug("Analysis result: %r", result)
   
   # Check if critical fields are missing
   if result.missing_fields:
     critical_missing = [f for f in result.missing_fields if f in ['destination', 'budget', 'start_date', 'end_date']]
     if critical_missing:
-      return Command(goto="missing_fields_handler", update=state)
+      return Command(goto="missing_fields_handler", update=update)
   
-  return Command(goto="hotel_agent", update=state)
+  return Command(goto="hotel_agent", update=update)
 
-def node_hotel_agent(state: WorkflowState) -> Command:
+async def node_hotel_agent(state: WorkflowState) -> Command:
   """
   Finds hotel options for the destination.
 
@@ -338,8 +345,9 @@ def node_hotel_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceed to 'weather_agent'.
   """
-  print("\n---- HOTEL AGENT ----")
-  result = hotel_agent.invoke({"input": f"Find hotels in {state.destination}"})
+  logger.debug("---- HOTEL AGENT ----")
+  # Awaited so the RapidAPI calls run on the event loop (see HotelFinder.afind_hotels)
+  result = await hotel_agent.ainvoke({"input": f"Find hotels in {state.destination}"})
   raw_content = result['output']
 
   # Clean the output to remove signatures and tool calls
@@ -348,15 +356,14 @@ def node_hotel_agent(state: WorkflowState) -> Command:
   # Store the hotels text directly instead of trying to parse JSON
   if clean_content and clean_content.strip():
     state.hotels = clean_content.strip()
-    print("Hotels:")
-    print(state.hotels)
+    logger.debug("Hotels:\n%s", state.hotels)
   else:
-    print("Hotel agent returned empty content")
+    logger.warning("Hotel agent returned empty content")
     state.hotels = "Không tìm thấy khách sạn phù hợp"
 
-  return Command(goto="weather_agent", update=state)
+  return Command(goto="weather_agent", update={"hotels": state.hotels})
 
-def node_weather_agent(state: WorkflowState) -> Command:
+async def node_weather_agent(state: WorkflowState) -> Command:
   """
   Fetches weather forecast for the trip dates.
 
@@ -369,16 +376,17 @@ def node_weather_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceed to 'attractions_agent'.
   """
-  print("\n---- WEATHER AGENT ----")
-  result = weather_agent.invoke({"input": f"Get weather for {state.destination} from {state.start_date} to {state.end_date}"})
+  logger.debug("---- WEATHER AGENT ----")
+  # Awaited so the agent's LLM calls and the weather tool's HTTP requests
+  # run on the event loop
+  result = await weather_agent.ainvoke({"input": f"Get weather for {state.destination} from {state.start_date} to {state.end_date}"})
   weather_message = result['output']
 
   state.weather = str(weather_message)
-  print("Weather:")
-  print(state.weather)
-  return Command(goto="attractions_agent", update=state)
+  logger.debug("Weather:\n%s", state.weather)
+  return Command(goto="attractions_agent", update={"weather": state.weather})
 
-def node_attractions_agent(state: WorkflowState) -> Command:
+async def node_attractions_agent(state: WorkflowState) -> Command:
   """
   Finds tourist attractions based on destination and preferences.
 
@@ -391,18 +399,18 @@ def node_attractions_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceed to 'calculator_agent'.
   """
-  print("\n---- ATTRACTIONS AGENT ----")
-  result = attractions_agent.invoke({"input": f"Find attractions in {state.destination}"})
+  logger.debug("---- ATTRACTIONS AGENT ----")
+  # Awaited so the Geoapify lookups run on the event loop (see AttractionFinder.afind_attractions)
+  result = await attractions_agent.ainvoke({"input": f"Find attractions in {state.destination}"})
   raw_content = result['output']
 
   # Extract only the text content, ignore tool calls and signatures
   state.attractions = clean_agent_output(raw_content)
 
-  print("Attractions found:")
-  print(state.attractions)
-  return Command(goto="calculator_agent", update=state)
+  logger.debug("Attractions found:\n%s", state.attractions)
+  return Command(goto="calculator_agent", update={"attractions": state.attractions})
 
-def node_calculator_agent(state: WorkflowState) -> Command:
+async def node_calculator_agent(state: WorkflowState) -> Command:
   """
   Calculates a budget breakdown for the trip.
 
@@ -416,16 +424,16 @@ def node_calculator_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceed to 'itinerary_agent'.
   """
-  print("\n---- CALCULATOR AGENT ----")
-  result = calculator_agent.invoke({"input": f"Calculate budget for trip to {state.destination} with budget {state.budget}"})
+  logger.debug("---- CALCULATOR AGENT ----")
+  # Awaited so currency conversions use the hedged async lookup (CurrencyConverter.aconvert)
+  result = await calculator_agent.ainvoke({"input": f"Calculate budget for trip to {state.destination} with budget {state.budget}"})
   raw_content = result['output']
 
   # Extract only the text content, ignore tool calls and signatures
   state.calculator_result = clean_agent_output(raw_content)
 
-  print("Calculator result:")
-  print(state.calculator_result)
-  return Command(goto="itinerary_agent", update=state)
+  logger.debug("Calculator result:\n%s", state.calculator_result)
+  return Command(goto="itinerary_agent", update={"calculator_result": state.calculator_result})
 
 def node_itinerary_agent(state: WorkflowState) -> Command:
   """
@@ -440,12 +448,11 @@ def node_itinerary_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceed to 'summary_agent'.
   """
-  print("\n---- ITINERARY AGENT ----")
+  logger.debug("---- ITINERARY AGENT ----")
   itinerary = itinerary_builder.build(state)
   state.itinerary = itinerary
-  print("Itinerary:")
-  pprint.pprint(itinerary)
-  return Command(goto="summary_agent", update=state)
+  logger.debug("Itinerary: %r", itinerary)
+  return Command(goto="summary_agent", update={"itinerary": itinerary})
 
 def node_summary_agent(state: WorkflowState) -> Command:
   """
@@ -460,7 +467,7 @@ def node_summary_agent(state: WorkflowState) -> Command:
   Returns:
       Command: Proceeds to specific agent if regeneration requested, otherwise END.
   """
-  print("\n---- SUMMARY AGENT ----")
+  logger.debug("---- SUMMARY AGENT ----")
   summary = summary_generator.generate_summary({
     'messages': state.messages,
     "destination": state.destination,
@@ -472,20 +479,19 @@ def node_summary_agent(state: WorkflowState) -> Command:
     "calculator_result": state.calculator_result
   })
   state.summary = summary
-  print("Summary:")
-  pprint.pprint(summary)
+  logger.debug("Summary: %r", summary)
   # Parse for next step signal
   content = summary.get('summary') if isinstance(summary, dict) else str(summary)
   match = re.search(r'regenerate:(\w+_agent)', content)
   if match:
     next_agent = match.group(1)
-    print(f"Supervisor requests regeneration: {next_agent}")
-    return Command(goto=next_agent, update=state)
+    logger.info("Supervisor requests regeneration: %s", next_agent)
+    return Command(goto=next_agent, update={"summary": summary})
   elif 'final' in content.lower():
-    return Command(goto=END, update=state)
+    return Command(goto=END, update={"summary": summary})
   else:
     # Default: end if no clear signal
-    return Command(goto=END, update=state)
+    return Command(goto=END, update={"summary": summary})
 
 def summary_supervisor_router(state: WorkflowState) -> str:
   """
@@ -555,4 +561,5 @@ if __name__ == "__main__":
     transportation_preferences=None,
     messages=[HumanMessage(content="I want to go to Paris for 3 days, my budget is 1000 EUR, I like art and culture, my currency is USD")]
   )
-  result = app.invoke(state)
+  # Some nodes are async, so the graph must be run with ainvoke
+  result = asyncio.run(app.ainvoke(state))